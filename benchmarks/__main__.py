@@ -0,0 +1,53 @@
+"""
+Offline benchmarks of the relay hot paths
+
+Usage:
+    python -m benchmarks run -o candidate.json
+    python -m benchmarks compare baseline.json candidate.json
+"""
+import json
+import sys
+from pathlib import Path
+
+import click
+
+from benchmarks import (bench_dispatch, bench_formatting, bench_markdown, bench_nicknames, bench_relay,  # noqa: F401
+                        bench_startup)
+from benchmarks.registry import compare, run
+
+CONTEXT_SETTINGS = {'help_option_names': ['-h', '--help']}
+
+
+@click.group(context_settings=CONTEXT_SETTINGS)
+def cli():
+    pass
+
+
+@cli.command(name='run')
+@click.option('-o', '--output', type=Path, default=None, help='Save results as JSON')
+@click.option('-k', '--filter', 'pattern', default='', help='Only run benchmarks with names containing this')
+@click.option('--min-time', type=float, default=0.2, help='Minimum seconds per measurement')
+@click.option('--repeat', type=int, default=5, help='Number of measurements per benchmark')
+def run_command(output: Path | None, pattern: str, min_time: float, repeat: int) -> None:
+    """Runs benchmarks, printing the best time per operation"""
+    results = run(pattern, min_time, repeat)
+    if output:
+        with output.open(mode='w', encoding='utf-8') as fp:
+            json.dump(results, fp, indent=2)
+        print(f'Results saved to {output}')
+
+
+@cli.command(name='compare')
+@click.argument('baseline', type=Path)
+@click.argument('candidate', type=Path)
+@click.option('-t', '--threshold', type=float, default=0.1, help='Relative slowdown flagged as a regression')
+def compare_command(baseline: Path, candidate: Path, threshold: float) -> None:
+    """Compares two result files, exiting with status 1 on regressions"""
+    regressions = compare(baseline, candidate, threshold)
+    if regressions:
+        print(f'{len(regressions)} regression(s) above {threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,74 @@
+"""Dispatch cost per message with N relays and IRC networks, should stay flat for routed hooks"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from pyrcb2.itypes import IStr
+
+from benchmarks.fakes import make_bot, make_config
+from benchmarks.registry import async_benchmark
+from walnut.bot import WalnutBot
+
+RELAY_COUNTS = (1, 10, 100, 1000)
+NETWORK_COUNTS = (1, 10)
+
+
+def _make_hooks(relays: int, routed: bool, networks: int = 1) -> WalnutBot:
+    """Registers one noop hook pair per relay, either as catch-alls or routed by channel"""
+    bot = make_bot(make_config(networks=networks))
+    network_names = list(bot.irc_networks)
+    for index in range(relays):
+        channel = f'#channel-{index}'
+        network = network_names[index % networks]
+
+        # mirrors the channel check done by MessageRelay
+        async def irc_hook(message, channel=IStr(channel)):
+            if message.channel != channel:
+                return
+
+        async def discord_hook(message, channel_id=index):
+            if message.channel.id != channel_id:
+                return
+
+        if routed:
+            bot.add_irc_route(channel, irc_hook, network=network)
+            bot.add_discord_route(index, discord_hook)
+        else:
+            bot.irc_hooks.append(irc_hook)
+            bot.discord_hooks.append(discord_hook)
+
+    return bot
+
+
+def _register(relays: int, routed: bool) -> None:
+    mode = 'routed' if routed else 'catch_all'
+
+    @async_benchmark(f'dispatch.irc.{mode}.{relays}')
+    def irc():
+        bot = _make_hooks(relays, routed)
+        network = bot.get_irc_network()
+        sender, channel = IStr('someone'), IStr('#channel-0')
+        return lambda: bot._on_irc_message(network, sender, channel, 'hello')
+
+    @async_benchmark(f'dispatch.discord.{mode}.{relays}')
+    def discord():
+        bot = _make_hooks(relays, routed)
+        message = SimpleNamespace(author=object(), channel=SimpleNamespace(id=0))
+        return lambda: bot._on_discord_message(message)  # type: ignore[arg-type]
+
+
+def _register_networks(networks: int) -> None:
+    @async_benchmark(f'dispatch.irc.routed.100.networks-{networks}')
+    def irc():
+        bot = _make_hooks(100, routed=True, networks=networks)
+        network = next(iter(bot.irc_networks.values()))
+        sender, channel = IStr('someone'), IStr('#channel-0')
+        return lambda: bot._on_irc_message(network, sender, channel, 'hello')
+
+
+for _relays in RELAY_COUNTS:
+    for _routed in (False, True):
+        _register(_relays, _routed)
+
+for _networks in NETWORK_COUNTS:
+    _register_networks(_networks)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from benchmarks.corpus import IRC_MESSAGES
+from benchmarks.registry import benchmark
+from walnut.irc.formatting import Colors, color, plain, strip_formatting, to_markdown
+
+
+def _over_corpus(func):
+    def setup():
+        def run():
+            for message in IRC_MESSAGES:
+                func(message)
+        return run
+    return setup
+
+
+benchmark('formatting.plain', batch=len(IRC_MESSAGES))(_over_corpus(plain))
+benchmark('formatting.strip_formatting', batch=len(IRC_MESSAGES))(_over_corpus(strip_formatting))
+benchmark('formatting.to_markdown', batch=len(IRC_MESSAGES))(_over_corpus(to_markdown))
+
+
+@benchmark('formatting.color')
+def bench_color():
+    return lambda: color('nickname', Colors.LIGHT_BLUE, 'BLACK')
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from benchmarks.corpus import DISCORD_MESSAGES
+from benchmarks.fakes import make_bot, make_config
+from benchmarks.registry import benchmark
+from walnut.config import CacheConfig
+from walnut.hooks.relay import MessageRelay, parse_markdown
+
+
+def _make_relay(cache_entries: int) -> MessageRelay:
+    config = make_config(relays=1, cache_config=CacheConfig(render_entries=cache_entries))
+    relay = MessageRelay.from_config(config.relays[0])
+    relay.load(make_bot(config))
+    return relay
+
+
+@benchmark('markdown.parse_markdown', batch=len(DISCORD_MESSAGES))
+def parse_corpus():
+    def run():
+        for message in DISCORD_MESSAGES:
+            parse_markdown(message)
+    return run
+
+
+@benchmark('markdown.render_markdown.uncached', batch=len(DISCORD_MESSAGES))
+def render_uncached():
+    relay = _make_relay(cache_entries=0)
+
+    def run():
+        for message in DISCORD_MESSAGES:
+            relay.render_markdown(message)
+    return run
+
+
+@benchmark('markdown.render_markdown.cached', batch=len(DISCORD_MESSAGES))
+def render_cached():
+    relay = _make_relay(cache_entries=4096)
+
+    def run():
+        for message in DISCORD_MESSAGES:
+            relay.render_markdown(message)
+    return run
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from benchmarks.fakes import make_user
+from benchmarks.registry import benchmark
+from walnut.irc.nicknames import DisplayNameCache, format_discord_user, select_color
+
+USERS = [make_user(index, f'user{index}', global_name=f'User {index}') for index in range(20)]
+
+
+@benchmark('nicknames.select_color', batch=len(USERS))
+def bench_select_color():
+    def run():
+        for user in USERS:
+            select_color(user.name)
+    return run
+
+
+@benchmark('nicknames.format_discord_user', batch=len(USERS))
+def bench_format_discord_user():
+    def run():
+        for user in USERS:
+            format_discord_user(user, use_username=True)  # type: ignore[arg-type]
+    return run
+
+
+@benchmark('nicknames.display_name_cache', batch=len(USERS))
+def bench_display_name_cache():
+    cache = DisplayNameCache(max_users=1000)
+
+    def run():
+        for user in USERS:
+            cache.format_user(user, use_username=True)  # type: ignore[arg-type]
+    return run
@@ -0,0 +1,63 @@
+"""End-to-end MessageRelay handling, with Discord and IRC transports replaced by fakes"""
+from __future__ import annotations
+
+import itertools
+
+from pyrcb2.itypes import IStr
+
+from benchmarks.corpus import DISCORD_MESSAGES, IRC_MESSAGES
+from benchmarks.fakes import (FakeChannel, FakeWebhook, make_bot, make_config, make_discord_message, make_guild,
+                              make_user)
+from benchmarks.registry import async_benchmark
+from walnut.hooks.relay import MessageRelay
+from walnut.irc.message import Message as IRCMessage
+
+
+def _make_relay(webhooks: bool) -> MessageRelay:
+    config = make_config(relays=1, webhooks=webhooks)
+    bot = make_bot(config)
+    relay = MessageRelay.from_config(config.relays[0])
+    relay.load(bot)
+    relay.discord_channel = FakeChannel(0, make_guild())
+    if webhooks:
+        # records sends instead of posting them
+        relay.webhook_dispatcher = FakeWebhook()  # type: ignore[assignment]
+    return relay
+
+
+@async_benchmark('relay.handle_discord_message', batch=len(DISCORD_MESSAGES) * 5)
+def discord_to_irc():
+    relay = _make_relay(webhooks=False)
+    assert relay.bot
+    authors = [make_user(index, f'user{index}', global_name=f'User {index}') for index in range(5)]
+    messages = itertools.cycle([
+        make_discord_message(content, author)
+        for content, author in itertools.product(DISCORD_MESSAGES, authors)
+    ])
+
+    async def run():
+        await relay.handle_discord_message(next(messages))  # type: ignore[arg-type]
+        relay.bot.irc_scheduler.clear()  # type: ignore[union-attr]
+    return run
+
+
+def _irc_to_discord(webhooks: bool):
+    relay = _make_relay(webhooks=webhooks)
+    assert relay.bot
+    messages = itertools.cycle([
+        IRCMessage(relay.bot.irc, IStr(f'user{index}'), IStr('#channel-0'), content)  # type: ignore[arg-type]
+        for index, content in enumerate(IRC_MESSAGES)
+    ])
+    channel = relay.discord_channel
+    webhook = relay.webhook_dispatcher
+
+    async def run():
+        await relay.handle_irc_message(next(messages))
+        channel.sent.clear()  # type: ignore[union-attr]
+        if webhook:
+            webhook.sent.clear()  # type: ignore[attr-defined]
+    return run
+
+
+async_benchmark('relay.handle_irc_message.webhook', batch=len(IRC_MESSAGES) * 5)(lambda: _irc_to_discord(True))
+async_benchmark('relay.handle_irc_message.channel', batch=len(IRC_MESSAGES) * 5)(lambda: _irc_to_discord(False))
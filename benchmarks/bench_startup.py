@@ -0,0 +1,21 @@
+"""Interpreter startup with walnut's entry points imported, see benchmarks.importtime for a breakdown"""
+from __future__ import annotations
+
+import subprocess
+import sys
+
+from benchmarks.registry import benchmark
+
+
+def _import(module: str):
+    command = [sys.executable, '-c', f'import {module}']
+
+    def run():
+        subprocess.run(command, check=True)
+    return run
+
+
+benchmark('startup.python')(lambda: _import('sys'))
+benchmark('startup.walnut.cli')(lambda: _import('walnut.__main__'))
+benchmark('startup.walnut.config')(lambda: _import('walnut.config'))
+benchmark('startup.walnut.bot')(lambda: _import('walnut.bot'))
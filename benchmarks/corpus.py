@@ -0,0 +1,39 @@
+"""Message corpora resembling real traffic, used by benchmarks"""
+
+DISCORD_MESSAGES = [
+    'lol',
+    'ok',
+    'same',
+    'good morning everyone',
+    'did anyone else get the update yet? mine is still downloading',
+    'yeah that makes sense, I will try it after lunch',
+    'https://example.com/some/article-about-things',
+    '**important**: the server restarts at 18:00 UTC',
+    'that is *so* cool',
+    'I ~~hate~~ love this',
+    '||the butler did it||',
+    '<:pepe_hmm:123456789012345678> what',
+    'use `pip install walnut` and then `walnut config`',
+    '> quoting someone\nand replying to them',
+    '```py\nprint("hello")\n```',
+    'check [the docs](https://example.com/docs) first',
+    'line one\nline two\nline three\nline four\nline five',
+    '__underlined__ and **bold *nested italic* text**',
+    'a longer message that goes on for a while, explaining something in detail, '
+    'with several clauses, some punctuation (like this), and no formatting at all, '
+    'which is what most of the longer messages look like in practice.',
+    'snake_case_names and 2*3*4 math confuse markdown parsers',
+]
+"""Typical Discord messages, mostly plain text with some markdown."""
+
+IRC_MESSAGES = [
+    'lol',
+    'hey, anyone around?',
+    'the build failed again, see https://ci.example.com/job/1234_5678/',
+    '\x02bold\x02 statement',
+    '\x0304red\x03 alert, \x0309green\x03 light',
+    '\x1ditalics\x1d and \x1funderline\x1f',
+    'some *stars* and _underscores_ typed on IRC',
+    '\x01ACTION waves\x01',
+]
+"""Typical IRC messages, including formatting control codes."""
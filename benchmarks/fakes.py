@@ -0,0 +1,113 @@
+"""Stand-ins for Discord objects and an offline WalnutBot, used by benchmarks and tests"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any
+
+from discord.abc import Messageable
+
+from walnut.bot import WalnutBot
+from walnut.config import Config, IRCConfig, RelayConfig
+
+WEBHOOK_URL = 'https://discord.com/api/webhooks/{id}/' + 'x' * 68
+
+
+def make_config(relays: int = 0, webhooks: bool = True, networks: int = 1, **kwargs: Any) -> Config:
+    """
+    Returns a config with `relays` relays, #channel-N <-> channel ID N
+
+    With multiple networks, named network-N, relays are assigned to them in turns.
+    """
+    return Config(
+        discord_token='',
+        irc_configs=[
+            IRCConfig(
+                server='localhost',
+                port=6667,
+                ssl=False,
+                nickname='Walnut',
+                username='Walnut',
+                realname='Walnut',
+                name=f'network-{index}' if networks > 1 else 'default'
+            )
+            for index in range(networks)
+        ],
+        relays=[
+            RelayConfig(
+                irc_channel=f'#channel-{index}',
+                discord_channel_id=index,
+                discord_webhook_url=WEBHOOK_URL.format(id=10 ** 18 + index) if webhooks else None,
+                irc_network=f'network-{index % networks}' if networks > 1 else None
+            )
+            for index in range(relays)
+        ],
+        **kwargs
+    )
+
+
+def make_bot(config: Config | None = None) -> WalnutBot:
+    """Creates a bot which is never connected anywhere"""
+    return WalnutBot(config or make_config())
+
+
+class FakeChannel(Messageable):
+    """Discord channel recording sent messages instead of sending them"""
+    __slots__ = ('id', 'guild', 'sent')
+
+    def __init__(self, channel_id: int, guild: Any):
+        self.id = channel_id
+        self.guild = guild
+        self.sent: list[str] = []
+
+    async def send(self, content: str | None = None, **_: Any):  # type: ignore[override]
+        self.sent.append(content or '')
+        return SimpleNamespace(id=len(self.sent))
+
+
+class FakeWebhook:
+    """Webhook dispatcher, recording sent messages instead of sending them"""
+
+    def __init__(self):
+        self.sent: list[dict[str, Any]] = []
+
+    async def send(self, **kwargs: Any) -> None:
+        self.sent.append(kwargs)
+
+
+def make_user(user_id: int, name: str, nick: str | None = None, global_name: str | None = None, guild: Any = None):
+    """Returns an object resembling a discord.Member"""
+    return SimpleNamespace(
+        id=user_id,
+        name=name,
+        nick=nick,
+        global_name=global_name,
+        guild=guild,
+        bot=False,
+        avatar=SimpleNamespace(url=f'https://cdn.discordapp.com/avatars/{user_id}/avatar.png'),
+    )
+
+
+def make_guild(members: int = 1000) -> SimpleNamespace:
+    """Returns an object resembling a fully chunked discord.Guild"""
+    guild = SimpleNamespace(id=1, chunked=True, members=[])
+    guild.members = [
+        make_user(index, f'user{index}', nick=f'Nick {index}', global_name=f'User {index}', guild=guild)
+        for index in range(members)
+    ]
+    guild.get_member_named = lambda name: next((m for m in guild.members if name in (m.name, m.nick)), None)
+    return guild
+
+
+def make_discord_message(content: str, author: Any, channel_id: int = 0) -> SimpleNamespace:
+    """Returns an object resembling a discord.Message"""
+    return SimpleNamespace(
+        id=0,
+        content=content,
+        clean_content=content,
+        author=author,
+        channel=SimpleNamespace(id=channel_id),
+        reference=None,
+        webhook_id=None,
+        stickers=[],
+        attachments=[],
+    )
@@ -0,0 +1,5 @@
+"""In-process stand-ins for an IRC server and the Discord API, for end-to-end load testing"""
+from benchmarks.harness.discord_api import FakeDiscordAPI, GatewayInjector
+from benchmarks.harness.ircd import FakeIRCServer
+
+__all__ = ['FakeDiscordAPI', 'FakeIRCServer', 'GatewayInjector']
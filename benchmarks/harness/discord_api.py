@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+import discord
+from aiohttp import web
+from discord.http import Route
+
+
+@dataclass
+class PostedMessage:
+    """A message posted to a webhook or channel"""
+    channel_id: int
+    content: str
+    username: str | None
+    timestamp: float
+
+
+class FakeDiscordAPI:
+    """
+    Local HTTP server answering the Discord REST endpoints used for relaying messages
+
+    Use :meth:`patch_routes` to point discord.py at it.
+
+    Webhooks can be rate limited like Discord does, allowing `webhook_limit` requests per `webhook_window` seconds
+    to every webhook, reported in rate limit headers. Requests over the limit are answered with a 429.
+
+    Attributes:
+        posted (list): Messages posted, in order of arrival
+        latency: Seconds to wait before answering each request, simulating network round trips
+        rate_limited: Number of requests answered with a 429
+    """
+
+    def __init__(self, latency: float = 0.0, webhook_limit: int | None = None, webhook_window: float = 2.0):
+        self.latency = latency
+        self.webhook_limit = webhook_limit
+        self.webhook_window = webhook_window
+        self.posted: list[PostedMessage] = []
+        self.requests = 0
+        self.rate_limited = 0
+        # webhook ID -> start of the current window, requests made in it
+        self._windows: dict[int, tuple[float, int]] = {}
+        self.port = 0
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application()
+        self.app.router.add_post('/api/v10/webhooks/{webhook_id}/{token}', self._execute_webhook)
+        self.app.router.add_post('/api/v10/channels/{channel_id}/messages', self._create_message)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/api/v10'
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """Starts listening, returns the port"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        return self.port
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    @contextmanager
+    def patch_routes(self) -> Iterator[None]:
+        """Redirects discord.py REST requests (including webhooks) to this server"""
+        base = Route.BASE
+        Route.BASE = self.base_url
+        try:
+            yield
+        finally:
+            Route.BASE = base
+
+    async def _read_payload(self, request: web.Request) -> dict[str, Any]:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if request.content_type == 'multipart/form-data':
+            form = await request.post()
+            return json.loads(str(form.get('payload_json', '{}')))
+        return await request.json()
+
+    def _rate_limit(self, webhook_id: int) -> tuple[bool, dict[str, str]]:
+        """Counts a request to a webhook, returns whether it's allowed and rate limit headers"""
+        # without a limit, a limit which is never reached is reported, as clients assume Discord's defaults otherwise
+        limit = self.webhook_limit if self.webhook_limit is not None else 10 ** 6
+        now = time.monotonic()
+        started, count = self._windows.get(webhook_id, (now, 0))
+        if now - started >= self.webhook_window:
+            started, count = now, 0
+        count += 1
+        self._windows[webhook_id] = (started, count)
+
+        reset_after = started + self.webhook_window - now
+        headers = {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(max(0, limit - count)),
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+            # discord.py treats 429s without it as a Cloudflare ban
+            'Via': '1.1 google',
+        }
+        return count <= limit, headers
+
+    async def _execute_webhook(self, request: web.Request) -> web.Response:
+        webhook_id = int(request.match_info['webhook_id'])
+        allowed, headers = self._rate_limit(webhook_id)
+        payload = await self._read_payload(request)
+        if not allowed:
+            self.rate_limited += 1
+            retry_after = float(headers['X-RateLimit-Reset-After'])
+            return web.json_response(
+                {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False},
+                status=429,
+                headers=headers
+            )
+
+        self.posted.append(PostedMessage(
+            channel_id=webhook_id,
+            content=payload.get('content', ''),
+            username=payload.get('username'),
+            timestamp=time.monotonic()
+        ))
+        return web.Response(status=204, headers=headers)
+
+    async def _create_message(self, request: web.Request) -> web.Response:
+        payload = await self._read_payload(request)
+        channel_id = int(request.match_info['channel_id'])
+        self.posted.append(PostedMessage(channel_id, payload.get('content', ''), None, time.monotonic()))
+        return web.json_response({'id': str(len(self.posted)), 'channel_id': str(channel_id), **payload})
+
+
+class GatewayInjector:
+    """Feeds events to a discord.Client as if they came from the gateway, without connecting"""
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+
+    def dispatch_message(self, message: Any) -> None:
+        """Dispatches an `on_message` event, `message` should resemble a discord.Message"""
+        if not isinstance(self.client.loop, asyncio.AbstractEventLoop):
+            # normally set up by Client.login()
+            self.client.loop = asyncio.get_running_loop()
+        self.client.dispatch('message', message)
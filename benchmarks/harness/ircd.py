@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from pyrcb2.itypes import IStr
+
+logger = logging.getLogger(__name__)
+
+SERVER_NAME = 'fake.ircd'
+MAX_LINE_LENGTH = 512
+
+
+@dataclass
+class ReceivedMessage:
+    """A PRIVMSG received from a client"""
+    sender: str
+    target: str
+    text: str
+    timestamp: float
+    truncated: bool
+
+
+@dataclass
+class Client:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    nickname: str | None = None
+    username: str = 'user'
+    hostname: str = 'fake.host'
+    registered: bool = False
+    channels: set[IStr] = field(default_factory=set)
+    penalty_until: float = 0.0
+
+    @property
+    def mask(self) -> str:
+        return f'{self.nickname}!{self.username}@{self.hostname}'
+
+    def send(self, line: str) -> None:
+        self.writer.write(line.encode('utf-8') + b'\r\n')
+
+
+class FakeIRCServer:
+    """
+    Minimal IRC server, enough for pyrcb2 to register, join channels and exchange messages
+
+    Flood control follows the usual ircd penalty model: every line moves the client's penalty
+    timestamp forward by `flood_penalty` seconds, and once it's more than `flood_window` seconds
+    ahead, further lines are either delayed until it isn't, or the client is disconnected for excess flood.
+
+    Attributes:
+        received (list): PRIVMSGs sent by clients, in order of arrival
+        truncated: Number of PRIVMSGs which would be cut off when relayed to other clients
+        flood_delays: Number of lines delayed by flood control
+        flood_kicks: Number of clients disconnected for excess flood
+        disconnects: Number of clients disconnected by disconnect_clients()
+        reserved_nicknames (set): Nicknames answered as in use, as if held by a connection the server hasn't dropped yet
+    """
+
+    def __init__(self, flood_penalty: float = 0.0, flood_window: float = 10.0, kick_on_flood: bool = False):
+        self.flood_penalty = flood_penalty
+        self.flood_window = flood_window
+        self.kick_on_flood = kick_on_flood
+        self.clients: list[Client] = []
+        self.channels: dict[IStr, set[IStr]] = {}
+        self.received: list[ReceivedMessage] = []
+        self.truncated = 0
+        self.flood_delays = 0
+        self.flood_kicks = 0
+        self.disconnects = 0
+        self.reserved_nicknames: set[IStr] = set()
+        self.port = 0
+        self._server: asyncio.Server | None = None
+        self._joined: dict[IStr, asyncio.Event] = {}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """Starts listening, returns the port"""
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self) -> None:
+        for client in self.clients:
+            client.writer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def wait_for_join(self, channel: str, timeout: float = 10.0) -> None:
+        """Waits until any client joins a channel"""
+        event = self._joined.setdefault(IStr(channel), asyncio.Event())
+        await asyncio.wait_for(event.wait(), timeout)
+
+    def disconnect_clients(self) -> int:
+        """Disconnects all clients, as if the server restarted, returns the number of disconnected clients"""
+        clients = list(self.clients)
+        for client in clients:
+            client.send('ERROR :Closing Link: (Server restarting)')
+            client.writer.close()
+        self.disconnects += len(clients)
+        return len(clients)
+
+    def inject_privmsg(self, nickname: str, channel: str, text: str) -> None:
+        """Sends a PRIVMSG from a simulated user to all clients in a channel"""
+        line = f':{nickname}!user@simulated.host PRIVMSG {channel} :{text}'
+        for client in self.clients:
+            if IStr(channel) in client.channels:
+                client.send(line)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = Client(reader, writer)
+        self.clients.append(client)
+        try:
+            while line := await reader.readline():
+                if not await self._throttle(client):
+                    break
+                self._handle_line(client, line.rstrip(b'\r\n').decode('utf-8', 'replace'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.remove(client)
+            for members in self.channels.values():
+                members.discard(IStr(client.nickname or ''))
+            writer.close()
+
+    async def _throttle(self, client: Client) -> bool:
+        if not self.flood_penalty:
+            return True
+
+        now = time.monotonic()
+        client.penalty_until = max(client.penalty_until, now) + self.flood_penalty
+        excess = client.penalty_until - now - self.flood_window
+        if excess <= 0:
+            return True
+
+        if self.kick_on_flood:
+            self.flood_kicks += 1
+            client.send('ERROR :Closing Link: (Excess Flood)')
+            return False
+
+        self.flood_delays += 1
+        await asyncio.sleep(excess)
+        return True
+
+    def _handle_line(self, client: Client, line: str) -> None:
+        if line.startswith(':'):
+            line = line.split(' ', 1)[1] if ' ' in line else ''
+        line, has_trailing, trailing = line.partition(' :')
+        if not line.strip():
+            return
+        command, *params = line.split()
+        if has_trailing:
+            params.append(trailing)
+        command = command.upper()
+
+        if command == 'CAP':
+            if params and params[0].upper() == 'REQ':
+                client.send(f':{SERVER_NAME} CAP * NAK :{params[-1]}')
+        elif command == 'NICK':
+            in_use = self.reserved_nicknames | {IStr(other.nickname) for other in self.clients if other is not client}
+            if IStr(params[0]) in in_use:
+                client.send(f':{SERVER_NAME} 433 {client.nickname or "*"} {params[0]} :Nickname is already in use')
+                return
+            client.nickname = params[0]
+            self._register(client)
+        elif command == 'USER':
+            client.username = params[0]
+            self._register(client)
+        elif command == 'PING':
+            client.send(f':{SERVER_NAME} PONG {SERVER_NAME} :{params[-1] if params else ""}')
+        elif command == 'JOIN':
+            self._join(client, IStr(params[0]))
+        elif command == 'PART':
+            client.channels.discard(IStr(params[0]))
+            self.channels.get(IStr(params[0]), set()).discard(IStr(client.nickname))
+            client.send(f':{client.mask} PART {params[0]}')
+        elif command in ('PRIVMSG', 'NOTICE'):
+            self._privmsg(client, command, params[0], params[-1])
+        elif command == 'QUIT':
+            client.send('ERROR :Closing Link')
+            client.writer.close()
+
+    def _register(self, client: Client) -> None:
+        if client.registered or client.nickname is None or client.username == 'user':
+            return
+        client.registered = True
+        client.send(f':{SERVER_NAME} 001 {client.nickname} :Welcome to the fake network {client.mask}')
+
+    def _join(self, client: Client, channel: IStr) -> None:
+        members = self.channels.setdefault(channel, set())
+        members.add(IStr(client.nickname))
+        client.channels.add(channel)
+        client.send(f':{client.mask} JOIN {channel}')
+        client.send(f':{SERVER_NAME} 353 {client.nickname} = {channel} :{" ".join(members)}')
+        client.send(f':{SERVER_NAME} 366 {client.nickname} {channel} :End of /NAMES list.')
+        self._joined.setdefault(channel, asyncio.Event()).set()
+
+    def _privmsg(self, client: Client, command: str, target: str, text: str) -> None:
+        line = f':{client.mask} {command} {target} :{text}'
+        truncated = len(line.encode('utf-8')) + 2 > MAX_LINE_LENGTH
+        if truncated:
+            self.truncated += 1
+            line = line.encode('utf-8')[:MAX_LINE_LENGTH - 2].decode('utf-8', 'ignore')
+
+        if command == 'PRIVMSG':
+            self.received.append(ReceivedMessage(client.nickname or '', target, text, time.monotonic(), truncated))
+
+        for other in self.clients:
+            if other is not client and IStr(target) in other.channels:
+                other.send(line)
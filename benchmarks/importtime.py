@@ -0,0 +1,122 @@
+"""
+Import time breakdown of walnut's entry points, guarding against heavy modules being imported eagerly
+
+Every module is imported in a fresh interpreter with ``python -X importtime``. The slowest imports are listed
+by cumulative time, and the run fails if a module listed in :data:`LAZY_IMPORTS` was imported.
+
+Usage:
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime -m walnut.bot --top 30 -o importtime.json
+"""
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import click
+
+CONTEXT_SETTINGS = {'help_option_names': ['-h', '--help']}
+
+HEAVY_MODULES = ('discord', 'aiohttp', 'mistune', 'pyrcb2')
+LAZY_IMPORTS: dict[str, tuple[str, ...]] = {
+    # `walnut config` and `walnut --help` only need click
+    'walnut.__main__': HEAVY_MODULES,
+    'walnut': HEAVY_MODULES,
+    'walnut.hooks': HEAVY_MODULES,
+    'walnut.config': HEAVY_MODULES,
+}
+"""Module -> top level packages which importing it must not import."""
+
+
+@dataclass
+class ImportTiming:
+    """Import of a single module, as reported by ``-X importtime``"""
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure_imports(module: str) -> list[ImportTiming]:
+    """Imports a module in a fresh interpreter, returning timings of every module imported along the way"""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    timings = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append(ImportTiming(
+            name=name.strip(),
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us),
+            # names are indented by two spaces per level, after a separating space
+            depth=(len(name) - len(name.lstrip()) - 1) // 2
+        ))
+    return timings
+
+
+def forbidden_imports(module: str, timings: list[ImportTiming]) -> list[str]:
+    """Returns modules imported by `module`, which it should have left to be imported lazily"""
+    forbidden = LAZY_IMPORTS.get(module, ())
+    return sorted({
+        timing.name for timing in timings
+        if timing.name.split('.')[0] in forbidden
+    })
+
+
+def report(module: str, repeat: int = 5) -> dict[str, Any]:
+    """Measures a module `repeat` times, keeping the fastest run, which is the least affected by noise"""
+    runs = [measure_imports(module) for _ in range(repeat)]
+    timings = min(runs, key=lambda run: sum(timing.self_us for timing in run))
+    return {
+        'total_us': sum(timing.self_us for timing in timings),
+        'modules': len(timings),
+        'forbidden': forbidden_imports(module, timings),
+        'timings': [asdict(timing) for timing in timings],
+    }
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option(
+    '-m', '--module', 'modules',
+    multiple=True,
+    help='Module to measure, can be repeated [default: every module with lazy imports]'
+)
+@click.option('--top', type=int, default=15, help='Number of slowest imports to list per module')
+@click.option('--repeat', type=int, default=5, help='Number of runs per module, the fastest is reported')
+@click.option('-o', '--output', type=Path, default=None, help='Save results as JSON')
+def cli(modules: tuple[str, ...], top: int, repeat: int, output: Path | None) -> None:
+    """Lists the slowest imports of walnut's entry points, exiting with status 1 if heavy modules are imported"""
+    results = {}
+    failed = False
+    for module in modules or tuple(LAZY_IMPORTS):
+        result = results[module] = report(module, repeat)
+        print(f'{module}: {result["total_us"] / 1000:.1f} ms, {result["modules"]} modules')
+        slowest = sorted(result['timings'], key=lambda timing: timing['cumulative_us'], reverse=True)[:top]
+        for timing in slowest:
+            print(f'  {timing["cumulative_us"] / 1000:>9.1f} ms  {timing["name"]}')
+        if result['forbidden']:
+            failed = True
+            print(f'  imports modules which should be imported lazily: {", ".join(result["forbidden"][:10])}')
+
+    if output:
+        with output.open(mode='w', encoding='utf-8') as fp:
+            json.dump(results, fp, indent=2)
+        print(f'Results saved to {output}')
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
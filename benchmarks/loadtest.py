@@ -0,0 +1,238 @@
+"""
+End-to-end load test against a local IRC server and Discord API
+
+The bot connects to :class:`~benchmarks.harness.FakeIRCServer` over TCP and posts through webhooks
+to :class:`~benchmarks.harness.FakeDiscordAPI` over HTTP, while simulated users talk on both sides.
+Every message carries a sequence token, which is used to measure delivery latency.
+
+Usage:
+    python -m benchmarks.loadtest --relays 50 --rate 200 --duration 10 -o load.json
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import re
+import statistics
+import time
+from dataclasses import replace
+from functools import partial
+from pathlib import Path
+from typing import Any, Iterable
+
+import click
+
+from benchmarks.fakes import WEBHOOK_URL, FakeChannel, make_config, make_discord_message, make_guild, make_user
+from benchmarks.harness import FakeDiscordAPI, FakeIRCServer, GatewayInjector
+from walnut.bot import WalnutBot
+from walnut.hooks.relay import MessageRelay
+
+CONTEXT_SETTINGS = {'help_option_names': ['-h', '--help']}
+TOKEN_REGEX = re.compile(r'\bload-(\d+)\b')
+FILLER = 'the quick brown fox jumps over the lazy dog '
+
+
+def _percentile(values: list[float], percentile: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile))]
+
+
+def _summarize(sent: dict[int, float], received: Iterable[tuple[str, float]], duration: float) -> dict[str, Any]:
+    latencies = []
+    for text, timestamp in received:
+        # coalesced messages carry multiple tokens
+        for m in TOKEN_REGEX.finditer(text):
+            if (start := sent.pop(int(m.group(1)), None)) is not None:
+                latencies.append((timestamp - start) * 1000)
+
+    return {
+        'delivered': len(latencies),
+        'lost': len(sent),
+        'throughput': len(latencies) / duration,
+        'latency_p50_ms': _percentile(latencies, 0.5),
+        'latency_p99_ms': _percentile(latencies, 0.99),
+        'latency_max_ms': max(latencies, default=None),
+        'latency_mean_ms': statistics.fmean(latencies) if latencies else None,
+    }
+
+
+async def run_load(
+    relays: int = 10,
+    rate: float = 100.0,
+    duration: float = 5.0,
+    message_length: int = 80,
+    flood_rate: float | None = None,
+    flood_burst: int | None = None,
+    server_penalty: float = 0.0,
+    kick_on_flood: bool = False,
+    api_latency: float = 0.0,
+    drain_timeout: float = 30.0,
+    disconnect_at: float | None = None,
+    coalesce_window: float = 0.0,
+    irc_users: int = 10,
+    webhooks: int = 1,
+    webhook_limit: int | None = None,
+    log_communication: bool = False,
+) -> dict[str, Any]:
+    """
+    Runs a load test, returning the results
+
+    Args:
+        relays: Number of relays, each bridging its own IRC and Discord channel
+        rate: Messages per second sent on each side, spread evenly across relays
+        duration: Seconds to generate load for
+        message_length: Approximate length of each message
+        flood_rate: Overrides `irc.flood_rate` of the bot
+        flood_burst: Overrides `irc.flood_burst` of the bot
+        server_penalty: Seconds of flood penalty the IRC server adds per line, 0 disables flood control
+        kick_on_flood: Whether the IRC server disconnects flooding clients instead of delaying them
+        api_latency: Seconds the Discord API waits before answering each request
+        drain_timeout: Seconds to wait for queued messages after load generation ends
+        disconnect_at: If set, the IRC server disconnects the bot this many seconds into load generation
+        coalesce_window: Sets `coalesce_window` of every relay
+        irc_users: Number of simulated IRC users taking turns, fewer users let more lines be coalesced
+        webhooks: Number of webhooks of every relay
+        webhook_limit: Requests the Discord API allows per webhook every 2 seconds, None for no limit
+        log_communication: Whether to keep the bot's IRC wire logging enabled
+    """
+    ircd = FakeIRCServer(flood_penalty=server_penalty, kick_on_flood=kick_on_flood)
+    api = FakeDiscordAPI(latency=api_latency, webhook_limit=webhook_limit)
+    await ircd.start()
+    await api.start()
+
+    config = make_config(relays=relays)
+    config.relays = [
+        replace(
+            relay,
+            coalesce_window=coalesce_window,
+            discord_webhook_urls=[
+                WEBHOOK_URL.format(id=2 * 10 ** 18 + index * 1000 + extra) for extra in range(1, webhooks)
+            ]
+        )
+        for index, relay in enumerate(config.relays)
+    ]
+    config.logging_config = replace(config.logging_config, irc_wire='all' if log_communication else 'off')
+    irc_overrides = {'flood_rate': flood_rate, 'flood_burst': flood_burst}
+    config.irc_configs = [replace(
+        config.irc_config,
+        server='127.0.0.1',
+        port=ircd.port,
+        **{key: value for key, value in irc_overrides.items() if value is not None}
+    )]
+
+    bot = WalnutBot(config)
+    network = bot.get_irc_network()
+    guild = make_guild()
+    for relay_config in config.relays:
+        relay = MessageRelay.from_config(relay_config)
+        relay.load(bot)
+        relay.discord_channel = FakeChannel(relay_config.discord_channel_id, guild)
+
+    gateway = GatewayInjector(bot.discord)
+    tasks = [
+        asyncio.create_task(network.run(partial(bot._on_irc_connect, network))),
+        asyncio.create_task(bot.irc_scheduler.run()),
+    ]
+    irc_sent: dict[int, float] = {}
+    discord_sent: dict[int, float] = {}
+
+    with api.patch_routes():
+        try:
+            # JOINs go through the same flood control as messages
+            join_timeout = 10 + relays / config.irc_config.flood_rate + relays * server_penalty
+            await asyncio.gather(*(ircd.wait_for_join(relay.irc_channel, join_timeout) for relay in config.relays))
+
+            authors = [make_user(10 ** 6 + index, f'loaduser{index}', guild=guild) for index in range(10)]
+            filler = (FILLER * (message_length // len(FILLER) + 1))[:message_length].strip()
+            interval = 1 / rate
+            sequence = itertools.count()
+            started = time.monotonic()
+            if disconnect_at is not None:
+                asyncio.get_running_loop().call_later(disconnect_at, ircd.disconnect_clients)
+            while (now := time.monotonic()) - started < duration:
+                seq = next(sequence)
+                relay_config = config.relays[seq % relays]
+
+                irc_sent[seq] = now
+                ircd.inject_privmsg(f'ircuser{seq % irc_users}', relay_config.irc_channel, f'load-{seq} {filler}')
+
+                discord_sent[seq] = now
+                gateway.dispatch_message(make_discord_message(
+                    f'load-{seq} {filler}',
+                    authors[seq % len(authors)],
+                    relay_config.discord_channel_id
+                ))
+
+                await asyncio.sleep(max(0.0, started + (seq + 1) * interval - time.monotonic()))
+            elapsed = time.monotonic() - started
+
+            total = len(irc_sent)
+            deadline = time.monotonic() + drain_timeout
+            while time.monotonic() < deadline and (
+                sum(len(TOKEN_REGEX.findall(m.content)) for m in api.posted) < total or len(ircd.received) < total
+            ):
+                await asyncio.sleep(0.05)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await bot.close()
+            await ircd.close()
+            await api.close()
+
+    return {
+        'relays': relays,
+        'rate': rate,
+        'duration': elapsed,
+        'messages': total,
+        'irc_to_discord': {
+            **_summarize(irc_sent, ((m.content, m.timestamp) for m in api.posted), elapsed),
+            'requests': api.requests,
+            'rate_limited': api.rate_limited,
+        },
+        'discord_to_irc': {
+            **_summarize(discord_sent, ((m.text, m.timestamp) for m in ircd.received), elapsed),
+            'dropped': bot.irc_scheduler.dropped,
+            'truncated': ircd.truncated,
+            'flood_delays': ircd.flood_delays,
+            'flood_kicks': ircd.flood_kicks,
+            'reconnects': network.reconnects,
+        },
+    }
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--relays', type=int, default=10, help='Number of relays')
+@click.option('--rate', type=float, default=100.0, help='Messages per second on each side')
+@click.option('--duration', type=float, default=5.0, help='Seconds to generate load for')
+@click.option('--message-length', type=int, default=80, help='Approximate length of each message')
+@click.option('--flood-rate', type=float, default=None, help='Override irc.flood_rate of the bot')
+@click.option('--flood-burst', type=int, default=None, help='Override irc.flood_burst of the bot')
+@click.option('--server-penalty', type=float, default=0.0, help='IRC server flood penalty per line in seconds')
+@click.option('--kick-on-flood', is_flag=True, help='Disconnect instead of delaying flooding clients')
+@click.option('--api-latency', type=float, default=0.0, help='Discord API response delay in seconds')
+@click.option('--drain-timeout', type=float, default=30.0, help='Seconds to wait for queued messages afterwards')
+@click.option('--disconnect-at', type=float, default=None, help='Disconnect the bot this many seconds into the test')
+@click.option('--coalesce-window', type=float, default=0.0, help='Coalescing window of relays in seconds')
+@click.option('--irc-users', type=int, default=10, help='Number of simulated IRC users')
+@click.option('--webhooks', type=int, default=1, help='Number of webhooks per relay')
+@click.option('--webhook-limit', type=int, default=None, help='Requests allowed per webhook every 2 seconds')
+@click.option('-o', '--output', type=Path, default=None, help='Save results as JSON')
+@click.option('-v', '--verbose', is_flag=True, help='Log IRC communication')
+def cli(output: Path | None, verbose: bool, **kwargs: Any) -> None:
+    """Runs an end-to-end load test against local IRC and Discord stand-ins"""
+    if verbose:
+        logging.basicConfig(format='[%(levelname)s][%(name)s] %(message)s', level=logging.INFO)
+    results = asyncio.run(run_load(log_communication=verbose, **kwargs))
+    print(json.dumps(results, indent=2))
+    if output:
+        with output.open(mode='w', encoding='utf-8') as fp:
+            json.dump(results, fp, indent=2)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import platform
+import statistics
+import time
+import timeit
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+__all__ = ['BENCHMARKS', 'Benchmark', 'benchmark', 'async_benchmark', 'compare', 'run']
+
+
+@dataclass
+class Benchmark:
+    """A single registered benchmark
+
+    Attributes:
+        name: Unique dotted name, used as the key in result files
+        setup: Called once, returns a callable performing `batch` operations
+        batch: Number of operations performed by a single call
+    """
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    batch: int = 1
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, batch: int = 1):
+    """Registers a function returning a callable to be timed"""
+    def decorator(setup: Callable[[], Callable[[], Any]]):
+        if name in BENCHMARKS:
+            raise ValueError(f'Benchmark "{name}" is already registered')
+        BENCHMARKS[name] = Benchmark(name, setup, batch)
+        return setup
+    return decorator
+
+
+def async_benchmark(name: str, batch: int = 100):
+    """
+    Registers a function returning a coroutine function to be timed
+
+    The coroutine function is awaited `batch` times per measurement on a shared event loop,
+    so that the loop overhead is amortized.
+    """
+    def decorator(setup: Callable[[], Callable[[], Awaitable[Any]]]):
+        def sync_setup() -> Callable[[], Any]:
+            loop = asyncio.get_event_loop()
+            func = setup()
+
+            async def run_batch():
+                for _ in range(batch):
+                    await func()
+
+            return lambda: loop.run_until_complete(run_batch())
+
+        return benchmark(name, batch)(sync_setup)
+    return decorator
+
+
+def _measure(bench: Benchmark, min_time: float, repeat: int) -> dict[str, float]:
+    func = bench.setup()
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    # autorange aims for 0.2s per measurement, scale to the requested minimum
+    number = max(1, int(number * min_time / 0.2))
+    timings = [timing / number / bench.batch * 1e6 for timing in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min_us': min(timings),
+        'mean_us': statistics.fmean(timings),
+        'stdev_us': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'operations': number * bench.batch * repeat,
+    }
+
+
+def run(pattern: str = '', min_time: float = 0.2, repeat: int = 5) -> dict[str, Any]:
+    """Runs all benchmarks with names containing `pattern`, returning results ready to be saved as JSON"""
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if pattern not in name:
+            continue
+        results[name] = _measure(bench, min_time, repeat)
+        print(f'{name:<48} {results[name]["min_us"]:>12.3f} µs')
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Path, candidate: Path, threshold: float) -> list[str]:
+    """
+    Compares two result files, printing a table of changes
+
+    Minimum timings are compared, since they are the least affected by noise.
+
+    Returns:
+        list: Names of benchmarks slower than the baseline by more than `threshold` (0.1 = 10%)
+    """
+    with baseline.open(encoding='utf-8') as fp:
+        old = json.load(fp)['results']
+    with candidate.open(encoding='utf-8') as fp:
+        new = json.load(fp)['results']
+
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        ratio = new[name]['min_us'] / old[name]['min_us']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = 'improvement'
+        print(f'{name:<48} {old[name]["min_us"]:>10.3f} {new[name]["min_us"]:>10.3f} {ratio:>7.2f}x {flag}')
+
+    for name in sorted(old.keys() - new.keys()):
+        print(f'{name:<48} missing from candidate')
+    for name in sorted(new.keys() - old.keys()):
+        print(f'{name:<48} new')
+
+    return regressions
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from hypothesis import given
+from hypothesis import strategies as st
+
+from walnut.cache import LRUCache
+
+
+def length(key: str, value: str) -> int:
+    return len(key) + len(value)
+
+
+def test_get_and_put():
+    cache: LRUCache[str, str] = LRUCache(2)
+    assert cache.get('a') is None
+    cache.put('a', '1')
+    assert cache.get('a') == '1'
+    assert 'a' in cache
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used():
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_replacing_keeps_size():
+    cache: LRUCache[str, str] = LRUCache(2, max_bytes=100, sizeof=length)
+    cache.put('a', 'xxx')
+    cache.put('a', 'x')
+    assert len(cache) == 1
+    assert cache.size == 2
+    assert cache.evictions == 0
+
+
+def test_evicts_over_max_bytes():
+    cache: LRUCache[str, str] = LRUCache(10, max_bytes=10, sizeof=length)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    cache.put('c', 'xxxx')
+    assert 'a' not in cache
+    assert cache.size == 10
+
+
+def test_skips_values_larger_than_max_bytes():
+    cache: LRUCache[str, str] = LRUCache(10, max_bytes=4, sizeof=length)
+    cache.put('a', 'x')
+    cache.put('b', 'xxxxxxxx')
+    assert 'b' not in cache
+    assert cache.get('a') == 'x'
+
+
+def test_disabled():
+    cache: LRUCache[str, str] = LRUCache(0)
+    cache.put('a', '1')
+    assert len(cache) == 0
+
+
+def test_pop_and_clear():
+    cache: LRUCache[str, str] = LRUCache(10, sizeof=length)
+    cache.put('a', '1')
+    cache.put('b', '2')
+    assert cache.pop('a') == '1'
+    assert cache.pop('a') is None
+    assert cache.size == 2
+    cache.get('b')
+    cache.clear()
+    assert cache.stats() == {'entries': 0, 'bytes': 0, 'hits': 1, 'misses': 0, 'evictions': 0}
+
+
+operations = st.lists(st.tuples(st.sampled_from(['get', 'put', 'pop']), st.integers(0, 9), st.text(max_size=8)))
+
+
+@given(operations, st.integers(1, 5), st.one_of(st.none(), st.integers(1, 20)))
+def test_matches_reference(ops: list[tuple[str, int, str]], max_entries: int, max_bytes: int | None):
+    cache: LRUCache[str, str] = LRUCache(max_entries, max_bytes, sizeof=length)
+    # most recently used last
+    reference: dict[str, str] = {}
+    for op, number, value in ops:
+        key = str(number)
+        if op == 'get':
+            assert cache.get(key) == reference.get(key)
+            if key in reference:
+                reference[key] = reference.pop(key)
+        elif op == 'pop':
+            assert cache.pop(key) == reference.pop(key, None)
+        else:
+            cache.put(key, value)
+            if max_bytes is not None and length(key, value) > max_bytes:
+                continue
+            reference.pop(key, None)
+            reference[key] = value
+            while len(reference) > max_entries or (
+                max_bytes is not None and sum(length(*item) for item in reference.items()) > max_bytes
+            ):
+                del reference[next(iter(reference))]
+
+        assert len(cache) == len(reference)
+        assert cache.size == sum(length(*item) for item in reference.items())
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from walnut.discord.commands import profile_command
+
+
+class FakeInteraction:
+    """Records deferrals and followup messages of a command"""
+
+    def __init__(self):
+        self.deferred = False
+        self.followups: list[tuple[str, dict[str, Any]]] = []
+        self.response = SimpleNamespace(defer=self._defer, send_message=self._send)
+        self.followup = SimpleNamespace(send=self._send)
+
+    async def _defer(self, **_: Any) -> None:
+        self.deferred = True
+
+    async def _send(self, content: str, **kwargs: Any) -> None:
+        self.followups.append((content, kwargs))
+
+
+def make_bot(error: Exception) -> SimpleNamespace:
+    async def profile(*_: Any) -> None:
+        raise error
+
+    return SimpleNamespace(profiler=SimpleNamespace(running=False), profile=profile)
+
+
+@pytest.mark.parametrize(('error', 'reply'), [
+    (RuntimeError('A profiling session is already in progress'), 'A profiling session is already in progress'),
+    (OSError('Read-only file system'), 'Failed to save the profile, see logs for details'),
+])
+def test_profile_errors_answer_deferred_interaction(error: Exception, reply: str):
+    command = profile_command(make_bot(error))  # type: ignore[arg-type]
+    interaction = FakeInteraction()
+    asyncio.run(command.callback(interaction, 1.0, None))  # type: ignore[arg-type, call-arg]
+
+    assert interaction.deferred
+    assert interaction.followups == [(reply, {'ephemeral': True})]
+
+
+def test_profile_already_running():
+    bot = make_bot(AssertionError('not profiled'))
+    bot.profiler.running = True
+    interaction = FakeInteraction()
+    asyncio.run(profile_command(bot).callback(interaction))  # type: ignore[arg-type, call-arg]
+
+    assert not interaction.deferred
+    assert interaction.followups == [('A profiling session is already in progress', {'ephemeral': True})]
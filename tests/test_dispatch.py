@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import pytest
+
+from walnut.dispatch import HookDispatcher
+
+
+class RecordingHook:
+    """Hook recording the messages it handled, and how many calls ran at once"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.handled: list = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, message) -> None:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            self.handled.append(message)
+        finally:
+            self.running -= 1
+
+
+async def wait_idle(dispatcher: HookDispatcher) -> None:
+    while dispatcher.queues:
+        await asyncio.sleep(0.01)
+
+
+def test_same_destination_in_order():
+    async def main() -> list:
+        dispatcher = HookDispatcher(max_concurrency=10, hook_timeout=None)
+        handled = []
+
+        async def hook(message: int) -> None:
+            # earlier messages take longer, so they would finish last if run in parallel
+            await asyncio.sleep(0.05 - message * 0.01)
+            handled.append(message)
+
+        for i in range(5):
+            dispatcher.submit('#a', hook, i)
+        await wait_idle(dispatcher)
+        return handled
+
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+
+
+def test_destinations_run_in_parallel():
+    async def main() -> tuple[int, float]:
+        dispatcher = HookDispatcher(max_concurrency=10, hook_timeout=None)
+        hook = RecordingHook(delay=0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for channel in ('#a', '#b', '#c'):
+            dispatcher.submit(channel, hook, channel)
+        await wait_idle(dispatcher)
+        return hook.max_running, loop.time() - start
+
+    max_running, elapsed = asyncio.run(main())
+    assert max_running == 3
+    assert elapsed < 0.25
+
+
+def test_concurrency_limit():
+    async def main() -> tuple[int, int]:
+        dispatcher = HookDispatcher(max_concurrency=2, hook_timeout=None)
+        hook = RecordingHook(delay=0.02)
+        for i in range(6):
+            dispatcher.submit(f'#{i}', hook, i)
+        assert dispatcher.backlog == 6
+        await wait_idle(dispatcher)
+        return hook.max_running, len(hook.handled)
+
+    assert asyncio.run(main()) == (2, 6)
+
+
+def test_timeout_cancels_hook(caplog: pytest.LogCaptureFixture):
+    async def main() -> tuple[list, list]:
+        dispatcher = HookDispatcher(max_concurrency=10, hook_timeout=0.1)
+        slow, fast = RecordingHook(delay=1.0), RecordingHook()
+        dispatcher.submit('#a', slow, 'slow')
+        dispatcher.submit('#a', fast, 'fast')
+        await wait_idle(dispatcher)
+        return slow.handled, fast.handled
+
+    with caplog.at_level(logging.WARNING, logger='walnut.dispatch'):
+        assert asyncio.run(main()) == ([], ['fast'])
+    assert 'timed out after 0.1 seconds' in caplog.text
+
+
+def test_exception_is_isolated(caplog: pytest.LogCaptureFixture):
+    async def failing(message) -> None:
+        raise ValueError(message)
+
+    async def main() -> list:
+        dispatcher = HookDispatcher(max_concurrency=10, hook_timeout=None)
+        hook = RecordingHook()
+        dispatcher.submit('#a', failing, 'first')
+        dispatcher.submit('#a', hook, 'second')
+        dispatcher.submit('#b', hook, 'third')
+        await wait_idle(dispatcher)
+        return hook.handled
+
+    with caplog.at_level(logging.ERROR, logger='walnut.dispatch'):
+        assert sorted(asyncio.run(main())) == ['second', 'third']
+    assert 'raised an exception' in caplog.text
+    assert 'ValueError: first' in caplog.text
+
+
+def test_close_cancels_pending():
+    async def main() -> tuple[list, int]:
+        dispatcher = HookDispatcher(max_concurrency=10, hook_timeout=None)
+        hook = RecordingHook(delay=1.0)
+        dispatcher.submit('#a', hook, 1)
+        dispatcher.submit('#a', hook, 2)
+        await asyncio.sleep(0.01)
+        await dispatcher.close()
+        return hook.handled, dispatcher.backlog
+
+    assert asyncio.run(main()) == ([], 0)
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from benchmarks.loadtest import run_load
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'coalesce_window': 0.2, 'irc_users': 1},
+    {'webhooks': 2, 'webhook_limit': 3},
+    {'server_penalty': 0.01},
+], ids=['plain', 'coalesced', 'rate-limited-webhooks', 'server-flood-control'])
+def test_relays_every_message(options: dict[str, Any]):
+    results = asyncio.run(run_load(
+        relays=2,
+        rate=20,
+        duration=0.5,
+        flood_rate=200,
+        flood_burst=50,
+        drain_timeout=10,
+        **options
+    ))
+
+    assert results['messages'] > 0
+    for direction in ('irc_to_discord', 'discord_to_irc'):
+        assert results[direction]['delivered'] == results['messages']
+        assert results[direction]['lost'] == 0
+    assert results['discord_to_irc']['dropped'] == 0
+    assert results['discord_to_irc']['truncated'] == 0
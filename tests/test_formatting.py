@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from walnut.irc.formatting import (CONTROL_BOLD, CONTROL_COLOR, CONTROL_HEX_COLOR, CONTROL_ITALIC, CONTROL_MONOSPACE,
+                                   CONTROL_NON_PRINTING, CONTROL_NORMAL, CONTROL_REVERSE, CONTROL_STRIKETHROUGH,
+                                   CONTROL_UNDERLINE, bold, color, escape_markdown, italic, plain, strip_formatting,
+                                   to_markdown)
+
+CODES = [
+    CONTROL_BOLD, CONTROL_ITALIC, CONTROL_UNDERLINE, CONTROL_STRIKETHROUGH, CONTROL_MONOSPACE, CONTROL_REVERSE,
+    CONTROL_NORMAL, CONTROL_COLOR, CONTROL_COLOR + '4', CONTROL_COLOR + '04,12', CONTROL_HEX_COLOR + 'FF0000',
+]
+TEXT = ['a', 'word', ' ', '  ', '*', '**', '_', '__', '~', '|', '||', '`', '\\', '[', 'x_y', '> ', '# ', '- ', '1']
+
+formatted = st.lists(st.one_of(st.sampled_from(TEXT), st.sampled_from(CODES)), max_size=20).map(''.join)
+# a code span, an escaped character or a run of markers
+MARKDOWN = re.compile(r'`([^`]*)`|\\(.)|([*_~]+)', re.DOTALL)
+
+
+def unmarkdown(text: str) -> str:
+    """Removes markers and escapes written by to_markdown"""
+    # backticks in code are replaced with a lookalike
+    return MARKDOWN.sub(lambda match: (match.group(1) or '').replace('\u02cb', '`') or match.group(2) or '', text)
+
+
+def collapse(text: str) -> str:
+    return ' '.join(text.split())
+
+
+@pytest.mark.parametrize(('text', 'expected'), [
+    ('plain text', 'plain text'),
+    (bold('bold'), 'bold'),
+    (color('red', fg=4, bg=1), 'red'),
+    (CONTROL_COLOR + '4red', 'red'),
+    (CONTROL_HEX_COLOR + 'ff0000red' + CONTROL_HEX_COLOR, 'red'),
+    (CONTROL_COLOR + '1,2' + CONTROL_NORMAL + '3', '3'),
+    ('a' + CONTROL_REVERSE + 'b' + CONTROL_MONOSPACE, 'ab'),
+])
+def test_strip_formatting(text: str, expected: str):
+    assert strip_formatting(text) == expected
+
+
+@given(formatted)
+def test_strip_formatting_removes_control_codes(text: str):
+    stripped = strip_formatting(text)
+    assert not any(code in stripped for code in CONTROL_NON_PRINTING)
+    assert strip_formatting(stripped) == stripped
+
+
+@given(st.text(alphabet=st.characters(min_codepoint=0x20)))
+def test_strip_formatting_matches_plain(text: str):
+    assert strip_formatting(text) == plain(text)
+
+
+@pytest.mark.parametrize(('text', 'expected'), [
+    ('plain text', 'plain text'),
+    ('a *b* c', 'a \\*b\\* c'),
+    ('snake_case ~~ ||spoiler|| `code` [link]', 'snake\\_case \\~\\~ \\|\\|spoiler\\|\\| \\`code\\` \\[link]'),
+    ('see https://example.com/a_b*c, or *not*', 'see https://example.com/a_b*c, or \\*not\\*'),
+    ('back\\slash' + CONTROL_BOLD, 'back\\\\slash'),
+])
+def test_escape_markdown(text: str, expected: str):
+    assert escape_markdown(text) == expected
+    assert to_markdown(text) == expected
+
+
+@pytest.mark.parametrize(('text', 'expected'), [
+    ('> quote', '\\> quote'),
+    ('# heading', '\\# heading'),
+    ('-# subtext', '\\-# subtext'),
+    ('  - list', '  \\- list'),
+    ('#hashtag', '#hashtag'),
+    ('a > b', 'a > b'),
+])
+def test_to_markdown_escapes_block_starts(text: str, expected: str):
+    assert to_markdown(text) == expected
+
+
+@pytest.mark.parametrize(('text', 'expected'), [
+    (bold('bold'), '**bold**'),
+    (italic(bold('both')), '***both***'),
+    (CONTROL_UNDERLINE + 'under' + CONTROL_UNDERLINE, '__under__'),
+    (CONTROL_STRIKETHROUGH + 'struck', '~~struck~~'),
+    (CONTROL_MONOSPACE + 'co`de' + CONTROL_MONOSPACE, '`coˋde`'),
+    (CONTROL_MONOSPACE + bold('code') + CONTROL_MONOSPACE, '**`code`**'),
+    (CONTROL_MONOSPACE + 'a' + CONTROL_MONOSPACE + '*', '`a`\\*'),
+    ('x ' + bold(' y ') + ' z', 'x  **y**  z'),
+    (bold('a') + CONTROL_NORMAL + 'b', '**a**b'),
+    (bold('a' + CONTROL_NORMAL + 'b'), '**a**b'),
+    (color('red', fg=4) + ' ' + CONTROL_REVERSE + 'rev', 'red rev'),
+    (bold('') + italic(''), ''),
+    (bold('> not a quote'), '**\\> not a quote**'),
+])
+def test_to_markdown(text: str, expected: str):
+    assert to_markdown(text) == expected
+
+
+@given(formatted)
+def test_to_markdown_keeps_text(text: str):
+    # whitespace is moved around markers, but never lost between words
+    assert collapse(unmarkdown(to_markdown(text))) == collapse(strip_formatting(text))
+
+
+@given(formatted)
+def test_to_markdown_markers_next_to_text(text: str):
+    markdown = to_markdown(text)
+    for match in MARKDOWN.finditer(markdown):
+        if match.group(3):
+            before = markdown[match.start() - 1] if match.start() else ' '
+            after = markdown[match.end()] if match.end() < len(markdown) else ' '
+            assert not (before.isspace() and after.isspace()), markdown
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+
+from pyrcb2.itypes import IStr, Sender
+
+from benchmarks.fakes import make_bot
+from walnut.bot import WalnutBot
+from walnut.hooks.base import BaseHook
+
+
+class EchoHook(BaseHook):
+    def __init__(self, channel: str, channel_id: int):
+        self.channel = channel
+        self.channel_id = channel_id
+
+    async def handle_irc_message(self, message) -> None:
+        pass
+
+    async def handle_discord_message(self, message) -> None:
+        pass
+
+    async def handle_discord_edit(self, event) -> None:
+        pass
+
+    def load(self, bot: WalnutBot) -> None:
+        bot.irc_hooks.append(self.handle_irc_message)
+        bot.discord_hooks.append(self.handle_discord_message)
+        bot.add_irc_route(self.channel, self.handle_irc_message)
+        bot.add_discord_route(self.channel_id, self.handle_discord_message)
+        bot.add_discord_route(self.channel_id, self.handle_discord_edit, event='edit')
+
+
+def test_default_unload_removes_own_hooks_only():
+    bot = make_bot()
+    hook = EchoHook('#walnut', 1)
+    other = EchoHook('#walnut', 1)
+    hook.load(bot)
+    other.load(bot)
+
+    hook.unload(bot)
+    assert bot.irc_hooks == [other.handle_irc_message]
+    assert bot.discord_hooks == [other.handle_discord_message]
+    assert list(bot.irc_routes.values()) == [[other.handle_irc_message]]
+    assert bot.discord_routes == {1: [other.handle_discord_message]}
+    assert bot.discord_edit_routes == {1: [other.handle_discord_edit]}
+
+    other.unload(bot)
+    assert not (bot.irc_hooks or bot.discord_hooks or bot.irc_routes or bot.discord_routes)
+    assert not bot.discord_edit_routes
+
+
+def test_routes_changed_while_dispatching():
+    bot = make_bot()
+    called = []
+
+    def make_hook(name: str):
+        async def hook(message) -> None:
+            called.append(name)
+            # a reload swapping the other hooks runs while this one is awaited
+            if name == 'first':
+                bot.remove_irc_route('#walnut', second)
+                bot.add_irc_route('#walnut', make_hook('added'))
+            await asyncio.sleep(0)
+        return hook
+
+    first, second = make_hook('first'), make_hook('second')
+    bot.add_irc_route('#walnut', first)
+    bot.add_irc_route('#walnut', second)
+    network = bot.get_irc_network(None)
+    asyncio.run(bot._on_irc_message(network, Sender('someone'), IStr('#walnut'), 'hello'))
+    assert called == ['first', 'second']
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+from pyrcb2 import IRCBot
+
+from walnut.irc.formatting import CONTROL_BOLD, CONTROL_COLOR, bold, color, strip_formatting
+from walnut.irc.lines import IRC_LINE_LENGTH, message_byte_limit, pack_lines
+
+
+def byte_length(line: str) -> int:
+    return len(line.encode('utf-8'))
+
+
+def test_short_fragments_share_a_line():
+    assert pack_lines(['hello', 'world'], 100) == ['hello world']
+
+
+def test_custom_separator():
+    assert pack_lines(['hello', 'world'], 100, separator=' | ') == ['hello | world']
+
+
+def test_newlines_are_joined():
+    assert pack_lines(['hello\nworld'], 100) == ['hello world']
+
+
+def test_wraps_at_spaces():
+    assert pack_lines(['aaa bbb ccc'], 7) == ['aaa bbb', 'ccc']
+
+
+def test_prefix_on_every_line():
+    assert pack_lines(['aaa bbb ccc'], 9, prefix='<n> ') == ['<n> aaa', '<n> bbb', '<n> ccc']
+
+
+def test_prefix_without_space_raises():
+    with pytest.raises(ValueError):
+        pack_lines(['text'], 4, prefix='<nick>')
+
+
+def test_empty_text():
+    assert pack_lines([], 10) == []
+    assert pack_lines([''], 10) == []
+
+
+def test_long_words_split_between_characters():
+    lines = pack_lines(['é' * 5], 4)
+    assert lines == ['éé', 'éé', 'é']
+
+
+def test_graphemes_are_not_split():
+    family = '\N{MAN}\N{ZERO WIDTH JOINER}\N{WOMAN}\N{ZERO WIDTH JOINER}\N{GIRL}'
+    lines = pack_lines([family * 2], byte_length(family) + 3)
+    assert lines == [family, family]
+
+
+def test_formatting_reapplied_on_next_line():
+    lines = pack_lines([bold('aaa bbb')], 6)
+    assert lines == [CONTROL_BOLD + 'aaa', CONTROL_BOLD + 'bbb' + CONTROL_BOLD]
+
+
+def test_colors_reapplied_with_padding():
+    lines = pack_lines([color('aaa 1bb', fg=4, bg=1)], 10)
+    assert lines[1].startswith(CONTROL_COLOR + '04,01')
+
+
+def test_control_codes_are_not_split():
+    lines = pack_lines([color('x' * 6, fg=12)], 5)
+    assert lines == [CONTROL_COLOR + '12xx'] * 3
+
+
+def test_no_lines_of_control_codes_only():
+    lines = pack_lines([bold('x' * 4)], 5)
+    assert lines == [CONTROL_BOLD + 'xxxx']
+
+
+def test_message_byte_limit_fits_a_relayed_line():
+    limit = message_byte_limit('#walnut', 'Walnut', 'walnut', 'example.com')
+    # with the identify-msg prefix
+    line = f':Walnut!walnut@example.com PRIVMSG #walnut :+{"x" * limit}\r\n'
+    assert byte_length(line) == IRC_LINE_LENGTH
+
+
+@pytest.mark.parametrize(('username', 'hostname'), [(None, None), ('walnut', 'example.com')])
+def test_message_byte_limit_matches_pyrcb2(username: str | None, hostname: str | None):
+    irc = IRCBot()
+    irc.nickname, irc.username, irc.hostname = 'Walnut', username, hostname
+    assert message_byte_limit('#walnut', 'Walnut', username, hostname) == irc.safe_length('PRIVMSG', '#walnut')
+
+
+@pytest.mark.parametrize('text', ['ab ' * 300, 'x' * 1000, bold('ab ') * 200, '\N{CHESTNUT}' * 300])
+def test_packed_lines_are_not_split_by_pyrcb2(text: str):
+    irc = IRCBot()
+    irc.nickname = 'Walnut'
+    limit = irc.safe_length('PRIVMSG', '#walnut')
+    lines = pack_lines([text], limit, prefix='<nickname> ')
+    assert len(lines) > 1
+    for line in lines:
+        assert irc.split_string(line, limit) == [line]
+
+
+def test_message_byte_limit_assumes_long_hostmasks():
+    assert message_byte_limit('#walnut', 'Walnut') < message_byte_limit('#walnut', 'Walnut', 'w', 'h')
+
+
+words = st.lists(
+    st.one_of(
+        st.text(alphabet=st.characters(blacklist_categories=('Cc', 'Cs', 'Zs', 'Zl', 'Zp')), max_size=20),
+        st.sampled_from(['\N{CHESTNUT}', 'é', bold('b'), color('c', fg=3), CONTROL_BOLD]),
+    ),
+    max_size=30
+)
+
+
+@given(words, st.integers(min_value=12, max_value=60))
+def test_lines_fit_and_keep_text(fragments: list[str], max_bytes: int):
+    lines = pack_lines([' '.join(fragments)], max_bytes, prefix='<p> ')
+    assert all(byte_length(line) <= max_bytes for line in lines)
+    assert all(line.startswith('<p> ') for line in lines)
+
+    original = strip_formatting(' '.join(fragments)).replace(' ', '')
+    packed = ''.join(strip_formatting(line[len('<p> '):]) for line in lines).replace(' ', '')
+    assert packed == original
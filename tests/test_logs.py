@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+import pytest
+
+from walnut.config import LoggingConfig
+from walnut.logs import WIRE_LOGGER, BackgroundHandler, SamplingFilter, configure_wire_logging
+
+
+class RecordingHandler(logging.Handler):
+    """Keeps handled records, optionally blocking on the first one until released"""
+
+    def __init__(self, level: int = logging.NOTSET, block: bool = False):
+        super().__init__(level)
+        self.records: list[logging.LogRecord] = []
+        self.handling = threading.Event()
+        self.released = threading.Event()
+        if not block:
+            self.released.set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handling.set()
+        self.released.wait(timeout=10)
+        self.records.append(record)
+
+
+def make_record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.makeLogRecord({'msg': message, 'levelno': level, 'levelname': logging.getLevelName(level)})
+
+
+def test_records_written_in_order():
+    target = RecordingHandler()
+    handler = BackgroundHandler([target])
+    handler.start()
+    for index in range(100):
+        handler.handle(make_record(f'record {index}'))
+    handler.stop()
+
+    assert [record.getMessage() for record in target.records] == [f'record {index}' for index in range(100)]
+    assert handler.dropped == 0
+
+
+def test_full_queue_drops_and_counts():
+    target = RecordingHandler(block=True)
+    handler = BackgroundHandler([target], max_queue=5)
+    handler.start()
+    handler.handle(make_record('first'))
+    assert target.handling.wait(timeout=10)
+
+    # the background thread is stuck on the first record, so the queue fills up
+    for index in range(8):
+        handler.handle(make_record(f'record {index}'))
+    assert handler.dropped == 3
+
+    target.released.set()
+    handler.stop()
+    messages = [record.getMessage() for record in target.records]
+    assert messages == [
+        'first',
+        *(f'record {index}' for index in range(5)),
+        '3 log records were dropped due to a full queue',
+    ]
+    assert target.records[-1].levelno == logging.WARNING
+
+
+def test_stop_with_full_queue():
+    target = RecordingHandler()
+    handler = BackgroundHandler([target], max_queue=3)
+    for index in range(3):
+        handler.handle(make_record(f'record {index}'))
+    handler.start()
+    handler.stop()
+    assert len(target.records) == 3
+
+
+def test_handler_levels_respected():
+    target = RecordingHandler(level=logging.WARNING)
+    handler = BackgroundHandler([target])
+    handler.start()
+    handler.handle(make_record('info'))
+    handler.handle(make_record('warning', logging.WARNING))
+    handler.close()
+    assert [record.getMessage() for record in target.records] == ['warning']
+
+
+@pytest.mark.parametrize(('rate', 'passed'), [(1.0, 10), (0.5, 5), (0.1, 1), (0.3, 3)])
+def test_sampling_filter(rate: float, passed: int):
+    sampling = SamplingFilter(rate)
+    assert sum(sampling.filter(make_record('line')) for _ in range(10)) == passed
+
+
+def test_configure_wire_logging():
+    wire_logger = logging.getLogger(WIRE_LOGGER)
+    try:
+        configure_wire_logging(LoggingConfig(irc_wire='sampled', irc_wire_sample_rate=0.5))
+        configure_wire_logging(LoggingConfig(irc_wire='sampled', irc_wire_sample_rate=0.25))
+        assert wire_logger.level == logging.INFO
+        assert [f.interval for f in wire_logger.filters if isinstance(f, SamplingFilter)] == [4]
+
+        configure_wire_logging(LoggingConfig(irc_wire='off'))
+        assert not wire_logger.isEnabledFor(logging.INFO)
+        assert not any(isinstance(f, SamplingFilter) for f in wire_logger.filters)
+    finally:
+        configure_wire_logging(LoggingConfig())
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from contextlib import nullcontext
+from types import SimpleNamespace
+from typing import Callable
+
+import pytest
+from hypothesis import example, given
+from hypothesis import strategies as st
+
+from walnut.cache import LRUCache
+from walnut.discord.markdown import is_plain_text
+from walnut.hooks.relay import MessageRelay, parse_markdown
+
+# fragments of Discord markdown, mixed with plain words so that generated text is often plain
+SYNTAX = [
+    '*', '**', '_', '__', '~~', '||', '`', '```', '\\', '>', '> ', '>>> ', '# ', '## ', '- ', '+ ', '* ', '1. ', '2) ',
+    '---', '===', '[', ']', '(', ')', '<', '&', '&amp;', '|', '~', ':', '\n', '\t', ' ', '  ',
+    'https://example.com', '<https://example.com/a_b*c>', '[link](https://example.com)', 'www.example.com',
+    '<:walnut:123456789012345678>', '<a:walnut_2:1234567890123456789>', ':walnut:', '<@123456789012345678>',
+    '\N{CHESTNUT}', '​', '\xa0',
+]
+WORDS = ['walnut', 'irc', 'Discord', 'a', '1', '10', 'hello world', 'x-y', 'a.b', 'c#', 'é', '日本']
+
+text = st.lists(
+    st.one_of(st.sampled_from(SYNTAX), st.sampled_from(WORDS), st.text(max_size=3)),
+    max_size=12
+).map(''.join)
+
+
+@pytest.fixture(scope='module')
+def relay() -> MessageRelay:
+    relay = MessageRelay('#walnut', 1)
+    relay.bot = SimpleNamespace(render_cache=LRUCache(1000), measure_render=nullcontext)  # type: ignore[assignment]
+    return relay
+
+
+@given(text)
+@example('walnut')
+@example('hello world')
+@example('3.14 is not a list')
+def test_plain_text_renders_unchanged(content: str):
+    if is_plain_text(content):
+        assert parse_markdown(content) == content
+
+
+def _outcome(render: Callable[[str], str], content: str) -> str | type[Exception]:
+    # the renderer doesn't support every block, rendering should fail the same way with and without the fast path
+    try:
+        return render(content)
+    except Exception as e:  # noqa: BLE001
+        return type(e)
+
+
+@given(text)
+def test_render_markdown_matches_parser(relay: MessageRelay, content: str):
+    assert _outcome(relay.render_markdown, content) == _outcome(parse_markdown, content)
+
+
+@pytest.mark.parametrize('content', ['walnut', 'hello world', 'a.b (c) x-y', 'é 日本 \N{CHESTNUT}', '100%'])
+def test_plain_text(content: str):
+    assert is_plain_text(content)
+
+
+@pytest.mark.parametrize('content', [
+    '', ' walnut', 'walnut ', 'wal\nnut', '*walnut*', '_walnut_', '~~walnut~~', '||walnut||', '`walnut`', '\\*',
+    '> walnut', '# walnut', '- walnut', '1. walnut', '---', '<:walnut:123456789012345678>', '[a](https://b)', '&amp;',
+])
+def test_markdown_is_not_plain_text(content: str):
+    assert not is_plain_text(content)
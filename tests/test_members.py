@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+
+from benchmarks.fakes import make_bot, make_guild, make_user
+from walnut.discord.members import MemberIndex
+
+
+def make_index(*members) -> MemberIndex:
+    index = MemberIndex(1)
+    for member in members:
+        index.add(member)
+    return index
+
+
+def test_find_by_any_name():
+    index = make_index(make_user(1, 'walnut', nick='Nut', global_name='Wal Nut'))
+    assert index.find('walnut') == 1
+    assert index.find('nut') == 1
+    assert index.find('WAL NUT') == 1
+    assert index.find('missing') is None
+
+
+def test_casefolded():
+    index = make_index(make_user(1, 'straße'))
+    assert index.find('STRASSE') == 1
+
+
+def test_precedence():
+    index = make_index(
+        make_user(1, 'alice', global_name='bob'),
+        make_user(2, 'carol', nick='bob'),
+        make_user(3, 'bob'),
+    )
+    assert index.find('bob') == 3
+    index.remove(3)
+    assert index.find('bob') == 2
+    index.remove(2)
+    assert index.find('bob') == 1
+
+
+def test_shared_name_keeps_first_member():
+    index = make_index(make_user(1, 'a', nick='same'), make_user(2, 'b', nick='same'))
+    assert index.find('same') == 1
+    index.remove(1)
+    assert index.find('same') == 2
+
+
+def test_update_replaces_old_names():
+    index = make_index(make_user(1, 'walnut', nick='old'))
+    index.add(make_user(1, 'walnut', nick='new'))
+    assert index.find('old') is None
+    assert index.find('new') == 1
+    assert len(index) == 1
+
+
+def test_remove_cleans_up():
+    index = make_index(make_user(1, 'walnut', nick='nut', global_name='Walnut'))
+    index.remove(1)
+    index.remove(1)
+    assert len(index) == 0
+    assert not (index.usernames or index.nicknames or index.global_names or index.avatar_urls)
+
+
+def test_avatar_urls():
+    member = make_user(1, 'walnut')
+    default = make_user(2, 'default')
+    default.avatar = None
+    index = make_index(member, default)
+    assert index.get_avatar_url('walnut') == member.avatar.url
+    assert index.get_avatar_url('default') is None
+    assert index.get_avatar_url('missing') is None
+
+
+def test_from_guild():
+    guild = make_guild(members=10)
+    index = MemberIndex.from_guild(guild)
+    assert len(index) == 10
+    assert index.find('nick 3') == 3
+    assert index.memory_footprint() > 0
+
+
+def test_bot_updates_empty_index():
+    bot = make_bot()
+    guild = make_guild(members=1)
+    index = bot.get_member_index(guild)
+    assert index is not None
+    index.remove(0)
+
+    # an empty index is falsy, it has to be updated all the same
+    asyncio.run(bot._on_discord_member_join(make_user(5, 'joined', guild=guild)))
+    assert index.find('joined') == 5
+    asyncio.run(bot._on_discord_member_remove(make_user(5, 'joined', guild=guild)))
+    assert len(index) == 0
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from walnut.discord.message_map import MessageMap, RelayedMessage
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def from_irc(author: str, timestamp: float, webhook_id: int | None = 7) -> RelayedMessage:
+    return RelayedMessage('irc', author, f'message from {author}', webhook_id, timestamp)
+
+
+def from_discord(author: str, timestamp: float) -> RelayedMessage:
+    return RelayedMessage('discord', author, f'message from {author}', None, timestamp)
+
+
+def log_lines(file: Path) -> list[list]:
+    return [json.loads(line) for line in file.read_text(encoding='utf-8').splitlines()]
+
+
+def test_add_get_pop(clock: FakeClock):
+    messages = MessageMap(10, 60, clock=clock)
+    message = from_discord('alice', clock.now)
+    messages.add(1, message)
+    assert messages.get(1) == message
+    assert messages.get(2) is None
+    assert messages.pop(1) == message
+    assert messages.pop(1) is None
+    assert len(messages) == 0
+
+
+def test_expired_entries(clock: FakeClock):
+    messages = MessageMap(10, 60, clock=clock)
+    messages.add(1, from_irc('bob', clock.now))
+    clock.now += 61
+    assert messages.get(1) is None
+    assert messages.latest_from('bob') is None
+
+
+def test_oldest_entries_evicted(clock: FakeClock):
+    messages = MessageMap(2, 60, clock=clock)
+    for message_id in (1, 2, 3):
+        messages.add(message_id, from_discord('alice', clock.now))
+    assert messages.get(1) is None
+    assert len(messages) == 2
+
+
+def test_latest_from_irc_author(clock: FakeClock):
+    messages = MessageMap(10, 60, clock=clock)
+    messages.add(1, from_irc('Bob', clock.now))
+    messages.add(2, from_irc('bob', clock.now))
+    messages.add(3, from_discord('bob', clock.now))
+    assert messages.latest_from('BOB') == (2, from_irc('bob', clock.now))
+
+    messages.pop(2)
+    # only the latest message of an author is tracked
+    assert messages.latest_from('bob') is None
+
+
+def test_disabled(clock: FakeClock, tmp_path: Path):
+    messages = MessageMap(0, 60, tmp_path / 'map.jsonl', clock=clock)
+    messages.load()
+    messages.add(1, from_discord('alice', clock.now))
+    assert len(messages) == 0
+
+
+def test_replay(clock: FakeClock, tmp_path: Path):
+    file = tmp_path / 'map.jsonl'
+    messages = MessageMap(10, 60, file, clock=clock)
+    messages.load()
+    messages.add(1, from_irc('bob', clock.now))
+    messages.add(2, from_discord('alice', clock.now))
+    messages.add(2, from_discord('carol', clock.now))
+    messages.pop(1)
+    messages.close()
+
+    replayed = MessageMap(10, 60, file, clock=clock)
+    replayed.load()
+    assert replayed.get(1) is None
+    assert replayed.get(2) == from_discord('carol', clock.now)
+    assert replayed.latest_from('bob') is None
+    # replaced and removed entries are compacted away
+    assert log_lines(file) == [['set', 2, *from_discord('carol', clock.now)]]
+    replayed.close()
+
+
+def test_replay_skips_torn_and_expired_lines(clock: FakeClock, tmp_path: Path, caplog: pytest.LogCaptureFixture):
+    file = tmp_path / 'map.jsonl'
+    file.write_text(
+        json.dumps(['set', 1, *from_irc('old', clock.now - 120)]) + '\n'
+        + json.dumps(['set', 2, *from_irc('bob', clock.now)]) + '\n'
+        + 'not json\n'
+        + '["set", 3, "irc", "cut off',
+        encoding='utf-8'
+    )
+
+    messages = MessageMap(10, 60, file, clock=clock)
+    messages.load()
+    assert messages.get(2) == from_irc('bob', clock.now)
+    assert len(messages) == 1
+    assert 'Skipped 2 unreadable lines' in caplog.text
+    assert log_lines(file) == [['set', 2, *from_irc('bob', clock.now)]]
+    messages.close()
+
+
+def test_log_compacted_as_it_grows(clock: FakeClock, tmp_path: Path):
+    file = tmp_path / 'map.jsonl'
+    messages = MessageMap(4, 60, file, clock=clock)
+    messages.load()
+    for message_id in range(100):
+        messages.add(message_id, from_discord('alice', clock.now))
+        # entries are evicted after a new one is logged, so there can be one more than the limit
+        assert len(log_lines(file)) <= 2 * (4 + 1)
+
+    messages.close()
+    replayed = MessageMap(4, 60, file, clock=clock)
+    replayed.load()
+    assert [replayed.get(message_id) is not None for message_id in range(95, 100)] == [False, True, True, True, True]
+    replayed.close()
+
+
+def test_unwritable_file_keeps_entries_in_memory(clock: FakeClock, tmp_path: Path):
+    file = tmp_path / 'missing' / 'map.jsonl'
+    messages = MessageMap(10, 60, file, clock=clock)
+    messages.load()
+    assert messages.file is None
+    messages.add(1, from_discord('alice', clock.now))
+    assert messages.get(1) is not None
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import pytest
+
+from walnut.metrics import Counter, Gauge, Histogram, Metric, Metrics, Timer, merge_expositions
+
+
+def test_counter():
+    counter = Counter('walnut_test_total', 'Test counter', ('network', 'relay'))
+    counter.inc('default', '#a')
+    counter.inc('default', '#a', amount=2)
+    counter.inc('other', '#b', amount=0.5)
+    assert list(counter.collect()) == [
+        '# HELP walnut_test_total Test counter',
+        '# TYPE walnut_test_total counter',
+        'walnut_test_total{network="default",relay="#a"} 3',
+        'walnut_test_total{network="other",relay="#b"} 0.5',
+    ]
+
+
+def test_gauge_without_labels():
+    gauge = Gauge('walnut_test', 'Test gauge')
+    gauge.set_value(5)
+    gauge.set_value(2)
+    assert list(gauge.collect())[2:] == ['walnut_test 2']
+
+
+def test_label_values_escaped():
+    gauge = Gauge('walnut_test', 'Test gauge', ('relay',))
+    gauge.set_value(1, 'a"b\\c\nd')
+    assert list(gauge.collect())[2] == 'walnut_test{relay="a\\"b\\\\c\\nd"} 1'
+
+
+def test_function_metric():
+    metric = Metric('walnut_test', 'Test metric', ('queue',), function=lambda: {('a',): 1.0, ('b',): float('nan')})
+    assert list(metric.collect())[2:] == ['walnut_test{queue="a"} 1', 'walnut_test{queue="b"} NaN']
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('walnut_test_seconds', 'Test histogram', ('hook',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, 'relay')
+    assert list(histogram.collect())[2:] == [
+        'walnut_test_seconds_bucket{hook="relay",le="0.1"} 2',
+        'walnut_test_seconds_bucket{hook="relay",le="1"} 3',
+        'walnut_test_seconds_bucket{hook="relay",le="+Inf"} 4',
+        'walnut_test_seconds_sum{hook="relay"} 2.65',
+        'walnut_test_seconds_count{hook="relay"} 4',
+    ]
+
+
+def test_timer_counts_errors():
+    histogram = Histogram('walnut_test_seconds', 'Test histogram', ('hook',))
+    errors = Counter('walnut_test_errors_total', 'Test errors', ('hook',))
+    with Timer(histogram, ('ok',), errors):
+        pass
+    with pytest.raises(ValueError), Timer(histogram, ('failing',), errors):
+        raise ValueError
+    assert sum(histogram.observations[('ok',)][:-1]) == 1
+    assert sum(histogram.observations[('failing',)][:-1]) == 1
+    assert errors.values == {('failing',): 1.0}
+
+
+def test_render_all_metrics(tmp_path):
+    metrics = Metrics()
+    metrics.messages.inc('default', '#a', 'irc_to_discord')
+    extra = metrics.add(Gauge('walnut_extra', 'Extra gauge'))
+    extra.set_value(1)
+
+    rendered = metrics.render()
+    assert rendered.endswith('walnut_extra 1\n')
+    for metric in metrics.registry:
+        assert f'# TYPE {metric.name} {metric.kind}\n' in rendered
+
+    file = tmp_path / 'walnut.prom'
+    metrics.dump(file)
+    assert file.read_text(encoding='utf-8') == rendered
+    assert [path.name for path in tmp_path.iterdir()] == ['walnut.prom']
+
+
+def test_merge_expositions():
+    first = Metrics()
+    first.messages.inc('default', '#a', 'irc_to_discord')
+    first.render_seconds.observe(0.002)
+    second = Metrics()
+    second.messages.inc('default', '#b', 'discord_to_irc', amount=2)
+
+    merged = merge_expositions({'0': first.render(), '1': second.render()}, 'worker').splitlines()
+    assert merged.count('# HELP walnut_messages_total Messages relayed') == 1
+    assert merged.count('# TYPE walnut_messages_total counter') == 1
+    start = merged.index('# TYPE walnut_messages_total counter')
+    assert merged[start + 1:start + 3] == [
+        'walnut_messages_total{worker="0",network="default",relay="#a",direction="irc_to_discord"} 1',
+        'walnut_messages_total{worker="1",network="default",relay="#b",direction="discord_to_irc"} 2',
+    ]
+    assert 'walnut_markdown_render_seconds_bucket{worker="0",le="+Inf"} 1' in merged
+    assert 'walnut_markdown_render_seconds_count{worker="0"} 1' in merged
+
+
+def test_merge_expositions_label_forms():
+    exposition = '\n'.join([
+        '# HELP walnut_test Test metric',
+        '# TYPE walnut_test gauge',
+        'walnut_test 1',
+        'walnut_test{} 2',
+        'walnut_test{queue="a"} 3',
+        '',
+    ])
+    assert merge_expositions({'a"b': exposition}, 'worker').splitlines()[2:] == [
+        'walnut_test{worker="a\\"b"} 1',
+        'walnut_test{worker="a\\"b"} 2',
+        'walnut_test{worker="a\\"b",queue="a"} 3',
+    ]
+
+
+def test_merge_no_expositions():
+    assert merge_expositions({}, 'worker') == '\n'
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from functools import partial
+
+from pyrcb2.itypes import IStr, Sender
+
+from benchmarks.fakes import make_bot
+from benchmarks.harness import FakeIRCServer
+from walnut.config import IRCConfig
+from walnut.irc.lines import pack_lines
+from walnut.irc.message import Message
+from walnut.irc.network import IRCNetwork
+
+
+async def _noop(*_) -> None:
+    pass
+
+
+async def run_network(server: FakeIRCServer, check) -> None:
+    """Runs a network connected to a server, until `check(network, attempts)` returns"""
+    config = IRCConfig(
+        server='127.0.0.1',
+        port=server.port,
+        ssl=False,
+        nickname='Walnut',
+        username='walnut',
+        realname='Walnut',
+        flood_rate=100,
+        reconnect_delay=0.05,
+        max_reconnect_delay=0.1
+    )
+    network = IRCNetwork(config, _noop)
+    attempts: list[float] = []
+
+    async def connect() -> None:
+        attempts.append(time.monotonic())
+        await network.connect(['#walnut'])
+
+    tasks = [
+        asyncio.create_task(network.run(connect)),
+        asyncio.create_task(network.scheduler.run()),
+    ]
+    try:
+        await asyncio.wait_for(check(network, attempts), timeout=10)
+        assert not tasks[0].done()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await server.close()
+
+
+def test_alternate_nickname():
+    async def main():
+        server = FakeIRCServer()
+        server.reserved_nicknames = {IStr('Walnut')}
+        await server.start()
+
+        async def check(network: IRCNetwork, _):
+            await server.wait_for_join('#walnut')
+            assert network.nickname == 'Walnut_'
+            assert network.connected
+
+        await run_network(server, check)
+
+    asyncio.run(main())
+
+
+def test_keeps_reconnecting_while_nicknames_are_in_use():
+    async def main():
+        server = FakeIRCServer()
+        server.reserved_nicknames = {IStr('Walnut'), IStr('Walnut_'), IStr('Walnut__')}
+        await server.start()
+
+        async def check(network: IRCNetwork, attempts: list[float]):
+            while len(attempts) < 3:
+                await asyncio.sleep(0.01)
+            assert not network.connected
+            # failed attempts aren't reconnects
+            assert network.reconnects == 0
+
+            server.reserved_nicknames.clear()
+            await server.wait_for_join('#walnut')
+            # a connection may have been falling back to alternate nicknames when they were freed
+            assert network.nickname in ('Walnut', 'Walnut_', 'Walnut__')
+            assert network.connected
+
+        await run_network(server, check)
+
+    asyncio.run(main())
+
+
+def test_packed_lines_arrive_whole():
+    async def main():
+        server = FakeIRCServer()
+        await server.start()
+
+        async def check(network: IRCNetwork, _):
+            await server.wait_for_join('#walnut')
+            # pending nickname changes may make our hostmask longer
+            network.irc.pending_nicknames['WalnutWithALongerNickname'] = None
+            lines = pack_lines(['x' * 1000, 'ab ' * 300], network.message_limit('#walnut'), prefix='<nickname> ')
+            for line in lines:
+                network.scheduler.submit('#walnut', partial(network.irc.privmsg, '#walnut', line, split=False))
+            while len(server.received) < len(lines):
+                await asyncio.sleep(0.01)
+
+            assert [message.text for message in server.received] == lines
+            assert not any(message.truncated for message in server.received)
+
+        await run_network(server, check)
+
+    asyncio.run(main())
+
+
+def test_counts_reconnects():
+    async def main():
+        server = FakeIRCServer()
+        await server.start()
+
+        async def check(network: IRCNetwork, attempts: list[float]):
+            await server.wait_for_join('#walnut')
+            assert network.reconnects == 0
+
+            for reconnects in (1, 2):
+                server.disconnect_clients()
+                while network.reconnects < reconnects or not network.connected:
+                    await asyncio.sleep(0.01)
+            assert len(attempts) == 3
+
+        await run_network(server, check)
+
+    asyncio.run(main())
+
+
+def test_bot_ignores_its_own_alternate_nickname():
+    bot = make_bot()
+    network = bot.get_irc_network(None)
+    received = []
+
+    async def hook(message: Message) -> None:
+        received.append(message.author)
+
+    bot.add_irc_route('#walnut', hook)
+    network.irc.nickname = IStr('Walnut_')
+    for nickname in ('Walnut_', 'Walnut'):
+        asyncio.run(bot._on_irc_message(network, Sender(nickname), IStr('#walnut'), 'hello'))
+    # someone else may have the configured nickname
+    assert received == ['Walnut']
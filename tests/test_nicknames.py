@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from benchmarks.fakes import make_bot, make_user
+from walnut.irc.nicknames import DisplayNameCache, format_discord_user
+
+
+def test_formats_like_format_discord_user():
+    cache = DisplayNameCache(max_users=10)
+    user = make_user(1, 'walnut', global_name='Wal Nut')
+    assert cache.format_user(user) == format_discord_user(user)
+    assert cache.format_user(user, colorize=False, use_username=True) == format_discord_user(
+        user, colorize=False, use_username=True
+    )
+
+
+def test_cached_until_invalidated():
+    cache = DisplayNameCache(max_users=10)
+    user = make_user(1, 'walnut', global_name='Wal Nut')
+    first = cache.format_user(user, colorize=False, prevent_pinging=False)
+
+    user.global_name = 'Renamed'
+    assert cache.format_user(user, colorize=False, prevent_pinging=False) == first
+
+    cache.invalidate(1)
+    assert cache.format_user(user, colorize=False, prevent_pinging=False) == 'Renamed'
+    # invalidating a user which isn't cached does nothing
+    cache.invalidate(2)
+
+
+def test_cached_per_options():
+    cache = DisplayNameCache(max_users=10)
+    user = make_user(1, 'walnut', global_name='Wal Nut')
+    assert cache.format_user(user, colorize=False, prevent_pinging=False) == 'Wal Nut'
+    assert cache.format_user(user, colorize=False, prevent_pinging=False, use_username=True) == 'Wal Nut (walnut)'
+    assert cache.format_user(user, colorize=False, prevent_pinging=False, use_nickname=False) == 'walnut'
+    assert len(cache.users) == 1
+
+
+def test_cached_per_guild():
+    cache = DisplayNameCache(max_users=10)
+
+    def name(global_name: str, guild: SimpleNamespace | None) -> str:
+        user = make_user(1, 'walnut', global_name=global_name, guild=guild)
+        return cache.format_user(user, colorize=False, prevent_pinging=False)
+
+    # nicknames differ between guilds, and from the name of a user outside of guilds
+    assert name('First', SimpleNamespace(id=1)) == 'First'
+    assert name('Second', SimpleNamespace(id=2)) == 'Second'
+    assert name('Other', None) == 'Other'
+    assert name('Changed', SimpleNamespace(id=1)) == 'First'
+
+
+def test_bounded():
+    cache = DisplayNameCache(max_users=2)
+    for user_id in range(5):
+        cache.format_user(make_user(user_id, f'user{user_id}'))
+    assert len(cache.users) == 2
+
+
+def test_bot_invalidates_updated_members():
+    bot = make_bot()
+    guild = SimpleNamespace(id=1)
+    member = make_user(1, 'walnut', global_name='Before', guild=guild)
+    bot.display_names.format_user(member, colorize=False, prevent_pinging=False)
+
+    after = make_user(1, 'walnut', global_name='After', guild=guild)
+    asyncio.run(bot._on_discord_member_update(member, after))  # type: ignore[arg-type]
+    assert bot.display_names.format_user(after, colorize=False, prevent_pinging=False) == 'After'
+
+
+def test_bot_invalidates_updated_users():
+    bot = make_bot()
+    guild = SimpleNamespace(id=1, get_member=lambda _: None)
+    user = make_user(1, 'walnut', global_name='Before')
+    member = make_user(1, 'walnut', global_name='Before', guild=guild)
+    bot.display_names.format_user(user, colorize=False, prevent_pinging=False)
+    bot.display_names.format_user(member, colorize=False, prevent_pinging=False)
+
+    # global names are shared between guilds, so names cached for every guild are dropped
+    after = make_user(1, 'walnut', global_name='After')
+    after.mutual_guilds = [guild]
+    member.global_name = 'After'
+    asyncio.run(bot._on_discord_user_update(user, after))  # type: ignore[arg-type]
+    assert bot.display_names.format_user(after, colorize=False, prevent_pinging=False) == 'After'
+    assert bot.display_names.format_user(member, colorize=False, prevent_pinging=False) == 'After'
+
+
+def test_bot_invalidates_removed_members():
+    bot = make_bot()
+    member = make_user(1, 'walnut', global_name='Before', guild=SimpleNamespace(id=1))
+    bot.display_names.format_user(member)
+    asyncio.run(bot._on_discord_member_remove(member))  # type: ignore[arg-type]
+    assert len(bot.display_names.users) == 0
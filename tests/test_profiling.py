@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import pstats
+import time
+from pathlib import Path
+
+import pytest
+
+from walnut.profiling import Profiler, SamplingProfiler, SlowStepLogger
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def busy_loop(duration: float) -> None:
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    while loop.time() < end:
+        busy(0.005)
+        await asyncio.sleep(0)
+
+
+def test_cprofile(tmp_path: Path):
+    async def main() -> Path:
+        profiler = Profiler(tmp_path / 'profiles')
+        task = asyncio.create_task(profiler.profile(0.1))
+        await busy_loop(0.15)
+        return await task
+
+    file = asyncio.run(main())
+    assert file.parent == tmp_path / 'profiles'
+    assert file.suffix == '.prof'
+    stats = pstats.Stats(str(file))
+    assert any(name == 'busy' for _, _, name in stats.stats)  # type: ignore[attr-defined]
+
+
+def test_sampling(tmp_path: Path):
+    async def main() -> Path:
+        profiler = Profiler(tmp_path, sampling_interval=0.001)
+        task = asyncio.create_task(profiler.profile(0.1, mode='sampling'))
+        await busy_loop(0.15)
+        return await task
+
+    file = asyncio.run(main())
+    assert file.suffix == '.collapsed'
+    lines = file.read_text(encoding='utf-8').splitlines()
+    stacks = dict(line.rsplit(' ', 1) for line in lines)
+    assert stacks
+    assert all(int(count) > 0 for count in stacks.values())
+    # every sample is of the event loop's thread
+    assert all('run_forever (' in stack for stack in stacks)
+
+
+def test_sampling_profiler_collapses_stacks():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy(0.05)
+    profiler.stop()
+    assert sum(profiler.samples.values()) > 0
+    assert any('busy (' in stack.rsplit(';', 1)[-1] for stack in profiler.samples)
+
+
+def test_one_session_at_a_time(tmp_path: Path):
+    async def main() -> None:
+        profiler = Profiler(tmp_path)
+        task = asyncio.create_task(profiler.profile(0.05))
+        await asyncio.sleep(0)
+        assert profiler.running
+        with pytest.raises(RuntimeError):
+            await profiler.profile(0.05)
+        await task
+        assert not profiler.running
+        # another session can start once the first one finished
+        await profiler.profile(0.01)
+
+    asyncio.run(main())
+
+
+def test_unknown_mode(tmp_path: Path):
+    profiler = Profiler(tmp_path)
+    with pytest.raises(ValueError):
+        asyncio.run(profiler.profile(0.01, mode='perf'))
+    assert not profiler.running
+
+
+def test_running_reset_when_saving_fails(tmp_path: Path):
+    file = tmp_path / 'file'
+    file.touch()
+    profiler = Profiler(file / 'profiles')
+    with pytest.raises(OSError):
+        asyncio.run(profiler.profile(0.01))
+    assert not profiler.running
+
+
+def test_slow_step_logged(caplog: pytest.LogCaptureFixture):
+    async def hook() -> str:
+        await asyncio.sleep(0)
+        busy(0.05)
+        await asyncio.sleep(0)
+        return 'done'
+
+    async def main() -> str:
+        return await SlowStepLogger(hook(), 0.03, 'hook')
+
+    with caplog.at_level(logging.WARNING, logger='walnut.profiling'):
+        assert asyncio.run(main()) == 'done'
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith('hook blocked the event loop for 0.0')
+
+
+def test_fast_steps_not_logged(caplog: pytest.LogCaptureFixture):
+    async def hook() -> None:
+        for _ in range(10):
+            await asyncio.sleep(0.005)
+
+    async def main() -> None:
+        await SlowStepLogger(hook(), 0.1, 'hook')
+
+    with caplog.at_level(logging.WARNING, logger='walnut.profiling'):
+        asyncio.run(main())
+    assert not caplog.records
+
+
+def test_exceptions_propagate():
+    async def hook() -> None:
+        await asyncio.sleep(0)
+        raise ValueError('failed')
+
+    async def main() -> None:
+        await SlowStepLogger(hook(), 1.0, 'hook')
+
+    with pytest.raises(ValueError, match='failed'):
+        asyncio.run(main())
+
+
+def test_cancellation_is_thrown_into_the_coroutine():
+    cleaned_up = []
+
+    async def hook() -> None:
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cleaned_up.append(True)
+
+    async def main() -> None:
+        async def wrapped() -> None:
+            await SlowStepLogger(hook(), 1.0, 'hook')
+
+        task = asyncio.create_task(wrapped())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert cleaned_up == [True]
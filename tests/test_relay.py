@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+from types import SimpleNamespace
+
+from pyrcb2.itypes import IStr
+
+from benchmarks.fakes import WEBHOOK_URL, FakeChannel, make_bot, make_config, make_guild
+from walnut.discord.webhooks import WebhookDispatcher
+from walnut.hooks.relay import MessageRelay
+from walnut.irc.message import Message as IRCMessage
+
+
+class SlowResponse:
+    """Webhook response arriving after a delay depending on the message's author"""
+
+    def __init__(self, username: str, delays: dict[str, float], delivered: list[str]):
+        self.username = username
+        self.delays = delays
+        self.delivered = delivered
+        self.status = 204
+        self.headers: dict[str, str] = {}
+        self.content_type = 'text/plain'
+
+    async def __aenter__(self) -> SlowResponse:
+        await asyncio.sleep(self.delays.get(self.username, 0.0))
+        self.delivered.append(self.username)
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        pass
+
+
+def test_coalesced_batches_keep_order_across_authors():
+    delivered: list[str] = []
+    # the first author's webhook request is slower, it must still be posted first
+    session = SimpleNamespace(post=lambda url, json, params: SlowResponse(str(json['username']), {'A': 0.3}, delivered))
+
+    async def main():
+        config = make_config(relays=1)
+        config = replace(config, relays=[replace(config.relays[0], coalesce_window=0.05)])
+        bot = make_bot(config)
+        relay = MessageRelay.from_config(config.relays[0])
+        relay.load(bot)
+        relay.discord_channel = FakeChannel(0, make_guild(members=1))
+        relay.webhook_dispatcher = WebhookDispatcher(
+            [WEBHOOK_URL.format(id=10 ** 18), WEBHOOK_URL.format(id=2 * 10 ** 18)],
+            lambda: session
+        )
+
+        for author in ('A', 'B'):
+            message = IRCMessage(bot.irc, IStr(author), relay.irc_channel, 'hello', relay.irc_network)
+            await relay.handle_irc_message(message)
+            await asyncio.sleep(0.1)
+
+        for _ in range(100):
+            if len(delivered) == 2:
+                break
+            await asyncio.sleep(0.05)
+        await bot.close()
+
+    asyncio.run(main())
+    assert delivered == ['A', 'B']
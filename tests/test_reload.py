@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from walnut.bot import WalnutBot
+from walnut.config import Config
+from walnut.reload import ConfigReloader
+
+CONFIG = '''
+[discord]
+token = ""
+
+[irc]
+server = "localhost"
+port = 6667
+ssl = false
+nickname = "Walnut"
+
+[cache]
+message_map_dir = "{message_map_dir}"
+'''
+
+
+def write_config(file: Path, relays: list[tuple[str, int, bool]]) -> None:
+    # a regular file, so that message maps of relays with relay_edits can't be created under it
+    message_map_dir = file.parent / 'not-a-directory' / 'maps'
+    text = CONFIG.format(message_map_dir=message_map_dir.as_posix())
+    for channel, channel_id, relay_edits in relays:
+        text += (
+            f'\n[[relay]]\nirc_channel = "{channel}"\ndiscord_channel_id = {channel_id}\n'
+            f'discord_webhook_url = ""\nrelay_edits = {str(relay_edits).lower()}\n'
+        )
+    file.write_text(text, encoding='utf-8')
+
+
+def routed_channels(bot: WalnutBot) -> set[str]:
+    return {str(channel) for _, channel in bot.irc_routes}
+
+
+@pytest.fixture
+def reloader(tmp_path: Path) -> ConfigReloader:
+    (tmp_path / 'not-a-directory').write_text('', encoding='utf-8')
+    file = tmp_path / 'config.toml'
+    write_config(file, [('#a', 1, False), ('#b', 2, False)])
+    reloader = ConfigReloader(WalnutBot(Config.from_file(file)), file)
+    reloader.load()
+    return reloader
+
+
+def test_reload_adds_and_removes_relays(reloader: ConfigReloader):
+    unchanged = reloader.relays[0][1]
+    write_config(reloader.config_file, [('#a', 1, False), ('#c', 3, False)])
+
+    assert reloader.reload()
+    assert routed_channels(reloader.bot) == {'#a', '#c'}
+    assert set(reloader.bot.discord_routes) == {1, 3}
+    assert reloader.relays[0][1] is unchanged
+    assert [relay_config.irc_channel for relay_config in reloader.bot.config.relays] == ['#a', '#c']
+
+
+def test_invalid_config_is_rejected(reloader: ConfigReloader):
+    reloader.config_file.write_text('[discord', encoding='utf-8')
+
+    assert not reloader.reload()
+    assert routed_channels(reloader.bot) == {'#a', '#b'}
+
+
+def test_failed_relay_keeps_running_relays(reloader: ConfigReloader):
+    before = list(reloader.relays)
+    write_config(reloader.config_file, [('#a', 1, False), ('#c', 3, False), ('#d', 4, True)])
+
+    assert not reloader.reload()
+    assert reloader.relays == before
+    assert routed_channels(reloader.bot) == {'#a', '#b'}
+    assert set(reloader.bot.discord_routes) == {1, 2}
+    assert not reloader.bot.discord_edit_routes
+    assert [relay_config.irc_channel for relay_config in reloader.bot.config.relays] == ['#a', '#b']
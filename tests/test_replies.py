@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from walnut.discord.replies import MAX_EXCERPT_LENGTH, ReplyContext, ReplyContextCache, make_excerpt
+
+
+def test_make_excerpt():
+    assert make_excerpt('  multi\nline\t message ') == 'multi line message'
+    assert len(make_excerpt('word ' * 100)) <= MAX_EXCERPT_LENGTH
+
+
+def test_add_and_get():
+    cache = ReplyContextCache(10)
+    cache.add(1, 100, 'alice', 'hello')
+    assert cache.get(1, 100) == ReplyContext('alice', 'hello')
+    assert cache.get(1, 101) is None
+    assert cache.get(2, 100) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_channels_limited_independently():
+    cache = ReplyContextCache(2)
+    for message_id in range(5):
+        cache.add(1, message_id, 'alice', 'busy')
+    cache.add(2, 0, 'bob', 'quiet')
+    assert [cache.get(1, message_id) is not None for message_id in range(5)] == [False, False, False, True, True]
+    assert cache.get(2, 0) == ReplyContext('bob', 'quiet')
+    assert len(cache) == 3
+
+
+def test_pop_and_disabled():
+    cache = ReplyContextCache(10)
+    cache.add(1, 100, 'alice', 'x' * 500)
+    assert cache.pop(1, 100) == ReplyContext('alice', 'x' * MAX_EXCERPT_LENGTH)
+    assert cache.pop(1, 100) is None
+
+    disabled = ReplyContextCache(0)
+    disabled.add(1, 100, 'alice', 'hello')
+    assert len(disabled) == 0
+
+
+def test_save_and_load(tmp_path: Path):
+    file = tmp_path / 'replies.json'
+    cache = ReplyContextCache(10)
+    cache.add(1, 100, 'alice', 'hello')
+    cache.add(2, 200, 'bob', 'hi')
+    cache.save(file)
+    assert [path.name for path in tmp_path.iterdir()] == ['replies.json']
+
+    loaded = ReplyContextCache(1)
+    loaded.load(file)
+    assert loaded.get(1, 100) == ReplyContext('alice', 'hello')
+    assert loaded.get(2, 200) == ReplyContext('bob', 'hi')
+
+
+@pytest.mark.parametrize('content', ['', '{', '[]', json.dumps({'version': 99, 'channels': {}}), '{"version": 1}'])
+def test_damaged_file_skipped(tmp_path: Path, content: str):
+    file = tmp_path / 'replies.json'
+    file.write_text(content, encoding='utf-8')
+    cache = ReplyContextCache(10)
+    cache.load(file)
+    cache.load(tmp_path / 'missing.json')
+    assert len(cache) == 0
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from walnut.irc.scheduler import OverflowPolicy, Priority, SendScheduler, TokenBucket
+
+
+class FakeClock:
+    """Clock advanced by hand, or by the scheduler sleeping"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def make_scheduler(clock: FakeClock, rate: float = 1.0, burst: int = 2, **kwargs) -> SendScheduler:
+    return SendScheduler(rate, burst, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def drain(scheduler: SendScheduler) -> list:
+    """Returns results of all lines the rate limit allows sending now"""
+    results = []
+    while (func := scheduler.pop()) is not None:
+        results.append(func())
+    return results
+
+
+def test_bucket_starts_full(clock: FakeClock):
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_bucket_refills_at_rate(clock: FakeClock):
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    while bucket.try_acquire():
+        pass
+
+    assert bucket.delay() == pytest.approx(0.5)
+    clock.now = 0.25
+    assert not bucket.try_acquire()
+    assert bucket.delay() == pytest.approx(0.25)
+    clock.now = 0.5
+    assert bucket.delay() == 0.0
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_bucket_refills_up_to_burst(clock: FakeClock):
+    bucket = TokenBucket(rate=1.0, burst=2, clock=clock)
+    clock.now = 100.0
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+@pytest.mark.parametrize(('rate', 'burst'), [(0, 1), (-1, 1), (1, 0)])
+def test_bucket_rejects_invalid_limits(rate: float, burst: int):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, burst)
+
+
+def test_control_lines_first(clock: FakeClock):
+    scheduler = make_scheduler(clock, burst=10)
+    scheduler.submit('#a', lambda: 'message')
+    scheduler.submit('#a', lambda: 'join', Priority.CONTROL)
+    assert drain(scheduler) == ['join', 'message']
+
+
+def test_round_robin_between_targets(clock: FakeClock):
+    scheduler = make_scheduler(clock, burst=10)
+    for i in range(3):
+        scheduler.submit('#busy', lambda i=i: f'busy{i}')
+    scheduler.submit('#quiet', lambda: 'quiet')
+    assert drain(scheduler) == ['busy0', 'quiet', 'busy1', 'busy2']
+    assert scheduler.queue_depth() == 0
+
+
+def test_rate_limited(clock: FakeClock):
+    scheduler = make_scheduler(clock, rate=1.0, burst=2)
+    for i in range(4):
+        scheduler.submit('#a', lambda i=i: i)
+
+    assert drain(scheduler) == [0, 1]
+    assert scheduler.queue_depth('#a') == 2
+    clock.now = 1.0
+    assert drain(scheduler) == [2]
+
+
+def test_drop_oldest(clock: FakeClock):
+    scheduler = make_scheduler(clock, burst=10, max_queue=2, overflow='drop_oldest')
+    assert all(scheduler.submit('#a', lambda i=i: i) for i in range(3))
+    assert scheduler.dropped == 1
+    assert drain(scheduler) == [1, 2]
+
+
+def test_drop_newest(clock: FakeClock):
+    scheduler = make_scheduler(clock, burst=10, max_queue=2, overflow=OverflowPolicy.DROP_NEWEST)
+    assert [scheduler.submit('#a', lambda i=i: i) for i in range(3)] == [True, True, False]
+    assert scheduler.dropped == 1
+    assert drain(scheduler) == [0, 1]
+
+
+def test_pause_drops_control_lines(clock: FakeClock):
+    scheduler = make_scheduler(clock, burst=10)
+    scheduler.submit('#a', lambda: 'join', Priority.CONTROL)
+    scheduler.submit('#a', lambda: 'message')
+    scheduler.pause()
+    assert scheduler.paused
+    assert scheduler.queue_depth() == 1
+    scheduler.resume()
+    assert drain(scheduler) == ['message']
+
+
+def test_discard_and_clear(clock: FakeClock):
+    scheduler = make_scheduler(clock)
+    for target in ('#a', '#a', '#b'):
+        scheduler.submit(target, lambda: None)
+
+    assert scheduler.discard('#a') == 2
+    assert scheduler.discard('#missing') == 0
+    assert scheduler.queue_depth() == 1
+    scheduler.clear()
+    assert scheduler.queue_depth() == 0
+    assert scheduler.dropped == 0
+
+
+def test_run_sends_at_rate(clock: FakeClock):
+    sent: list[tuple[float, int]] = []
+
+    async def main():
+        scheduler = make_scheduler(clock, rate=2.0, burst=2)
+        for i in range(5):
+            scheduler.submit('#a', lambda i=i: sent.append((clock.now, i)))
+
+        task = asyncio.create_task(scheduler.run())
+        while len(sent) < 5:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(main())
+    assert [i for _, i in sent] == [0, 1, 2, 3, 4]
+    assert [now for now, _ in sent] == pytest.approx([0.0, 0.0, 0.5, 1.0, 1.5])
+
+
+def test_run_survives_failing_lines(clock: FakeClock):
+    sent = []
+
+    def fail():
+        raise OSError('connection lost')
+
+    async def main():
+        scheduler = make_scheduler(clock, burst=10)
+        scheduler.submit('#a', fail)
+        scheduler.submit('#a', lambda: sent.append('after'))
+        task = asyncio.create_task(scheduler.run())
+        while not sent:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(main())
+    assert sent == ['after']
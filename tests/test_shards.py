@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import math
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from benchmarks.fakes import make_bot, make_config
+from walnut.config import DiscordConfig
+from walnut.discord.shards import ShardStatus, shard_statuses
+
+GUILDS = [
+    SimpleNamespace(shard_id=0, chunked=True),
+    SimpleNamespace(shard_id=0, chunked=False),
+    SimpleNamespace(shard_id=2, chunked=True),
+]
+
+
+class ReadyClient(discord.Client):
+    """Client which appears connected, with guilds"""
+
+    @property
+    def guilds(self):
+        return [guild for guild in GUILDS if guild.shard_id == 0]
+
+    @property
+    def latency(self) -> float:
+        return 0.05
+
+    def is_ready(self) -> bool:
+        return True
+
+
+class PartlyConnectedClient(discord.AutoShardedClient):
+    """Sharded client with shard 0 connected and shard 2 not yet"""
+
+    @property
+    def guilds(self):
+        return GUILDS
+
+    @property
+    def shards(self):
+        return {0: SimpleNamespace(latency=0.1, is_closed=lambda: False)}
+
+
+def test_not_sharded_is_a_single_shard():
+    client = ReadyClient(intents=discord.Intents.none())
+    assert shard_statuses(client) == [ShardStatus(0, 0.05, True, 2, 1)]
+    assert shard_statuses(client)[0].healthy
+
+
+def test_not_connected():
+    [status] = make_bot().shard_statuses()
+    assert status.shard_id == 0
+    assert not status.connected
+    assert not status.healthy
+
+
+def test_unconnected_shard_ids():
+    bot = make_bot(make_config(discord_config=DiscordConfig(sharded=True, shard_count=4, shard_ids=[2, 0])))
+    assert isinstance(bot.discord, discord.AutoShardedClient)
+    statuses = bot.shard_statuses()
+    assert [status.shard_id for status in statuses] == [0, 2]
+    assert all(math.isnan(status.latency) and not status.healthy for status in statuses)
+
+
+def test_partly_connected():
+    client = PartlyConnectedClient(intents=discord.Intents.none(), shard_count=4, shard_ids=[0, 2])
+    connected, unconnected = shard_statuses(client)
+    assert connected == ShardStatus(0, 0.1, True, 2, 1)
+    assert connected.healthy
+    assert (unconnected.shard_id, unconnected.connected, unconnected.guilds) == (2, False, 1)
+    assert not unconnected.healthy
+
+
+def test_unmeasured_latency_is_unhealthy():
+    assert not ShardStatus(0, float('inf'), True, 0, 0).healthy
+
+
+@pytest.mark.parametrize('options', [
+    {'shard_count': 2},
+    {'shard_ids': [0]},
+    {'sharded': True, 'shard_count': 0},
+    {'sharded': True, 'shard_ids': [0]},
+    {'sharded': True, 'shard_count': 2, 'shard_ids': [2]},
+    {'sharded': True, 'shard_count': 2, 'shard_ids': [-1]},
+])
+def test_invalid_config(options: dict):
+    with pytest.raises(ValueError):
+        DiscordConfig(**options)
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'sharded': True},
+    {'sharded': True, 'shard_count': 2},
+    {'sharded': True, 'shard_count': 2, 'shard_ids': [0, 1]},
+])
+def test_valid_config(options: dict):
+    DiscordConfig(**options)
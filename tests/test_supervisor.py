@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fakes import make_config
+from walnut.supervisor import Supervisor, assign_worker, partition_relays, worker_config
+
+
+def test_partition_is_stable_and_complete():
+    config = make_config(relays=20)
+    partitions = partition_relays(config, 3)
+    assert sorted(relay.irc_channel for partition in partitions for relay in partition) == sorted(
+        relay.irc_channel for relay in config.relays
+    )
+
+    reversed_config = replace(config, relays=config.relays[::-1])
+    assert [sorted(r.irc_channel for r in p) for p in partition_relays(reversed_config, 3)] == [
+        sorted(r.irc_channel for r in p) for p in partitions
+    ]
+
+
+def test_channels_share_a_worker():
+    config = make_config(relays=1)
+    relay = config.relays[0]
+    other = replace(relay, irc_channel=relay.irc_channel.upper(), discord_channel_id=99)
+    assert assign_worker(relay, 7, 'default') == assign_worker(other, 7, 'default')
+
+
+def test_worker_config():
+    config = make_config(relays=2)
+    config = replace(config, cache_config=replace(config.cache_config, reply_file='data/replies.json'))
+
+    first = worker_config(config, 0, config.relays[:1], Path('worker-0.prom'))
+    second = worker_config(config, 1, config.relays[1:], None)
+    assert first.relays == config.relays[:1]
+    assert first.irc_config.nickname == 'Walnut'
+    assert second.irc_config.nickname == 'Walnut1'
+    assert first.cache_config.reply_file == str(Path('data/replies.worker0.json'))
+    assert second.cache_config.reply_file == str(Path('data/replies.worker1.json'))
+    assert first.metrics_config.file == 'worker-0.prom'
+    assert first.metrics_config.port is None
+    assert not (first.profiling_config.signal or first.profiling_config.command)
+
+
+def test_at_least_one_worker():
+    with pytest.raises(ValueError):
+        Supervisor(make_config(), 0)
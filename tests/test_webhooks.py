@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any
+
+import aiohttp
+import discord
+import pytest
+
+from benchmarks.fakes import WEBHOOK_URL
+from benchmarks.harness import FakeDiscordAPI
+from walnut.discord.webhooks import DEFAULT_LIMIT, DEFAULT_WINDOW, WebhookBucket, WebhookDispatcher
+
+FIRST_URL = WEBHOOK_URL.format(id=10 ** 18)
+SECOND_URL = WEBHOOK_URL.format(id=2 * 10 ** 18)
+
+
+class ScriptedResponse:
+    def __init__(self, status: int, headers: dict[str, str], data: Any = None):
+        self.status = status
+        self.headers = headers
+        self.data = data
+        self.reason = 'Scripted'
+        self.content_type = 'application/json' if data is not None else 'text/plain'
+
+    async def __aenter__(self) -> ScriptedResponse:
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        pass
+
+    async def json(self) -> Any:
+        return self.data
+
+
+class ScriptedSession:
+    """HTTP session answering with given responses in turn, then with 204s"""
+
+    def __init__(self, *responses: ScriptedResponse | Exception):
+        self.responses = list(responses)
+        # monotonic time, URL and payload of every request
+        self.requests: list[tuple[float, str, dict]] = []
+
+    def post(self, url: str, json: dict, params: dict) -> ScriptedResponse:
+        self.requests.append((time.monotonic(), url, json))
+        response = self.responses.pop(0) if self.responses else ScriptedResponse(204, {})
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def rate_limited(retry_after: float, is_global: bool = False) -> ScriptedResponse:
+    """Returns a 429 response, global ones don't report the webhook's limit"""
+    headers = {} if is_global else {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': str(retry_after)}
+    data = {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': is_global}
+    return ScriptedResponse(429, headers, data)
+
+
+def test_bucket_parses_url():
+    bucket = WebhookBucket(FIRST_URL)
+    assert bucket.webhook_id == 10 ** 18
+    assert bucket.token == 'x' * 68
+    assert bucket.url.endswith(f'/webhooks/{10 ** 18}/{"x" * 68}')
+
+
+def test_bucket_invalid_url():
+    with pytest.raises(ValueError):
+        WebhookBucket('https://example.com/webhooks/1/token')
+
+
+def test_bucket_limits_sends_per_window():
+    bucket = WebhookBucket(FIRST_URL)
+    for _ in range(DEFAULT_LIMIT):
+        assert bucket.delay(100.0) == 0.0
+        bucket.reserve()
+    assert bucket.delay(100.0) == DEFAULT_WINDOW
+    assert bucket.delay(101.5) == pytest.approx(DEFAULT_WINDOW - 1.5)
+
+    for _ in range(DEFAULT_LIMIT):
+        bucket.release()
+    assert bucket.delay(100.0 + DEFAULT_WINDOW) == 0.0
+    assert bucket.remaining == DEFAULT_LIMIT
+
+
+def test_bucket_waits_for_sends_in_flight():
+    bucket = WebhookBucket(FIRST_URL)
+    for _ in range(DEFAULT_LIMIT):
+        bucket.delay(100.0)
+        bucket.reserve()
+
+    # the window ended without any response, the sends in flight may still count against the next one
+    assert bucket.delay(110.0) == DEFAULT_WINDOW
+    bucket.release()
+    assert bucket.delay(110.0 + DEFAULT_WINDOW) == 0.0
+    assert bucket.remaining == 1
+
+
+def test_bucket_updates_from_headers():
+    bucket = WebhookBucket(FIRST_URL)
+    bucket.delay(100.0)
+    bucket.reserve()
+    bucket.reserve()
+    bucket.update({'X-RateLimit-Limit': '10', 'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset-After': '1.5'}, 100.5)
+    assert bucket.limit == 10
+    # the other send in flight isn't counted by Discord yet
+    assert bucket.remaining == 3
+    assert bucket.reset_at == 102.0
+
+
+def test_bucket_keeps_estimate_without_headers():
+    bucket = WebhookBucket(FIRST_URL)
+    bucket.delay(100.0)
+    bucket.reserve()
+    bucket.update({'X-RateLimit-Limit': '10'}, 100.5)
+    assert (bucket.limit, bucket.remaining, bucket.reset_at) == (DEFAULT_LIMIT, DEFAULT_LIMIT - 1, 102.0)
+
+
+def test_bucket_block():
+    bucket = WebhookBucket(FIRST_URL)
+    bucket.block(3.0, 100.0)
+    assert bucket.delay(100.0) == 3.0
+    # a shorter block doesn't end the current one early
+    bucket.block(1.0, 100.0)
+    assert bucket.delay(101.0) == 2.0
+
+
+def test_dispatcher_requires_urls():
+    with pytest.raises(ValueError):
+        WebhookDispatcher([], ScriptedSession)
+
+
+def test_sends_ahead_of_the_limit():
+    async def main() -> tuple[FakeDiscordAPI, WebhookDispatcher, float]:
+        api = FakeDiscordAPI(webhook_limit=5, webhook_window=0.3)
+        await api.start()
+        async with aiohttp.ClientSession() as session:
+            dispatcher = WebhookDispatcher([FIRST_URL], lambda: session)
+            started = time.monotonic()
+            with api.patch_routes():
+                await asyncio.gather(*(dispatcher.send(str(i), f'author{i}') for i in range(20)))
+            elapsed = time.monotonic() - started
+        await api.close()
+        return api, dispatcher, elapsed
+
+    api, dispatcher, elapsed = asyncio.run(main())
+    assert sorted(int(message.content) for message in api.posted) == list(range(20))
+    assert api.rate_limited == dispatcher.rate_limited == 0
+    # four windows of five requests
+    assert elapsed >= 0.9
+
+
+def test_rotates_between_webhooks():
+    async def main() -> tuple[FakeDiscordAPI, float]:
+        api = FakeDiscordAPI(webhook_limit=5, webhook_window=10.0)
+        await api.start()
+        async with aiohttp.ClientSession() as session:
+            dispatcher = WebhookDispatcher([FIRST_URL, SECOND_URL], lambda: session)
+            started = time.monotonic()
+            with api.patch_routes():
+                await asyncio.gather(*(dispatcher.send(str(i), f'author{i}') for i in range(10)))
+            elapsed = time.monotonic() - started
+        await api.close()
+        return api, elapsed
+
+    api, elapsed = asyncio.run(main())
+    assert Counter(message.channel_id for message in api.posted) == {10 ** 18: 5, 2 * 10 ** 18: 5}
+    assert api.rate_limited == 0
+    # neither webhook had to wait for its window to end
+    assert elapsed < 1.0
+
+
+def test_messages_of_an_author_stay_in_order():
+    async def main() -> list[str]:
+        api = FakeDiscordAPI(latency=0.01)
+        await api.start()
+        async with aiohttp.ClientSession() as session:
+            dispatcher = WebhookDispatcher([FIRST_URL, SECOND_URL], lambda: session)
+            with api.patch_routes():
+                await asyncio.gather(*(dispatcher.send(str(i), 'author') for i in range(10)))
+        await api.close()
+        return [message.content for message in api.posted]
+
+    assert asyncio.run(main()) == [str(i) for i in range(10)]
+
+
+def test_requeues_rate_limited_sends():
+    session = ScriptedSession(rate_limited(0.2))
+
+    async def main() -> WebhookDispatcher:
+        dispatcher = WebhookDispatcher([FIRST_URL], lambda: session)
+        await dispatcher.send('hello', 'author')
+        return dispatcher
+
+    dispatcher = asyncio.run(main())
+    assert dispatcher.rate_limited == 1
+    (first, _, payload), (retry, _, retried) = session.requests
+    assert retry - first >= 0.2
+    assert payload == retried == {'content': 'hello', 'username': 'author'}
+
+
+@pytest.mark.parametrize('is_global', [False, True])
+def test_global_rate_limit_blocks_every_webhook(is_global: bool):
+    session = ScriptedSession(rate_limited(0.2, is_global))
+
+    async def main() -> None:
+        dispatcher = WebhookDispatcher([FIRST_URL, SECOND_URL], lambda: session)  # type: ignore[arg-type, return-value]
+        await dispatcher.send('hello', 'author')
+
+    asyncio.run(main())
+    (first, first_url, _), (retry, retry_url, _) = session.requests
+    if is_global:
+        assert retry - first >= 0.2
+    else:
+        # retried right away through the other webhook
+        assert retry - first < 0.2
+        assert retry_url != first_url
+
+
+def test_raises_errors():
+    session = ScriptedSession(
+        ScriptedResponse(404, {}, {'message': 'Unknown Webhook', 'code': 10015}),
+        aiohttp.ClientConnectionError('connection reset'),
+    )
+
+    async def main() -> None:
+        dispatcher = WebhookDispatcher([FIRST_URL], lambda: session)
+        with pytest.raises(discord.HTTPException):
+            await dispatcher.send('first', 'author')
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await dispatcher.send('second', 'author')
+        # the dispatcher keeps working after failures
+        await dispatcher.send('third', 'author')
+        assert dispatcher.backlog == 0
+
+    asyncio.run(main())
+    assert [payload['content'] for _, _, payload in session.requests] == ['first', 'second', 'third']
@@ -1,4 +1,18 @@
-from walnut.bot import WalnutBot
-from walnut.config import Config
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from walnut.bot import WalnutBot
+    from walnut.config import Config
 
 __all__ = ["Config", "WalnutBot"]
+
+
+def __getattr__(name: str) -> Any:
+    # imported on first use, so that the CLI and submodules don't pay for discord.py and aiohttp upfront
+    if name == 'Config':
+        from walnut.config import Config
+        return Config
+    if name == 'WalnutBot':
+        from walnut.bot import WalnutBot
+        return WalnutBot
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,13 +1,10 @@
 import shutil
 import sys
+from functools import partial
 from pathlib import Path
 
 import click
 
-from walnut.bot import WalnutBot
-from walnut.config import Config
-from walnut.hooks.relay import MessageRelay
-
 CONTEXT_SETTINGS = {'help_option_names': ['-h', '--help']}
 
 
@@ -23,14 +20,50 @@ def cli():
     type=Path,
     help='Configuration file'
 )
-def run(config_file: Path) -> None:
-    """Starts the bot with configured relays"""
+@click.option(
+    '--profile', 'profile_duration',
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help='Profile the bot for this many seconds after starting'
+)
+@click.option(
+    '-w', '--workers',
+    type=click.IntRange(min=1),
+    default=1,
+    help='Split relays between this many worker processes'
+)
+@click.option(
+    '--watch',
+    is_flag=True,
+    help='Reload relays when the configuration file changes'
+)
+def run(config_file: Path, profile_duration: float | None, workers: int, watch: bool) -> None:
+    """
+    Starts the bot with configured relays
+
+    Send SIGHUP to reload relays, except with multiple workers, which have to be restarted instead.
+    """
+    # imported here, so that other commands start without loading discord.py, aiohttp and pyrcb2
+    from walnut.bot import WalnutBot
+    from walnut.config import Config
+    from walnut.reload import ConfigReloader
+    from walnut.supervisor import Supervisor
+
     config = Config.from_file(config_file)
+    if workers > 1:
+        if profile_duration is not None:
+            raise click.UsageError('--profile cannot be used with multiple workers')
+        if watch:
+            raise click.UsageError('--watch cannot be used with multiple workers')
+        Supervisor(config, workers).run()
+        return
+
     bot = WalnutBot(config)
-    for relay_config in config.relays:
-        MessageRelay.from_config(relay_config).load(bot)
+    reloader = ConfigReloader(bot, config_file)
+    reloader.load()
+    bot.add_background_task(partial(reloader.run, watch=watch))
 
-    bot.run()
+    bot.run(profile_duration=profile_duration)
 
 
 @cli.command()
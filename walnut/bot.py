@@ -1,13 +1,38 @@
 import asyncio
-from typing import Any, Callable, Coroutine
+import logging
+import signal
+import time
+from contextlib import AbstractContextManager, nullcontext
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Coroutine, Iterable, TypeAlias
 
+import aiohttp
 import discord
-from pyrcb2.events import Event
 from pyrcb2.itypes import IStr, Sender
 from pyrcb2.pyrcb2 import IRCBot
 
+from walnut.cache import LRUCache
 from walnut.config import Config
+from walnut.discord.commands import profile_command
+from walnut.discord.members import MemberIndex
+from walnut.discord.replies import ReplyContextCache
+from walnut.discord.shards import ShardStatus, shard_statuses
+from walnut.dispatch import HookDispatcher
 from walnut.irc.message import Message as IRCMessage
+from walnut.irc.network import IRCNetwork
+from walnut.irc.nicknames import DisplayNameCache
+from walnut.irc.scheduler import SendScheduler
+from walnut.logs import BackgroundHandler, configure_wire_logging, setup_logging
+from walnut.metrics import Counter, Gauge, Metrics, Timer
+from walnut.profiling import Profiler, SlowStepLogger
+
+logger = logging.getLogger(__name__)
+
+IRCHook: TypeAlias = Callable[[IRCMessage], Coroutine[Any, Any, None]]
+DiscordHook: TypeAlias = Callable[[discord.Message], Coroutine[Any, Any, None]]
+DiscordEventHook: TypeAlias = Callable[[Any], Coroutine[Any, Any, None]]
 
 
 class WalnutBot:
@@ -15,11 +40,27 @@ class WalnutBot:
 
     Attributes:
         config: Bot configuration
-        discord (discord.Client): Discord client
-        irc (pyrcb2.IRCBot): Discord client
+        discord (discord.Client): Discord client, a discord.AutoShardedClient if sharding is enabled
+        irc_networks (dict): Network name -> connection to the IRC network, the first one is the default
+        irc (pyrcb2.IRCBot): IRC client of the default network
+        irc_scheduler (SendScheduler): Rate limited queue of outgoing IRC lines of the default network
         tree (discord.app_commands.CommandTree): Discord command tree
-        irc_hooks (list): List of hooks called with incoming IRC messages
-        discord_hooks (list): List of hooks called with incoming Discord messages
+        http_session (aiohttp.ClientSession): HTTP connection pool shared by all hooks, see get_http_session()
+        dispatcher (HookDispatcher): Runs hooks concurrently, None if hooks are called sequentially
+        render_cache (LRUCache): Cache of Discord markdown rendered as IRC formatting
+        member_indexes (dict): Guild ID -> name index of the guild's members, built on first use
+        display_names (DisplayNameCache): Cache of Discord user names formatted for IRC
+        reply_contexts (ReplyContextCache): Authors and excerpts of recently relayed messages, shown with replies
+        metrics (Metrics): Collected metrics, None if disabled
+        log_handler (BackgroundHandler): Writes logs on a background thread, None unless set up by run()
+        profiler (Profiler): Profiles the bot on demand, see profile()
+        irc_hooks (list): List of hooks called with every incoming IRC message
+        discord_hooks (list): List of hooks called with every incoming Discord message
+        irc_routes (dict): Hooks called only with messages from a given IRC network and channel
+        discord_routes (dict): Hooks called only with messages from a given Discord channel ID
+        discord_edit_routes (dict): Hooks called only with edits of messages in a given Discord channel ID
+        discord_delete_routes (dict): Hooks called only with deletions of messages in a given Discord channel ID
+        background_tasks (list): Coroutine functions started as tasks when the bot is run
     """
 
     def __init__(self, config: Config):
@@ -30,23 +71,235 @@ class WalnutBot:
         intents.members = True  # type: ignore[assignment]
         intents.message_content = True  # type: ignore[assignment]
 
-        self.discord = discord.Client(intents=intents)
+        self.discord: discord.Client
+        if config.discord_config.sharded:
+            # events of every shard are delivered to the same handlers, so hooks don't need to know about shards
+            self.discord = discord.AutoShardedClient(
+                intents=intents,
+                shard_count=config.discord_config.shard_count,
+                shard_ids=config.discord_config.shard_ids
+            )
+        else:
+            self.discord = discord.Client(intents=intents)
         # since we can't call self.discord.Event as a decorator, we do it manually
         self.discord.on_message = self._on_discord_message  # type: ignore[attr-defined]
+        # raw events are delivered for messages outside of discord.py's message cache too
+        self.discord.on_raw_message_edit = self._on_discord_raw_message_edit  # type: ignore[attr-defined]
+        self.discord.on_raw_message_delete = self._on_discord_raw_message_delete  # type: ignore[attr-defined]
+        self.discord.on_member_join = self._on_discord_member_join  # type: ignore[attr-defined]
+        self.discord.on_member_update = self._on_discord_member_update  # type: ignore[attr-defined]
+        self.discord.on_member_remove = self._on_discord_member_remove  # type: ignore[attr-defined]
+        self.discord.on_user_update = self._on_discord_user_update  # type: ignore[attr-defined]
+        self.discord.on_guild_remove = self._on_discord_guild_remove  # type: ignore[attr-defined]
+        self.discord.on_shard_ready = self._on_discord_shard_ready  # type: ignore[attr-defined]
+        self.discord.on_shard_disconnect = self._on_discord_shard_disconnect  # type: ignore[attr-defined]
+        self.discord.on_shard_resumed = self._on_discord_shard_resumed  # type: ignore[attr-defined]
         self.tree = discord.app_commands.CommandTree(self.discord)
 
-        self.irc = IRCBot(log_communication=True)
-        self.irc.load_events(self)
+        configure_wire_logging(config.logging_config)
+        self.log_handler: BackgroundHandler | None = None
+
+        # all networks share the event loop, the Discord client and hooks
+        self.irc_networks: dict[str, IRCNetwork] = {
+            irc_config.name: IRCNetwork(irc_config, self._on_irc_message)
+            for irc_config in config.irc_configs
+        }
+
+        self.http_session: aiohttp.ClientSession | None = None
+        self.render_cache: LRUCache[tuple[Any, str], str] = LRUCache(
+            max_entries=config.cache_config.render_entries,
+            max_bytes=config.cache_config.render_bytes,
+            sizeof=lambda key, value: len(key[1].encode('utf-8')) + len(value.encode('utf-8'))
+        )
+        self.member_indexes: dict[int, MemberIndex] = {}
+        self.display_names = DisplayNameCache(config.cache_config.display_name_users)
+        self.reply_contexts = ReplyContextCache(config.cache_config.reply_messages)
+        if config.cache_config.reply_file is not None:
+            self.reply_contexts.load(Path(config.cache_config.reply_file))
+        self.dispatcher: HookDispatcher | None = None
+        if config.dispatch_config.mode == 'concurrent':
+            self.dispatcher = HookDispatcher(
+                max_concurrency=config.dispatch_config.max_concurrency,
+                hook_timeout=config.dispatch_config.hook_timeout
+            )
+
+        self.irc_hooks: list[IRCHook] = []
+        self.discord_hooks: list[DiscordHook] = []
+        self.irc_routes: dict[tuple[str, IStr], list[IRCHook]] = {}
+        self.discord_routes: dict[int, list[DiscordHook]] = {}
+        self.discord_edit_routes: dict[int, list[DiscordEventHook]] = {}
+        self.discord_delete_routes: dict[int, list[DiscordEventHook]] = {}
+        self.background_tasks: list[Callable[[], Coroutine[Any, Any, None]]] = []
+
+        self.profiler = Profiler(
+            output_dir=Path(config.profiling_config.output_dir),
+            mode=config.profiling_config.mode,
+            sampling_interval=config.profiling_config.sampling_interval
+        )
+        if config.profiling_config.command:
+            self.add_discord_command(profile_command(self))
+
+        self.metrics: Metrics | None = None
+        if config.metrics_config.enabled:
+            self.metrics = Metrics()
+            self.metrics.backlog.function = self._collect_backlog
+            self.metrics.add(Counter(
+                'walnut_irc_dropped_lines_total',
+                'IRC lines dropped due to a full queue',
+                ('network',),
+                function=lambda: {(name,): network.scheduler.dropped for name, network in self.irc_networks.items()}
+            ))
+            self.metrics.add(Counter(
+                'walnut_irc_reconnects_total',
+                'Times the connection to an IRC network was reestablished',
+                ('network',),
+                function=lambda: {(name,): network.reconnects for name, network in self.irc_networks.items()}
+            ))
+            self.metrics.add(Gauge(
+                'walnut_irc_connected',
+                'Whether an IRC network is connected',
+                ('network',),
+                function=lambda: {(name,): network.connected for name, network in self.irc_networks.items()}
+            ))
+            self.metrics.add(Counter(
+                'walnut_log_records_dropped_total',
+                'Log records dropped due to a full queue',
+                function=lambda: {(): self.log_handler.dropped if self.log_handler is not None else 0}
+            ))
+            self.metrics.add(Counter(
+                'walnut_reply_context_lookups_total',
+                'Lookups of replied to messages in the reply context cache',
+                ('result',),
+                function=lambda: {('hit',): self.reply_contexts.hits, ('miss',): self.reply_contexts.misses}
+            ))
+            self.metrics.add(Gauge(
+                'walnut_discord_shard_up',
+                'Whether a Discord shard is connected',
+                ('shard',),
+                function=lambda: {(str(s.shard_id),): s.connected for s in self.shard_statuses()}
+            ))
+            self.metrics.add(Gauge(
+                'walnut_discord_shard_latency_seconds',
+                'Heartbeat latency of a Discord shard',
+                ('shard',),
+                function=lambda: {(str(s.shard_id),): s.latency for s in self.shard_statuses()}
+            ))
+            self.metrics.add(Gauge(
+                'walnut_discord_shard_guilds',
+                'Guilds handled by a Discord shard',
+                ('shard',),
+                function=lambda: {(str(s.shard_id),): s.guilds for s in self.shard_statuses()}
+            ))
 
-        self.irc_hooks: list[Callable[[IRCMessage], Coroutine[Any, Any, None]]] = []
-        self.discord_hooks: list[Callable[[discord.Message], Coroutine[Any, Any, None]]] = []
+        # hooks are called directly, unless they need to be wrapped for measurements
+        self._instrument_hooks = self.metrics is not None or config.profiling_config.slow_step_threshold is not None
+
+    def run(self, profile_duration: float | None = None) -> None:
+        """
+        Starts the bot and connects to Discord and IRC
+
+        Logging is set up as configured, unless the root logger already has handlers.
+
+        Args:
+            profile_duration: If set, profiles the bot for this many seconds after starting
+        """
+        if not logging.getLogger().handlers:
+            self.log_handler = setup_logging(self.config.logging_config)
 
-    def run(self) -> None:
-        """Starts the bot and connects to Discord and IRC"""
         loop = asyncio.new_event_loop()
         loop.create_task(self.discord.start(self.config.discord_token))
-        loop.create_task(self.irc.run(self._on_irc_connect()))
-        loop.run_forever()
+        for network in self.irc_networks.values():
+            loop.create_task(network.run(partial(self._on_irc_connect, network)))
+            loop.create_task(network.scheduler.run())
+        for func in self.background_tasks:
+            loop.create_task(func())
+        if self.metrics is not None:
+            loop.create_task(self._export_metrics(self.metrics))
+        if profile_duration is not None:
+            loop.create_task(self._profile_and_log(profile_duration))
+        if self.config.profiling_config.signal:
+            self._add_profile_signal_handler(loop)
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            loop.run_until_complete(self.close())
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            if self.log_handler is not None:
+                logging.getLogger().removeHandler(self.log_handler)
+                self.log_handler.close()
+                self.log_handler = None
+
+    async def close(self) -> None:
+        """Closes the Discord connection and the shared HTTP connection pool, saving reply contexts if configured"""
+        if self.dispatcher is not None:
+            await self.dispatcher.close()
+        if self.metrics is not None:
+            await self.metrics.close()
+        await self.discord.close()
+        if self.http_session is not None:
+            await self.http_session.close()
+            self.http_session = None
+        if self.config.cache_config.reply_file is not None:
+            self.reply_contexts.save(Path(self.config.cache_config.reply_file))
+
+    def get_http_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the HTTP session shared by all hooks, creating it on first use
+
+        Connections are kept alive and reused between requests, up to a configured pool size.
+        Must be called from within the running event loop.
+        """
+        if self.http_session is None or self.http_session.closed:
+            self.http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.config.http_config.pool_size,
+                    keepalive_timeout=self.config.http_config.keepalive_timeout
+                )
+            )
+        return self.http_session
+
+    @property
+    def irc(self) -> IRCBot:
+        """IRC client of the default network"""
+        return self.get_irc_network().irc
+
+    @property
+    def irc_scheduler(self) -> SendScheduler:
+        """Rate limited queue of outgoing IRC lines of the default network"""
+        return self.get_irc_network().scheduler
+
+    def get_irc_network(self, name: str | None = None) -> IRCNetwork:
+        """
+        Returns an IRC network by name, or the default network
+
+        Raises:
+            ValueError: No network with a given name is configured
+        """
+        if name is None:
+            name = self.config.irc_config.name
+        try:
+            return self.irc_networks[name]
+        except KeyError:
+            raise ValueError(f'Unknown IRC network "{name}"') from None
+
+    async def profile(self, duration: float | None = None, mode: str | None = None) -> Path:
+        """
+        Profiles the bot while it keeps running, see Profiler.profile()
+
+        Args:
+            duration: Seconds to profile for, defaults to the configured duration
+            mode: "cprofile" or "sampling", defaults to the configured mode
+
+        Returns:
+            Path: Path of the written profile
+        """
+        return await self.profiler.profile(duration or self.config.profiling_config.duration, mode)
 
     def add_discord_command(
         self,
@@ -55,34 +308,302 @@ class WalnutBot:
         """Adds a Discord command to the CommandTree"""
         return self.tree.add_command(command)
 
-    async def _on_irc_connect(self) -> None:
-        await self.irc.connect(
-            hostname=self.config.irc_config.server,
-            port=self.config.irc_config.port,
-            ssl=self.config.irc_config.ssl
-        )
-        await self.irc.register(
-            nickname=self.config.irc_config.nickname,
-            username=self.config.irc_config.username,
-            realname=self.config.irc_config.realname,
-            password=self.config.irc_config.password
+    def send_irc_message(
+        self,
+        target: str,
+        content: str,
+        network: str | None = None,
+        notice: bool = False,
+        split: bool = True
+    ) -> bool:
+        """
+        Queues an IRC message to be sent, respecting the server's flood limits
+
+        Args:
+            target: Channel or nickname to send the message to
+            content: Message text
+            network: Name of the IRC network, the default network if None
+            notice: Whether to send a NOTICE instead of a PRIVMSG
+            split: Whether to split text too long for a single line,
+                False if it was already packed to fit irc_message_limit()
+
+        Returns:
+            bool: False if the message was dropped due to a full queue
+        """
+        irc_network = self.get_irc_network(network)
+        func = partial(irc_network.irc.notice if notice else irc_network.irc.privmsg, target, content, split=split)
+        if self.metrics is not None:
+            func = partial(self._send_irc_measured, self.metrics, func, time.perf_counter())
+        return irc_network.scheduler.submit(target, func)
+
+    def measure_send(self, transport: str) -> AbstractContextManager:
+        """
+        Returns a context manager timing a send over a given transport, and counting failures
+
+        Does nothing if metrics are disabled.
+        """
+        if self.metrics is None:
+            return nullcontext()
+        return Timer(self.metrics.send_seconds, (transport,), self.metrics.send_errors)
+
+    def measure_render(self) -> AbstractContextManager:
+        """Returns a context manager timing markdown rendering, does nothing if metrics are disabled"""
+        if self.metrics is None:
+            return nullcontext()
+        return Timer(self.metrics.render_seconds, ())
+
+    def irc_message_limit(self, target: str, network: str | None = None) -> int:
+        """Returns the maximum length in bytes of a message sent to a given target, which won't be cut off"""
+        return self.get_irc_network(network).message_limit(target)
+
+    def shard_statuses(self) -> list[ShardStatus]:
+        """Returns the health of every Discord shard, a bot which isn't sharded has a single shard"""
+        return shard_statuses(self.discord)
+
+    def get_member_index(self, guild: discord.Guild) -> MemberIndex | None:
+        """
+        Returns a name index of the guild's members, building it on first use
+
+        Returns None until the guild's members are fully cached (chunked),
+        since a partial index would not be updated with members received later.
+        """
+        index = self.member_indexes.get(guild.id)
+        if index is None:
+            if not guild.chunked:
+                return None
+            index = self.member_indexes[guild.id] = MemberIndex.from_guild(guild)
+        return index
+
+    def get_member_avatar_url(self, guild: discord.Guild, name: str) -> str | None:
+        """Returns the avatar URL of a guild member with a given name, None if not found or using a default avatar"""
+        index = self.get_member_index(guild)
+        if index is None:
+            member = guild.get_member_named(name)
+            return member.avatar.url if member and member.avatar else None
+        return index.get_avatar_url(name)
+
+    def add_irc_route(self, channel: str, hook: IRCHook, network: str | None = None) -> None:
+        """Adds a hook called only with messages from a given IRC channel (case-insensitive) of a network"""
+        key = (self.get_irc_network(network).name, IStr(channel))
+        self.irc_routes.setdefault(key, []).append(hook)
+
+    def add_discord_route(self, channel_id: int, hook: DiscordEventHook, event: str = 'message') -> None:
+        """
+        Adds a hook called only with events from a given Discord channel ID
+
+        Args:
+            channel_id: Discord channel ID
+            hook: Coroutine function called with every event
+            event: "message" for new messages, called with a discord.Message,
+                "edit" or "delete" for edits and deletions, called with a discord.RawMessageUpdateEvent
+                or a discord.RawMessageDeleteEvent, whether or not discord.py has the message cached
+        """
+        self._discord_routes(event).setdefault(channel_id, []).append(hook)
+
+    def remove_irc_route(self, channel: str, hook: IRCHook, network: str | None = None) -> None:
+        """Removes a hook added with add_irc_route()"""
+        key = (self.get_irc_network(network).name, IStr(channel))
+        hooks = self.irc_routes.get(key, [])
+        if hook in hooks:
+            hooks.remove(hook)
+        if not hooks:
+            self.irc_routes.pop(key, None)
+
+    def remove_discord_route(self, channel_id: int, hook: DiscordEventHook, event: str = 'message') -> None:
+        """Removes a hook added with add_discord_route()"""
+        routes = self._discord_routes(event)
+        hooks = routes.get(channel_id, [])
+        if hook in hooks:
+            hooks.remove(hook)
+        if not hooks:
+            routes.pop(channel_id, None)
+
+    def remove_hooks(self, owner: object) -> None:
+        """Removes all hooks and routes which are methods of an object, such as a hook being unloaded"""
+        def owned(hook: Any) -> bool:
+            return getattr(hook, '__self__', None) is owner
+
+        hook_lists: tuple[list[Any], ...] = (self.irc_hooks, self.discord_hooks)
+        for hooks in hook_lists:
+            hooks[:] = [hook for hook in hooks if not owned(hook)]
+
+        route_maps: tuple[dict[Any, list[Any]], ...] = (
+            self.irc_routes, self.discord_routes, self.discord_edit_routes, self.discord_delete_routes
         )
+        for routes in route_maps:
+            for key, hooks in list(routes.items()):
+                hooks[:] = [hook for hook in hooks if not owned(hook)]
+                if not hooks:
+                    del routes[key]
+
+    def _discord_routes(self, event: str) -> dict[int, list[DiscordEventHook]]:
+        if event == 'message':
+            return self.discord_routes  # type: ignore[return-value]
+        if event == 'edit':
+            return self.discord_edit_routes
+        if event == 'delete':
+            return self.discord_delete_routes
+        raise ValueError(f'Unknown Discord event "{event}", expected "message", "edit" or "delete"')
 
-        for relay in self.config.relays:
-            await self.irc.join(relay.irc_channel)
+    def add_background_task(self, func: Callable[[], Coroutine[Any, Any, None]]) -> None:
+        """Adds a coroutine function, started as a task when the bot is run"""
+        self.background_tasks.append(func)
+
+    async def _on_irc_connect(self, network: IRCNetwork) -> None:
+        await network.connect(
+            relay.irc_channel
+            for relay in self.config.relays
+            if (relay.irc_network or self.config.irc_config.name) == network.name
+        )
 
-    @Event.privmsg  # type: ignore[attr-defined]
-    async def _on_irc_message(self, sender: Sender, channel: IStr, message: str) -> None:
-        if sender == self.config.irc_config.nickname:
+    async def _on_irc_message(self, network: IRCNetwork, sender: Sender, channel: IStr, message: str) -> None:
+        # the nickname may be an alternate one, if the configured one was in use
+        if sender == network.nickname:
             return
 
-        obj = IRCMessage(self.irc, sender, channel, message)
-        for hook in self.irc_hooks:
-            await hook(obj)
+        obj = IRCMessage(network.irc, sender, channel, message, network.name)
+        key = (network.name, channel)
+        await self._dispatch('irc', chain(self.irc_hooks, self.irc_routes.get(key, ())), key, obj)
 
     async def _on_discord_message(self, message: discord.Message) -> None:
         if message.author == self.discord.user:
             return
 
-        for hook in self.discord_hooks:
-            await hook(message)
+        channel_id = message.channel.id
+        hooks = chain(self.discord_hooks, self.discord_routes.get(channel_id, ()))
+        await self._dispatch('discord', hooks, channel_id, message)
+
+    async def _on_discord_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        hooks = self.discord_edit_routes.get(payload.channel_id)
+        if hooks:
+            await self._dispatch('discord', hooks, payload.channel_id, payload)
+
+    async def _on_discord_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        hooks = self.discord_delete_routes.get(payload.channel_id)
+        if hooks:
+            await self._dispatch('discord', hooks, payload.channel_id, payload)
+
+    async def _dispatch(
+        self,
+        source: str,
+        hooks: Iterable[Callable[[Any], Coroutine[Any, Any, None]]],
+        channel: Any,
+        message: Any
+    ) -> None:
+        # a reload can add and remove hooks while earlier ones are awaited, call the ones routed at this point
+        hooks = tuple(hooks)
+        if self.dispatcher is None:
+            for hook in hooks:
+                if self._instrument_hooks:
+                    await self._call_hook(source, hook, message)
+                else:
+                    await hook(message)
+            return
+
+        # each hook is its own destination, messages stay ordered per hook and source channel.
+        # hooks bound to the same object share one, so that e.g. an edit is never handled before the message
+        for hook in hooks:
+            call: Callable[[Any], Coroutine[Any, Any, None]] = (
+                partial(self._call_hook, source, hook) if self._instrument_hooks else hook
+            )
+            self.dispatcher.submit((getattr(hook, '__self__', hook), channel), call, message)
+
+    async def _call_hook(self, source: str, hook: Callable[[Any], Coroutine[Any, Any, None]], message: Any) -> None:
+        """Calls a hook, measuring it and logging steps which block the event loop, as configured"""
+        coro = hook(message)
+        awaitable: Awaitable[None] = coro
+        threshold = self.config.profiling_config.slow_step_threshold
+        if threshold is not None:
+            # the hook's repr names the relay, e.g. <bound method MessageRelay.handle_irc_message of <MessageRelay ...>>
+            awaitable = SlowStepLogger(coro, threshold, repr(hook))
+
+        if self.metrics is None:
+            await awaitable
+            return
+
+        name = getattr(hook, '__qualname__', type(hook).__name__)
+        with Timer(self.metrics.hook_seconds, (source, name), self.metrics.hook_errors):
+            await awaitable
+
+    @staticmethod
+    def _send_irc_measured(metrics: Metrics, func: Callable[[], Any], queued_at: float) -> None:
+        try:
+            func()
+        except Exception:
+            metrics.send_errors.inc('irc')
+            raise
+        finally:
+            # includes the time spent waiting for flood control
+            metrics.send_seconds.observe(time.perf_counter() - queued_at, 'irc')
+
+    def _collect_backlog(self) -> dict[tuple[str, ...], float]:
+        backlog: dict[tuple[str, ...], float] = {
+            ('dispatch',): self.dispatcher.backlog if self.dispatcher is not None else 0,
+        }
+        for name, network in self.irc_networks.items():
+            backlog[(f'irc_send:{name}',)] = network.scheduler.queue_depth()
+        # how far behind every relayed channel is on IRC
+        for name, channel in self.irc_routes:
+            backlog[(f'irc_send:{name}/{channel}',)] = self.irc_networks[name].scheduler.queue_depth(channel)
+        return backlog
+
+    def _add_profile_signal_handler(self, loop: asyncio.AbstractEventLoop) -> None:
+        signum = getattr(signal, 'SIGUSR1', None)
+        if signum is None:
+            logger.warning('Profiling on a signal is not supported on this platform')
+            return
+
+        def on_signal() -> None:
+            if self.profiler.running:
+                logger.warning('Ignoring SIGUSR1, a profiling session is already in progress')
+                return
+            loop.create_task(self._profile_and_log())
+
+        loop.add_signal_handler(signum, on_signal)
+
+    async def _profile_and_log(self, duration: float | None = None) -> None:
+        try:
+            await self.profile(duration)
+        except Exception:
+            logger.exception('Profiling failed')
+
+    async def _export_metrics(self, metrics: Metrics) -> None:
+        config = self.config.metrics_config
+        if config.port is not None:
+            await metrics.start_server(config.host, config.port)
+        if config.file is not None:
+            await metrics.dump_periodically(Path(config.file), config.dump_interval)
+
+    async def _on_discord_member_join(self, member: discord.Member) -> None:
+        if (index := self.member_indexes.get(member.guild.id)) is not None:
+            index.add(member)
+
+    async def _on_discord_member_update(self, _: discord.Member, after: discord.Member) -> None:
+        self.display_names.invalidate(after.id)
+        if (index := self.member_indexes.get(after.guild.id)) is not None:
+            index.add(after)
+
+    async def _on_discord_member_remove(self, member: discord.Member) -> None:
+        self.display_names.invalidate(member.id)
+        if (index := self.member_indexes.get(member.guild.id)) is not None:
+            index.remove(member.id)
+
+    async def _on_discord_user_update(self, _: discord.User, after: discord.User) -> None:
+        # username, global name and avatar are shared between all guilds
+        self.display_names.invalidate(after.id)
+        for guild in after.mutual_guilds:
+            index = self.member_indexes.get(guild.id)
+            if index is not None and (member := guild.get_member(after.id)):
+                index.add(member)
+
+    async def _on_discord_guild_remove(self, guild: discord.Guild) -> None:
+        self.member_indexes.pop(guild.id, None)
+
+    async def _on_discord_shard_ready(self, shard_id: int) -> None:
+        logger.info('Discord shard %d is ready', shard_id)
+
+    async def _on_discord_shard_disconnect(self, shard_id: int) -> None:
+        logger.warning('Discord shard %d disconnected', shard_id)
+
+    async def _on_discord_shard_resumed(self, shard_id: int) -> None:
+        logger.info('Discord shard %d resumed its session', shard_id)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+__all__ = ['LRUCache']
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+def _getsizeof(key: Any, value: Any) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Least recently used cache, bounded by entry count and total size
+
+    Attributes:
+        max_entries: Maximum number of entries
+        max_bytes: Maximum total size of entries in bytes, None for no limit
+        size: Current total size of entries in bytes, as reported by sizeof
+        hits: Number of successful lookups
+        misses: Number of failed lookups
+        evictions: Number of entries evicted to make space for new ones
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int | None = None,
+        sizeof: Callable[[K, V], int] = _getsizeof
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def get(self, key: K) -> V | None:
+        """Returns a cached value, marking it as recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        """Caches a value, evicting least recently used entries if over the limits"""
+        if self.max_entries <= 0:
+            return
+
+        size = self.sizeof(key, value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        self.pop(key)
+        self._entries[key] = (value, size)
+        self.size += size
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.size > self.max_bytes):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        """Removes a value from the cache, returning it if present"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+
+        self.size -= entry[1]
+        return entry[0]
+
+    def clear(self) -> None:
+        """Removes all entries, keeping statistics"""
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        """Returns cache statistics"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
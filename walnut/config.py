@@ -1,10 +1,35 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import logging
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import toml
-from pyrcb2.itypes import IStr
+
+if TYPE_CHECKING:
+    from pyrcb2.itypes import IStr
+
+
+@dataclass
+class DiscordConfig:
+    """Class storing Discord gateway configuration"""
+    sharded: bool = False
+    shard_count: int | None = None
+    shard_ids: list[int] | None = None
+
+    def __post_init__(self):
+        if not self.sharded and (self.shard_count is not None or self.shard_ids is not None):
+            raise ValueError('"shard_count" and "shard_ids" require "sharded" to be enabled')
+
+        if self.shard_count is not None and self.shard_count < 1:
+            raise ValueError('"shard_count" must be at least 1')
+
+        if self.shard_ids is not None:
+            if self.shard_count is None:
+                raise ValueError('"shard_count" must be set when using "shard_ids"')
+            if any(not 0 <= shard_id < self.shard_count for shard_id in self.shard_ids):
+                raise ValueError('"shard_ids" must be between 0 and "shard_count" - 1')
 
 
 @dataclass
@@ -17,6 +42,121 @@ class IRCConfig:
     username: str
     realname: str
     password: str | None = None
+    flood_rate: float = 1.0
+    flood_burst: int = 4
+    max_queued_lines: int = 100
+    queue_overflow: str = 'drop_oldest'
+    name: str = 'default'
+    reconnect_delay: float = 1.0
+    max_reconnect_delay: float = 300.0
+
+    def __post_init__(self):
+        if self.queue_overflow not in ('drop_oldest', 'drop_newest'):
+            raise ValueError(
+                f'Unknown queue overflow policy "{self.queue_overflow}", expected "drop_oldest" or "drop_newest"'
+            )
+
+        if self.reconnect_delay <= 0:
+            raise ValueError('"reconnect_delay" must be greater than 0')
+
+        if self.max_reconnect_delay < self.reconnect_delay:
+            raise ValueError('"max_reconnect_delay" must be at least "reconnect_delay"')
+
+
+@dataclass
+class HTTPConfig:
+    """Class storing configuration of the HTTP connection pool used for Discord webhooks"""
+    pool_size: int = 100
+    keepalive_timeout: float = 30.0
+
+
+@dataclass
+class DispatchConfig:
+    """Class storing configuration of how hooks are called"""
+    mode: str = 'sequential'
+    max_concurrency: int = 32
+    hook_timeout: float | None = 30.0
+
+    def __post_init__(self):
+        if self.mode not in ('sequential', 'concurrent'):
+            raise ValueError(f'Unknown dispatch mode "{self.mode}", expected "sequential" or "concurrent"')
+
+        if self.max_concurrency < 1:
+            raise ValueError('"max_concurrency" must be at least 1')
+
+
+@dataclass
+class CacheConfig:
+    """Class storing cache size limits and persistence, 0 entries disables a cache"""
+    render_entries: int = 4096
+    render_bytes: int = 4 * 1024 * 1024
+    display_name_users: int = 10000
+    reply_messages: int = 1000
+    reply_file: str | None = None
+    message_map_entries: int = 10000
+    message_map_age: float = 7 * 24 * 3600.0
+    message_map_dir: str | None = None
+
+    def __post_init__(self):
+        if self.message_map_age <= 0:
+            raise ValueError('"message_map_age" must be greater than 0')
+
+
+@dataclass
+class MetricsConfig:
+    """Class storing configuration of collected metrics and where they are exported"""
+    enabled: bool = False
+    host: str = '127.0.0.1'
+    port: int | None = None
+    file: str | None = None
+    dump_interval: float = 60.0
+
+    def __post_init__(self):
+        if self.dump_interval <= 0:
+            raise ValueError('"dump_interval" must be greater than 0')
+
+
+@dataclass
+class ProfilingConfig:
+    """Class storing configuration of on-demand profiling and slow hook detection"""
+    mode: str = 'cprofile'
+    duration: float = 30.0
+    output_dir: str = 'profiles'
+    sampling_interval: float = 0.005
+    signal: bool = False
+    command: bool = False
+    slow_step_threshold: float | None = None
+
+    def __post_init__(self):
+        if self.mode not in ('cprofile', 'sampling'):
+            raise ValueError(f'Unknown profiling mode "{self.mode}", expected "cprofile" or "sampling"')
+
+        if self.duration <= 0:
+            raise ValueError('"duration" must be greater than 0')
+
+
+@dataclass
+class LoggingConfig:
+    """Class storing configuration of where logs are written, and how much IRC traffic is logged"""
+    level: str = 'INFO'
+    log_format: str = '[%(levelname)s][%(name)s] %(message)s'
+    file: str | None = None
+    queue_size: int = 10000
+    irc_wire: str = 'all'
+    irc_wire_sample_rate: float = 0.01
+
+    def __post_init__(self):
+        if not isinstance(logging.getLevelName(self.level.upper()), int):
+            raise ValueError(f'Unknown logging level "{self.level}"')
+
+        if self.queue_size < 1:
+            raise ValueError('"queue_size" must be at least 1')
+
+        if self.irc_wire not in ('all', 'sampled', 'off'):
+            raise ValueError(f'Unknown IRC wire logging mode "{self.irc_wire}", expected "all", "sampled" or "off"')
+
+        if not 0 < self.irc_wire_sample_rate <= 1:
+            raise ValueError('"irc_wire_sample_rate" must be greater than 0 and at most 1')
 
 
 @dataclass
@@ -30,14 +170,65 @@ class RelayConfig:
     use_discord_usernames_with_nicknames: bool = True
     prevent_self_pinging: bool = True
     enable_stickers: bool = True
+    irc_formatting: str = 'markdown'
+    irc_network: str | None = None
+    coalesce_window: float = 0.0
+    coalesce_max_delay: float = 1.0
+    discord_webhook_urls: list[str] = field(default_factory=list)
+    reply_excerpt_length: int = 0
+    relay_edits: bool = False
+
+    def __post_init__(self):
+        # pyrcb2 pulls in asyncio, which configuration alone doesn't need
+        from pyrcb2.itypes import IStr
+
+        self.irc_channel = IStr(self.irc_channel)
+        if self.discord_webhook_urls and not self.discord_webhook_url:
+            raise ValueError('"discord_webhook_urls" requires "discord_webhook_url" to be set')
+
+        if self.irc_formatting not in ('markdown', 'strip', 'raw'):
+            raise ValueError(
+                f'Unknown IRC formatting mode "{self.irc_formatting}", expected "markdown", "strip" or "raw"'
+            )
+
+        if self.coalesce_window < 0 or self.coalesce_max_delay < 0:
+            raise ValueError('"coalesce_window" and "coalesce_max_delay" must not be negative')
+
+        if self.reply_excerpt_length < 0:
+            raise ValueError('"reply_excerpt_length" must not be negative')
 
 
 @dataclass
 class Config:
-    """Class storing main Walnut bot configuration"""
+    """Class storing main Walnut bot configuration, the first IRC network is the default one"""
     discord_token: str
-    irc_config: IRCConfig
+    irc_configs: list[IRCConfig]
     relays: list[RelayConfig]
+    http_config: HTTPConfig = field(default_factory=HTTPConfig)
+    dispatch_config: DispatchConfig = field(default_factory=DispatchConfig)
+    cache_config: CacheConfig = field(default_factory=CacheConfig)
+    metrics_config: MetricsConfig = field(default_factory=MetricsConfig)
+    profiling_config: ProfilingConfig = field(default_factory=ProfilingConfig)
+    discord_config: DiscordConfig = field(default_factory=DiscordConfig)
+    logging_config: LoggingConfig = field(default_factory=LoggingConfig)
+
+    def __post_init__(self):
+        if not self.irc_configs:
+            raise ValueError('At least one IRC network must be configured')
+
+        names = [irc_config.name for irc_config in self.irc_configs]
+        for name in names:
+            if names.count(name) > 1:
+                raise ValueError(f'IRC network name "{name}" is used more than once')
+
+        for relay in self.relays:
+            if relay.irc_network is not None and relay.irc_network not in names:
+                raise ValueError(f'Relay of {relay.irc_channel} uses an unknown IRC network "{relay.irc_network}"')
+
+    @property
+    def irc_config(self) -> IRCConfig:
+        """Configuration of the default IRC network"""
+        return self.irc_configs[0]
 
     @classmethod
     def from_file(cls, file: Path) -> Config:
@@ -63,20 +254,44 @@ class Config:
         if 'token' not in config['discord']:
             raise ValueError('"token" key missing from the "discord" config section')
 
-        for key in ('server', 'port', 'ssl', 'nickname'):
-            if key not in config['irc']:
-                raise ValueError(f'"{key}" key missing from the "irc" config section')
+        # a single [irc] table, or a list of named [[irc]] networks
+        irc_sections = config['irc'] if isinstance(config['irc'], list) else [config['irc']]
+        for section in irc_sections:
+            for key in ('server', 'port', 'ssl', 'nickname'):
+                if key not in section:
+                    raise ValueError(f'"{key}" key missing from the "irc" config section')
+
+            if len(irc_sections) > 1 and 'name' not in section:
+                raise ValueError('"name" key is required for every "irc" config section, when using multiple networks')
 
         return cls(
             discord_token=config['discord']['token'],
-            irc_config=IRCConfig(
-                server=config['irc']['server'],
-                port=config['irc']['port'],
-                ssl=config['irc']['ssl'],
-                nickname=config['irc']['nickname'],
-                username=config['irc'].get('username', config['irc']['nickname']),
-                realname=config['irc'].get('realname', config['irc']['nickname']),
-                password=config['irc'].get('password')
-            ),
-            relays=[RelayConfig(**relay) for relay in config['relay']]
+            irc_configs=[
+                IRCConfig(
+                    server=section['server'],
+                    port=section['port'],
+                    ssl=section['ssl'],
+                    nickname=section['nickname'],
+                    username=section.get('username', section['nickname']),
+                    realname=section.get('realname', section['nickname']),
+                    password=section.get('password'),
+                    **{
+                        key: section[key]
+                        for key in (
+                            'flood_rate', 'flood_burst', 'max_queued_lines', 'queue_overflow', 'name',
+                            'reconnect_delay', 'max_reconnect_delay'
+                        )
+                        if key in section
+                    }
+                )
+                for section in irc_sections
+            ],
+            relays=[RelayConfig(**relay) for relay in config['relay']],
+            http_config=HTTPConfig(**config.get('http', {})),
+            dispatch_config=DispatchConfig(**config.get('dispatch', {})),
+            cache_config=CacheConfig(**config.get('cache', {})),
+            metrics_config=MetricsConfig(**config.get('metrics', {})),
+            profiling_config=ProfilingConfig(**config.get('profiling', {})),
+            discord_config=DiscordConfig(**{key: value for key, value in config['discord'].items() if key != 'token'}),
+            logging_config=LoggingConfig(**config.get('logging', {}))
         )
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Literal
+
+import discord
+from discord import app_commands
+
+if TYPE_CHECKING:
+    from walnut.bot import WalnutBot
+
+logger = logging.getLogger(__name__)
+
+
+def profile_command(bot: WalnutBot) -> app_commands.Command:
+    """Returns an administrator-only /profile command, profiling the bot and replying with the profile"""
+
+    @app_commands.command(name='profile', description='Profiles the bot and uploads the result')
+    @app_commands.describe(seconds='How long to profile for', mode='Profiler to use')
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    async def profile(
+        interaction: discord.Interaction,
+        seconds: app_commands.Range[float, 1, 600] | None = None,
+        mode: Literal['cprofile', 'sampling'] | None = None
+    ) -> None:
+        if bot.profiler.running:
+            await interaction.response.send_message('A profiling session is already in progress', ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            file = await bot.profile(seconds, mode)
+        except RuntimeError as e:
+            # a session can start in the meantime, for example on SIGUSR1
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        except OSError:
+            logger.exception('Failed to save a profile')
+            await interaction.followup.send('Failed to save the profile, see logs for details', ephemeral=True)
+            return
+
+        await interaction.followup.send(f'Profile saved to `{file}`', file=discord.File(file), ephemeral=True)
+
+    return profile
@@ -21,3 +21,20 @@ def get_nickname(user: discord.User | discord.Member) -> str:
 def get_emoji_url(emoji_id: int) -> str:
     """Return emoji URL for a given ID"""
     return f'https://cdn.discordapp.com/emojis/{emoji_id}.png'
+
+
+def message_from_edit(client: discord.Client, payload: discord.RawMessageUpdateEvent) -> discord.Message | None:
+    """
+    Returns the message of a raw edit event, as edited, None if the event doesn't carry a whole message
+
+    Discord sends the whole message when its content is edited, so no API call or cache is needed.
+    """
+    channel = client.get_channel(payload.channel_id)
+    if channel is None or 'author' not in payload.data or 'content' not in payload.data:
+        return None
+
+    try:
+        # the same as RawMessageUpdateEvent.message in later discord.py versions
+        return discord.Message(state=client._connection, channel=channel, data=payload.data)  # type: ignore
+    except (KeyError, TypeError, ValueError):
+        return None
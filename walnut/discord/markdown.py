@@ -5,12 +5,25 @@ import re
 import mistune
 from mistune.plugins.formatting import PREVENT_BACKSLASH, _parse_to_end  # type: ignore[attr-defined]
 
-__all__ = ['EMOJI_REGEX', 'discord_spoiler', 'discord_emoji']
+__all__ = ['EMOJI_REGEX', 'PLAIN_TEXT_REGEX', 'discord_spoiler', 'discord_emoji', 'is_plain_text']
 
 EMOJI_REGEX = re.compile(r'<(?P<animated>a?):(?P<name>[a-zA-Z0-9_]{2,32}):(?P<id>[0-9]{18,22})>')
+# Single line text, which Markdown renders unchanged: no leading/trailing whitespace,
+# no block markers at the start (headings, lists, thematic breaks), and no characters
+# starting inline syntax (escapes, emphasis, strikethrough, spoilers, code, links, HTML, emoji, entities)
+PLAIN_TEXT_REGEX = re.compile(
+    r'(?!\s|[-+=#]+(?:\s|$)|\d{1,9}[.)](?:\s|$))'
+    r'[^\x00-\x1f\x7f\\`*_~\[\]<>&|]+'
+    r'(?<!\s)'
+)
 _SPOILER_END = re.compile(r'(?:' + PREVENT_BACKSLASH + r'\\~|[^\s~])\|\|(?!~)')
 
 
+def is_plain_text(text: str) -> bool:
+    """Checks whether text contains no Markdown syntax, and can be relayed without parsing"""
+    return PLAIN_TEXT_REGEX.fullmatch(text) is not None
+
+
 def _parse_discord_spoiler(
     inline: mistune.InlineParser,
     match: re.Match,
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import sys
+
+import discord
+
+__all__ = ['MemberIndex', 'normalize_name']
+
+
+def normalize_name(name: str) -> str:
+    """Normalizes a name for case-insensitive lookups"""
+    return name.casefold()
+
+
+class MemberIndex:
+    """
+    Index of a guild's members by username, global display name and nickname
+
+    Replaces linear scans of guild.get_member_named() with dictionary lookups.
+    Names are normalized with :func:`normalize_name`. When several members share a name,
+    usernames take precedence over nicknames, and nicknames over global display names.
+
+    Attributes:
+        guild_id: ID of the indexed guild
+        usernames (dict): Normalized username -> member IDs
+        nicknames (dict): Normalized server nickname -> member IDs
+        global_names (dict): Normalized global display name -> member IDs
+        avatar_urls (dict): Member ID -> avatar URL, None for default avatars
+    """
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.usernames: dict[str, dict[int, None]] = {}
+        self.nicknames: dict[str, dict[int, None]] = {}
+        self.global_names: dict[str, dict[int, None]] = {}
+        self.avatar_urls: dict[int, str | None] = {}
+        # names each member is indexed under, so it can be removed without a scan
+        self._names: dict[int, tuple[str, str | None, str | None]] = {}
+
+    @classmethod
+    def from_guild(cls, guild: discord.Guild) -> MemberIndex:
+        """Builds an index of all cached members of a guild"""
+        index = cls(guild.id)
+        for member in guild.members:
+            index.add(member)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, member: discord.Member) -> None:
+        """Adds or updates a member"""
+        self.remove(member.id)
+
+        names = (
+            normalize_name(member.name),
+            normalize_name(member.nick) if member.nick else None,
+            normalize_name(member.global_name) if member.global_name else None
+        )
+        for mapping, name in zip((self.usernames, self.nicknames, self.global_names), names):
+            if name is not None:
+                mapping.setdefault(name, {})[member.id] = None
+
+        self._names[member.id] = names
+        self.avatar_urls[member.id] = member.avatar.url if member.avatar else None
+
+    def remove(self, member_id: int) -> None:
+        """Removes a member, if indexed"""
+        names = self._names.pop(member_id, None)
+        if names is None:
+            return
+
+        for mapping, name in zip((self.usernames, self.nicknames, self.global_names), names):
+            if name is None:
+                continue
+            ids = mapping[name]
+            ids.pop(member_id, None)
+            if not ids:
+                del mapping[name]
+
+        self.avatar_urls.pop(member_id, None)
+
+    def find(self, name: str) -> int | None:
+        """Returns the ID of a member with a given name, None if not found"""
+        name = normalize_name(name)
+        for mapping in (self.usernames, self.nicknames, self.global_names):
+            if ids := mapping.get(name):
+                return next(iter(ids))
+        return None
+
+    def get_avatar_url(self, name: str) -> str | None:
+        """Returns the avatar URL of a member with a given name, None if not found or using a default avatar"""
+        member_id = self.find(name)
+        if member_id is None:
+            return None
+        return self.avatar_urls.get(member_id)
+
+    def memory_footprint(self) -> int:
+        """Returns an estimate of memory used by the index in bytes, excluding member objects"""
+        size = sum(sys.getsizeof(mapping) for mapping in (
+            self.usernames, self.nicknames, self.global_names, self.avatar_urls, self._names
+        ))
+        for mapping in (self.usernames, self.nicknames, self.global_names):
+            size += sum(sys.getsizeof(name) + sys.getsizeof(ids) for name, ids in mapping.items())
+        size += sum(sys.getsizeof(url) for url in self.avatar_urls.values() if url is not None)
+        size += sum(sys.getsizeof(names) for names in self._names.values())
+        return size
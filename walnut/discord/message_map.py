@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import IO, Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class RelayedMessage(NamedTuple):
+    """
+    A Discord message relayed to or from IRC
+
+    Attributes:
+        origin: "discord" for messages relayed to IRC, "irc" for messages relayed from IRC
+        author: Name the author is shown with on IRC, the IRC nickname for messages from IRC
+        excerpt: Start of the message's content
+        webhook_id: ID of the webhook which sent a message from IRC, None if sent by the bot or from Discord
+        timestamp: Unix time the message was relayed at
+    """
+    origin: str
+    author: str
+    excerpt: str
+    webhook_id: int | None
+    timestamp: float
+
+
+class MessageMap:
+    """
+    Discord message IDs of relayed messages, mapped to what edits and deletions of them need on the other side
+
+    Messages from IRC can also be looked up by the IRC nickname of their author, to find their latest message.
+    Entries expire after `max_age` seconds, and the oldest ones are evicted once there are `max_entries`.
+
+    If a file is given, changes are appended to it as JSON lines, and replayed by load(). The file is rewritten
+    without expired and replaced entries when loaded, and whenever it grows to twice the number of entries.
+
+    Attributes:
+        max_entries: Maximum number of messages, 0 disables the map
+        max_age: Seconds after which messages are forgotten
+        file: Append-only file the map is persisted to, None to keep it in memory only
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_age: float,
+        file: Path | None = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.file = file
+        self._clock = clock
+        # dicts keep insertion order, and messages are added as they are relayed, so the first entry is the oldest
+        self._messages: dict[int, RelayedMessage] = {}
+        self._latest: dict[str, int] = {}
+        self._fp: IO[str] | None = None
+        self._logged = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add(self, message_id: int, message: RelayedMessage) -> None:
+        """Maps a Discord message ID, replacing an existing entry in place"""
+        if self.max_entries <= 0:
+            return
+
+        self._set(message_id, message)
+        self._append(['set', message_id, *message])
+        self._evict()
+
+    def get(self, message_id: int) -> RelayedMessage | None:
+        """Returns a relayed message by its Discord message ID, None if unknown or expired"""
+        message = self._messages.get(message_id)
+        if message is None or message.timestamp < self._clock() - self.max_age:
+            return None
+        return message
+
+    def latest_from(self, irc_author: str) -> tuple[int, RelayedMessage] | None:
+        """Returns the Discord message ID and entry of the latest message relayed from an IRC user"""
+        message_id = self._latest.get(irc_author.lower())
+        if message_id is None:
+            return None
+
+        message = self.get(message_id)
+        return (message_id, message) if message is not None else None
+
+    def pop(self, message_id: int) -> RelayedMessage | None:
+        """Forgets a message, returning its entry if it was mapped"""
+        message = self._remove(message_id)
+        if message is not None:
+            self._append(['pop', message_id])
+        return message
+
+    def load(self) -> None:
+        """
+        Replays the file, compacts it and opens it for appending
+
+        Unreadable lines, such as one cut off by a crash, are skipped.
+        """
+        if self.file is None:
+            return
+
+        skipped = 0
+        try:
+            with self.file.open(encoding='utf-8') as fp:
+                for line in fp:
+                    try:
+                        op, message_id, *fields = json.loads(line)
+                        if op == 'set':
+                            self._set(int(message_id), RelayedMessage(*fields))
+                        elif op == 'pop':
+                            self._remove(int(message_id))
+                    except (ValueError, TypeError):
+                        skipped += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning('Not loading relayed messages from %s: %s', self.file, e)
+
+        if skipped:
+            logger.warning('Skipped %d unreadable lines of %s', skipped, self.file)
+        self._evict()
+        self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the file with current entries only"""
+        if self.file is None:
+            return
+
+        self.close()
+        temporary = self.file.with_name(f'.{self.file.name}.tmp')
+        try:
+            with temporary.open(mode='w', encoding='utf-8') as fp:
+                for message_id, message in self._messages.items():
+                    fp.write(json.dumps(['set', message_id, *message], separators=(',', ':')) + '\n')
+            os.replace(temporary, self.file)
+            # line buffered, every change is written as it's made
+            self._fp = self.file.open(mode='a', encoding='utf-8', buffering=1)
+        except OSError:
+            logger.exception('Failed to write relayed messages to %s, keeping them in memory only', self.file)
+            self.file = None
+        self._logged = len(self._messages)
+
+    def close(self) -> None:
+        """Closes the file, entries are kept in memory"""
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def _set(self, message_id: int, message: RelayedMessage) -> None:
+        self._messages[message_id] = message
+        if message.origin == 'irc':
+            self._latest[message.author.lower()] = message_id
+
+    def _remove(self, message_id: int) -> RelayedMessage | None:
+        message = self._messages.pop(message_id, None)
+        if message is not None and message.origin == 'irc':
+            key = message.author.lower()
+            if self._latest.get(key) == message_id:
+                del self._latest[key]
+        return message
+
+    def _evict(self) -> None:
+        expired = self._clock() - self.max_age
+        while self._messages:
+            message_id = next(iter(self._messages))
+            if len(self._messages) <= self.max_entries and self._messages[message_id].timestamp >= expired:
+                break
+            # evictions aren't logged, they are repeated when the file is replayed
+            self._remove(message_id)
+
+    def _append(self, entry: list) -> None:
+        if self._fp is None:
+            return
+
+        try:
+            self._fp.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        except OSError:
+            logger.exception('Failed to write relayed messages to %s, keeping them in memory only', self.file)
+            self.close()
+            self.file = None
+            return
+
+        self._logged += 1
+        if self._logged > 2 * max(len(self._messages), self.max_entries // 2):
+            self.compact()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+MAX_EXCERPT_LENGTH = 100
+"""Characters of a message's content kept as its excerpt."""
+FILE_VERSION = 1
+
+
+class ReplyContext(NamedTuple):
+    """What a reply to a message is shown with"""
+    author: str
+    excerpt: str
+
+
+def make_excerpt(content: str) -> str:
+    """Returns the start of a message's content, on a single line"""
+    # only the start is looked at, messages can be much longer than an excerpt
+    return ' '.join(content[:MAX_EXCERPT_LENGTH].split())
+
+
+class ReplyContextCache:
+    """
+    Authors and excerpts of recently relayed messages, so that replies to them can be shown without API calls
+
+    Every channel keeps its most recent messages, independently of how busy other channels are.
+    Lookups and insertions take constant time.
+
+    Attributes:
+        max_messages: Maximum number of messages kept per channel, 0 disables the cache
+        hits: Number of successful lookups
+        misses: Number of failed lookups
+    """
+
+    def __init__(self, max_messages: int):
+        self.max_messages = max_messages
+        self.hits = 0
+        self.misses = 0
+        # dicts keep insertion order, and message IDs grow over time, so the first entry is the oldest
+        self._channels: dict[int, dict[int, ReplyContext]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._channels.values())
+
+    def add(self, channel_id: int, message_id: int, author: str, excerpt: str) -> None:
+        """Remembers a message, forgetting the channel's oldest one if over the limit"""
+        if self.max_messages <= 0:
+            return
+
+        messages = self._channels.setdefault(channel_id, {})
+        messages.pop(message_id, None)
+        messages[message_id] = ReplyContext(author, excerpt[:MAX_EXCERPT_LENGTH])
+        if len(messages) > self.max_messages:
+            del messages[next(iter(messages))]
+
+    def get(self, channel_id: int, message_id: int) -> ReplyContext | None:
+        """Returns the context of a message, if remembered"""
+        messages = self._channels.get(channel_id)
+        context = messages.get(message_id) if messages is not None else None
+        if context is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return context
+
+    def pop(self, channel_id: int, message_id: int) -> ReplyContext | None:
+        """Forgets a message, returning its context if it was remembered"""
+        messages = self._channels.get(channel_id)
+        return messages.pop(message_id, None) if messages is not None else None
+
+    def load(self, file: Path) -> None:
+        """
+        Adds messages saved by save(), keeping the limit
+
+        A missing or unreadable file is skipped, so that a damaged cache never prevents starting.
+        """
+        try:
+            with file.open(encoding='utf-8') as fp:
+                data = json.load(fp)
+            if data.get('version') != FILE_VERSION:
+                raise ValueError(f'unsupported version {data.get("version")!r}')
+            for channel_id, messages in data['channels'].items():
+                for message_id, author, excerpt in messages:
+                    self.add(int(channel_id), int(message_id), author, excerpt)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning('Not loading reply contexts from %s: %s', file, e)
+            return
+
+        logger.info('Loaded %d reply contexts from %s', len(self), file)
+
+    def save(self, file: Path) -> None:
+        """Saves all messages to a file, replacing it atomically"""
+        data = {
+            'version': FILE_VERSION,
+            'channels': {
+                str(channel_id): [[message_id, *context] for message_id, context in messages.items()]
+                for channel_id, messages in self._channels.items()
+                if messages
+            },
+        }
+        temporary = file.with_name(f'.{file.name}.tmp')
+        try:
+            with temporary.open(mode='w', encoding='utf-8') as fp:
+                json.dump(data, fp, separators=(',', ':'))
+            os.replace(temporary, file)
+        except OSError:
+            logger.exception('Failed to save reply contexts to %s', file)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+import discord
+
+
+@dataclass
+class ShardStatus:
+    """Health of a single Discord gateway connection"""
+    shard_id: int
+    latency: float
+    connected: bool
+    guilds: int
+    chunked_guilds: int
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the shard is connected, with a measured heartbeat latency"""
+        return self.connected and math.isfinite(self.latency)
+
+
+def shard_statuses(client: discord.Client) -> list[ShardStatus]:
+    """
+    Returns the health of every shard handled by a client
+
+    A client which isn't sharded is reported as a single shard.
+    """
+    guilds: dict[int, list[discord.Guild]] = {}
+    for guild in client.guilds:
+        guilds.setdefault(guild.shard_id, []).append(guild)
+
+    if isinstance(client, discord.AutoShardedClient):
+        shards = [
+            (shard_id, shard.latency, not shard.is_closed())
+            for shard_id, shard in client.shards.items()
+        ]
+        # shards which haven't connected yet, known only if shard IDs were given
+        shards.extend(
+            (shard_id, float('nan'), False)
+            for shard_id in client.shard_ids or ()
+            if shard_id not in client.shards
+        )
+    else:
+        shards = [(client.shard_id or 0, client.latency, client.is_ready() and not client.is_closed())]
+
+    return [
+        ShardStatus(
+            shard_id=shard_id,
+            latency=latency,
+            connected=connected,
+            guilds=len(guilds.get(shard_id, ())),
+            chunked_guilds=sum(guild.chunked for guild in guilds.get(shard_id, ()))
+        )
+        for shard_id, latency, connected in sorted(shards)
+    ]
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Any, Callable, Iterable
+
+import aiohttp
+import discord
+from discord.http import Route
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URL_REGEX = re.compile(
+    r'discord(?:app)?\.com/api/webhooks/(?P<id>[0-9]{17,20})/(?P<token>[A-Za-z0-9.\-_]{60,})'
+)
+DEFAULT_LIMIT = 5
+"""Requests per window assumed for a webhook, until Discord reports its limit."""
+DEFAULT_WINDOW = 2.0
+"""Length of a rate limit window in seconds, assumed until Discord reports it."""
+MAX_ATTEMPTS = 5
+
+
+class WebhookBucket:
+    """
+    Rate limit state of a single webhook, as reported by Discord's rate limit headers
+
+    Sends are counted against the bucket before they are made, so that a full bucket
+    delays further sends until it resets, instead of them being answered with a 429.
+
+    Attributes:
+        webhook_id: Webhook ID
+        token: Webhook token
+        limit: Requests allowed per window
+        remaining: Requests left in the current window, excluding sends in flight
+        reset_at: Monotonic time at which the current window ends
+        in_flight: Number of sends waiting for a response
+    """
+    __slots__ = ('webhook_id', 'token', 'limit', 'remaining', 'reset_at', 'in_flight')
+
+    def __init__(self, url: str):
+        m = WEBHOOK_URL_REGEX.search(url)
+        if m is None:
+            raise ValueError(f'Invalid Discord webhook URL "{url}"')
+
+        self.webhook_id = int(m.group('id'))
+        self.token = m.group('token')
+        self.limit = DEFAULT_LIMIT
+        self.remaining = DEFAULT_LIMIT
+        self.reset_at = 0.0
+        self.in_flight = 0
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} {self.webhook_id} {self.remaining}/{self.limit}>'
+
+    @property
+    def url(self) -> str:
+        return Route('POST', '/webhooks/{webhook_id}/{token}', webhook_id=self.webhook_id, token=self.token).url
+
+    def delay(self, now: float) -> float:
+        """Returns seconds until a send is allowed, 0 if one is allowed now"""
+        if now >= self.reset_at:
+            # the window ended, assume a fresh one until a response says otherwise.
+            # sends still in flight may be counted in it, so it can be exhausted already
+            self.remaining = self.limit - self.in_flight
+            self.reset_at = now + DEFAULT_WINDOW
+        if self.remaining > 0:
+            return 0.0
+        return self.reset_at - now
+
+    def reserve(self) -> None:
+        self.remaining -= 1
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def update(self, headers: Any, now: float) -> None:
+        """Updates the state from the headers of a response to one of the sends in flight"""
+        if 'X-RateLimit-Remaining' not in headers or 'X-RateLimit-Reset-After' not in headers:
+            # no limit is reported, e.g. by a proxy in front of Discord, keep the current estimate
+            return
+
+        self.limit = int(headers.get('X-RateLimit-Limit', self.limit))
+        # other sends in flight may not be counted by Discord yet
+        self.remaining = max(0, int(headers['X-RateLimit-Remaining']) - (self.in_flight - 1))
+        self.reset_at = now + float(headers['X-RateLimit-Reset-After'])
+
+    def block(self, retry_after: float, now: float) -> None:
+        """Marks the bucket as exhausted for `retry_after` seconds"""
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, now + retry_after)
+
+
+class _Send:
+    __slots__ = ('payload', 'username', 'future', 'attempts')
+
+    def __init__(self, payload: dict[str, Any], username: str, future: asyncio.Future):
+        self.payload = payload
+        self.username = username
+        self.future = future
+        self.attempts = 0
+
+
+class WebhookDispatcher:
+    """
+    Sends messages through one or more webhooks of a channel, staying within their rate limits
+
+    Messages are sent in order of submission through whichever webhook has requests left in its window.
+    Messages of a single author are sent one at a time, so they always arrive in order,
+    while messages of different authors are sent in parallel.
+
+    Attributes:
+        buckets (list): Rate limit state of every webhook
+        get_session: Returns the HTTP session to send requests with
+        rate_limited: Number of requests answered with a 429, despite scheduling
+    """
+
+    def __init__(self, urls: Iterable[str], get_session: Callable[[], aiohttp.ClientSession]):
+        self.buckets = [WebhookBucket(url) for url in urls]
+        if not self.buckets:
+            raise ValueError('At least one webhook URL is required')
+
+        self.get_session = get_session
+        self.rate_limited = 0
+        self._queue: deque[_Send] = deque()
+        self._busy_authors: set[str] = set()
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def backlog(self) -> int:
+        """Number of messages waiting to be sent"""
+        return len(self._queue)
+
+    async def send(self, content: str, username: str, avatar_url: str | None = None) -> None:
+        """
+        Sends a message, waiting until it's delivered
+
+        Raises:
+            discord.HTTPException: Sending failed
+        """
+        payload = {'content': content, 'username': username}
+        if avatar_url is not None:
+            payload['avatar_url'] = avatar_url
+
+        # queued before the first suspension point, so calls are sent in order
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(_Send(payload, username, future))
+        self._schedule()
+        await future
+
+    def _schedule(self) -> None:
+        """Starts every send allowed right now, and sets a timer for when the next one will be"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        waiting: deque[_Send] = deque()
+        delay = 0.0
+        while self._queue:
+            send = self._queue.popleft()
+            if send.future.done():
+                # cancelled while waiting
+                continue
+            if send.username in self._busy_authors:
+                waiting.append(send)
+                continue
+
+            # the webhook with the most requests left spreads sends evenly
+            bucket = min(self.buckets, key=lambda b: (b.delay(now), -b.remaining))
+            delay = bucket.delay(now)
+            if delay > 0:
+                self._queue.appendleft(send)
+                break
+
+            bucket.reserve()
+            self._busy_authors.add(send.username)
+            task = asyncio.create_task(self._post(bucket, send))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        waiting.extend(self._queue)
+        self._queue = waiting
+        if delay > 0:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._schedule)
+
+    async def _post(self, bucket: WebhookBucket, send: _Send) -> None:
+        requeue = False
+        try:
+            send.attempts += 1
+            async with self.get_session().post(bucket.url, json=send.payload, params={'wait': 'false'}) as response:
+                now = time.monotonic()
+                bucket.update(response.headers, now)
+                data = None
+                if response.content_type == 'application/json':
+                    data = await response.json()
+
+            if 200 <= response.status < 300:
+                if not send.future.done():
+                    send.future.set_result(None)
+            elif response.status == 429 and isinstance(data, dict) and send.attempts < MAX_ATTEMPTS:
+                self.rate_limited += 1
+                retry_after = float(data.get('retry_after', DEFAULT_WINDOW))
+                logger.warning('Webhook %d is rate limited, retrying in %.2fs', bucket.webhook_id, retry_after)
+                for blocked in self.buckets if data.get('global') else (bucket,):
+                    blocked.block(retry_after, now)
+                requeue = True
+            elif response.status >= 500 and send.attempts < MAX_ATTEMPTS:
+                await asyncio.sleep(1 + send.attempts * 2)
+                requeue = True
+            elif not send.future.done():
+                send.future.set_exception(discord.HTTPException(response, data or ''))  # type: ignore[arg-type]
+        except Exception as e:  # noqa: BLE001 - any failure is raised by send() to the caller waiting for it
+            if not send.future.done():
+                send.future.set_exception(e)
+        finally:
+            bucket.release()
+            if requeue:
+                # ahead of later messages of the same author
+                self._queue.appendleft(send)
+            self._busy_authors.discard(send.username)
+            self._schedule()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Coroutine, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class HookDispatcher:
+    """
+    Runs hooks concurrently, isolating them from each other
+
+    Every destination (identified by a hashable key) has its own queue,
+    so messages sent to one destination are handled in order,
+    while separate destinations are processed in parallel.
+
+    Attributes:
+        max_concurrency: Maximum number of hooks running at the same time
+        hook_timeout: Seconds after which a running hook is cancelled, None to disable
+        queues (dict): Pending (hook, message) pairs per destination
+    """
+
+    def __init__(self, max_concurrency: int, hook_timeout: float | None):
+        self.max_concurrency = max_concurrency
+        self.hook_timeout = hook_timeout
+        self.queues: dict[Hashable, deque[tuple[Callable[[Any], Coroutine[Any, Any, None]], Any]]] = {}
+        self._workers: dict[Hashable, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def backlog(self) -> int:
+        """Number of messages waiting to be handled, across all destinations"""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(self, key: Hashable, hook: Callable[[Any], Coroutine[Any, Any, None]], message: Any) -> None:
+        """Queues a message to be handled by a hook, after all previous messages for the same destination"""
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = deque()
+            self._workers[key] = asyncio.create_task(self._work(key, queue))
+        queue.append((hook, message))
+
+    async def close(self) -> None:
+        """Cancels all running and pending hooks"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self.queues.clear()
+        self._workers.clear()
+
+    async def _work(self, key: Hashable, queue: deque) -> None:
+        try:
+            while queue:
+                hook, message = queue.popleft()
+                async with self._semaphore:
+                    await self._run(hook, message)
+        finally:
+            # no await between the last check and removal, so submit() can't append to an abandoned queue
+            self.queues.pop(key, None)
+            self._workers.pop(key, None)
+
+    async def _run(self, hook: Callable[[Any], Coroutine[Any, Any, None]], message: Any) -> None:
+        try:
+            await asyncio.wait_for(hook(message), self.hook_timeout)
+        except asyncio.TimeoutError:
+            logger.warning('Hook %r timed out after %.1f seconds', hook, self.hook_timeout)
+        except Exception:
+            logger.exception('Hook %r raised an exception', hook)
@@ -1,4 +1,18 @@
-from walnut.hooks.base import BaseHook
-from walnut.hooks.relay import MessageRelay
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from walnut.hooks.base import BaseHook
+    from walnut.hooks.relay import MessageRelay
 
 __all__ = ["BaseHook", "MessageRelay"]
+
+
+def __getattr__(name: str) -> Any:
+    # hooks import the whole bot, only do so on first use
+    if name == 'BaseHook':
+        from walnut.hooks.base import BaseHook
+        return BaseHook
+    if name == 'MessageRelay':
+        from walnut.hooks.relay import MessageRelay
+        return MessageRelay
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
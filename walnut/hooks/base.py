@@ -23,3 +23,12 @@ class BaseHook(ABC):
     def load(self, bot: WalnutBot) -> None:
         """Loads the relay into the bot"""
         ...
+
+    def unload(self, bot: WalnutBot) -> None:
+        """
+        Removes the hook from the bot, undoing load()
+
+        By default, removes the hook's methods from the bot's hook lists and routes.
+        Hooks loading anything else, such as Discord commands or background tasks, should extend it.
+        """
+        bot.remove_hooks(self)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import re
-from typing import TYPE_CHECKING, Callable, cast
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, cast
 
-import aiohttp
 import discord
 from discord.abc import Messageable
 from mistune import InlineParser, Markdown
@@ -12,24 +16,41 @@ from pyrcb2.itypes import IStr
 
 from walnut.bot import WalnutBot
 from walnut.config import RelayConfig
-from walnut.discord.helpers import get_emoji_url
-from walnut.discord.markdown import EMOJI_REGEX, discord_emoji, discord_spoiler
+from walnut.discord.helpers import get_emoji_url, message_from_edit
+from walnut.discord.markdown import EMOJI_REGEX, discord_emoji, discord_spoiler, is_plain_text
+from walnut.discord.message_map import MessageMap, RelayedMessage
+from walnut.discord.replies import ReplyContext, make_excerpt
+from walnut.discord.webhooks import WebhookDispatcher
 from walnut.hooks.base import BaseHook
+from walnut.irc.formatting import escape_markdown, strip_formatting, to_markdown
+from walnut.irc.lines import pack_lines
 from walnut.irc.markdown import IRCRenderer
 from walnut.irc.message import Message as IRCMessage
-from walnut.irc.nicknames import format_discord_user
+from walnut.irc.nicknames import sanitize_nickname
 
 if TYPE_CHECKING:
     from discord.abc import PrivateChannel
     from discord.guild import GuildChannel
     from discord.threads import Thread
 
+logger = logging.getLogger(__name__)
 
-parse_markdown = cast(Callable[[str], str], Markdown(
-    renderer=IRCRenderer(),
-    inline=InlineParser(hard_wrap=False),
-    plugins=[strikethrough, discord_spoiler, discord_emoji]
-))
+DISCORD_MESSAGE_LIMIT = 2000
+"""Maximum length of a Discord message, in characters."""
+
+
+@lru_cache(maxsize=None)
+def _markdown() -> Callable[[str], str]:
+    return cast(Callable[[str], str], Markdown(
+        renderer=IRCRenderer(),
+        inline=InlineParser(hard_wrap=False),
+        plugins=[strikethrough, discord_spoiler, discord_emoji]
+    ))
+
+
+def parse_markdown(content: str) -> str:
+    """Renders Discord markdown as IRC formatting, the parser is built on first use"""
+    return _markdown()(content)
 
 
 class MessageRelay(BaseHook):
@@ -39,18 +60,41 @@ class MessageRelay(BaseHook):
     use_discord_usernames_with_nicknames: bool = True
     prevent_self_pinging: bool = True
     enable_stickers: bool = True
+    irc_formatting: str = 'markdown'
+    irc_network: str | None = None
+    coalesce_window: float = 0.0
+    coalesce_max_delay: float = 1.0
+    reply_excerpt_length: int = 0
+    relay_edits: bool = False
+    markdown_parser: Callable[[str], str] = staticmethod(parse_markdown)
 
     def __init__(
         self,
         irc_channel: str,
         discord_channel_id: int,
         discord_webhook_url: str | None = None,
+        discord_webhook_urls: Iterable[str] = (),
     ):
         self.bot: WalnutBot | None = None
-        self.irc_channel = cast(IStr, irc_channel)
+        self.irc_channel = IStr(irc_channel)
         self.discord_channel: GuildChannel | Thread | PrivateChannel | None = None
         self.discord_channel_id = discord_channel_id
         self.discord_webhook_url = discord_webhook_url
+        self.discord_webhook_urls = list(discord_webhook_urls)
+        self.webhook_dispatcher: WebhookDispatcher | None = None
+        self.message_map: MessageMap | None = None
+        # consecutive IRC lines of a single author waiting to be sent as one Discord message
+        self._batch: list[str] = []
+        self._batch_sender: str | None = None
+        self._batch_length = 0
+        self._batch_started = 0.0
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._send_lock = asyncio.Lock()
+
+    def __repr__(self) -> str:
+        network = f'{self.irc_network}/' if self.irc_network else ''
+        return f'<{type(self).__name__} {network}{self.irc_channel} <-> {self.discord_channel_id}>'
 
     @classmethod
     def from_config(cls, config: RelayConfig):
@@ -58,7 +102,8 @@ class MessageRelay(BaseHook):
         relay = cls(
             irc_channel=config.irc_channel,
             discord_channel_id=config.discord_channel_id,
-            discord_webhook_url=config.discord_webhook_url
+            discord_webhook_url=config.discord_webhook_url,
+            discord_webhook_urls=config.discord_webhook_urls
         )
         for key, value in config.__dict__.items():
             setattr(relay, key, value)
@@ -68,15 +113,45 @@ class MessageRelay(BaseHook):
     def load(self, bot: WalnutBot) -> None:
         """Loads the relay into the bot"""
         self.bot = bot
-        bot.irc_hooks.append(self.handle_irc_message)
-        bot.discord_hooks.append(self.handle_discord_message)
+        # resolve the default network, so that messages can be matched by name
+        self.irc_network = bot.get_irc_network(self.irc_network).name
+        if self.relay_edits:
+            # before adding routes, so that a map which fails to load leaves nothing to undo
+            self.message_map = self._make_message_map(bot)
+
+        bot.add_irc_route(self.irc_channel, self.handle_irc_message, network=self.irc_network)
+        bot.add_discord_route(self.discord_channel_id, self.handle_discord_message)
+        if self.relay_edits:
+            bot.add_discord_route(self.discord_channel_id, self.handle_discord_edit, event='edit')
+            bot.add_discord_route(self.discord_channel_id, self.handle_discord_delete, event='delete')
+
+    def unload(self, bot: WalnutBot) -> None:
+        """Removes the relay from the bot, lines waiting to be coalesced are still sent"""
+        bot.remove_irc_route(self.irc_channel, self.handle_irc_message, network=self.irc_network)
+        bot.remove_discord_route(self.discord_channel_id, self.handle_discord_message)
+        if self.message_map is not None:
+            bot.remove_discord_route(self.discord_channel_id, self.handle_discord_edit, event='edit')
+            bot.remove_discord_route(self.discord_channel_id, self.handle_discord_delete, event='delete')
+            self.message_map.close()
+
+    def _make_message_map(self, bot: WalnutBot) -> MessageMap:
+        config = bot.config.cache_config
+        file = None
+        if config.message_map_dir is not None:
+            name = re.sub(r'[^\w#.-]', '_', f'{self.irc_network}-{self.irc_channel}-{self.discord_channel_id}')
+            file = Path(config.message_map_dir) / f'{name}.jsonl'
+            file.parent.mkdir(parents=True, exist_ok=True)
+
+        message_map = MessageMap(config.message_map_entries, config.message_map_age, file)
+        message_map.load()
+        return message_map
 
     async def handle_irc_message(self, message: IRCMessage) -> None:
         """Handles and relays an IRC message"""
         if not self.bot:
             raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
 
-        if message.channel != self.irc_channel:
+        if message.channel != self.irc_channel or message.network != self.irc_network:
             return
 
         if not self.discord_channel:
@@ -85,87 +160,382 @@ class MessageRelay(BaseHook):
         if not isinstance(self.discord_channel, Messageable):
             raise ValueError('Given Discord channel ID is not a messageable channel')
 
+        if self.bot.metrics is not None:
+            self.bot.metrics.messages.inc(self.irc_network, self.irc_channel, 'irc_to_discord')
+
+        content = self.format_irc_content(message.content)
+        if self.coalesce_window > 0:
+            await self._coalesce(message, content)
+            return
+
+        await self.send_to_discord(message.sender, [content])
+
+    async def send_to_discord(self, sender: str, lines: list[str]) -> None:
+        """
+        Sends lines of an IRC user to Discord as a single message
+
+        Args:
+            sender: Nickname of the IRC user
+            lines: Lines with IRC formatting already converted, see format_irc_content()
+        """
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        if not isinstance(self.discord_channel, Messageable):
+            raise ValueError('Given Discord channel ID is not a messageable channel')
+
         # Prefer sending message via a Discord webhook
         if self.discord_webhook_url:
-            member = self.discord_channel.guild.get_member_named(message.author)
-            async with aiohttp.ClientSession() as session:
-                webhook = discord.Webhook.from_url(
-                    url=self.discord_webhook_url,
-                    session=session
+            avatar_url = self.bot.get_member_avatar_url(self.discord_channel.guild, sender)
+            dispatcher = self.get_webhook_dispatcher()
+            with self.bot.measure_send('webhook'):
+                await dispatcher.send(
+                    content='\n'.join(lines),
+                    username=sender,
+                    avatar_url=avatar_url
                 )
+            return
 
-                if not hasattr(webhook, 'send'):
-                    raise RuntimeError('Resolved Webhook has no send()')
+        name = escape_markdown(sender) if self.irc_formatting == 'markdown' else sender
+        text = '\n'.join(lines)
+        with self.bot.measure_send('channel'):
+            sent = await self.discord_channel.send(f'<{name}> {text}')
+        # the bot's own messages aren't passed to hooks, replies to them should name the IRC user anyway
+        excerpt = make_excerpt(text)
+        self.bot.reply_contexts.add(self.discord_channel_id, sent.id, sender, excerpt)
+        if self.message_map is not None:
+            self.message_map.add(sent.id, RelayedMessage('irc', sender, excerpt, None, time.time()))
 
-                await webhook.send(  # type: ignore[attr-defined]
-                    username=message.author,
-                    avatar_url=member.avatar.url if member and member.avatar else None,
-                    content=message.content
-                )
+    async def edit_last_discord_message(self, sender: str, lines: list[str]) -> bool:
+        """
+        Replaces the content of the latest message relayed from an IRC user to Discord
+
+        Requires `relay_edits` to be enabled, the message is found without API calls.
+
+        Args:
+            sender: Nickname of the IRC user
+            lines: Lines with IRC formatting already converted, see format_irc_content()
+
+        Returns:
+            bool: False if no message of the user is known
+        """
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        if self.message_map is None:
+            return False
+
+        latest = self.message_map.latest_from(sender)
+        if latest is None:
+            return False
+
+        message_id, relayed = latest
+        text = '\n'.join(lines)
+        if relayed.webhook_id is not None:
+            bucket = next(
+                (bucket for bucket in self.get_webhook_dispatcher().buckets if bucket.webhook_id == relayed.webhook_id),
+                None
+            )
+            if bucket is None:
+                return False
+            webhook = discord.Webhook.partial(bucket.webhook_id, bucket.token, session=self.bot.get_http_session())
+            with self.bot.measure_send('webhook'):
+                await webhook.edit_message(message_id, content=text)  # type: ignore[attr-defined]
+        else:
+            if self.discord_channel is None:
+                self.discord_channel = self.bot.discord.get_channel(self.discord_channel_id)
+            if not isinstance(self.discord_channel, (discord.TextChannel, discord.Thread)):
+                return False
+            name = escape_markdown(sender) if self.irc_formatting == 'markdown' else sender
+            with self.bot.measure_send('channel'):
+                await self.discord_channel.get_partial_message(message_id).edit(content=f'<{name}> {text}')
+
+        excerpt = make_excerpt(text)
+        self.message_map.add(message_id, relayed._replace(excerpt=excerpt))
+        self.bot.reply_contexts.add(self.discord_channel_id, message_id, relayed.author, excerpt)
+        return True
+
+    async def _coalesce(self, message: IRCMessage, content: str) -> None:
+        """
+        Adds a line to the pending batch, sending the batch first if the line can't join it
+
+        A batch is sent once no line joined it for `coalesce_window` seconds,
+        or `coalesce_max_delay` seconds after its first line arrived.
+        """
+        # batches only hold lines of a single author, so a different author flushes the batch, keeping order
+        if self._batch and (
+            self._batch_sender != message.sender
+            or self._batch_length + 1 + len(content) > self._batch_limit(message.sender)
+        ):
+            await self._flush()
+
+        now = time.monotonic()
+        if not self._batch:
+            self._batch_sender = message.sender
+            self._batch_started = now
+            self._batch_length = len(content)
+        else:
+            self._batch_length += 1 + len(content)
+        self._batch.append(content)
+
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        delay = min(self.coalesce_window, self._batch_started + self.coalesce_max_delay - now)
+        if delay <= 0:
+            await self._flush()
+            return
+        self._flush_timer = asyncio.get_running_loop().call_later(delay, self._flush_later)
+
+    def _batch_limit(self, sender: str) -> int:
+        if self.discord_webhook_url:
+            return DISCORD_MESSAGE_LIMIT
+        # leave room for the "<nickname> " prefix, escaping can at most double its length
+        return DISCORD_MESSAGE_LIMIT - 2 * len(sender) - 3
+
+    def _flush_later(self) -> None:
+        self._flush_timer = None
+        task = asyncio.create_task(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error('Failed to relay IRC messages in %r', self, exc_info=task.exception())
+
+    async def _flush(self) -> None:
+        """Sends the pending batch, if any"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._batch = self._batch, []
+        sender, self._batch_sender = self._batch_sender, None
+        if not batch or sender is None:
             return
 
-        await self.discord_channel.send(f'<{message.sender}> {message}')
+        # the lock is acquired in FIFO order, so batches are sent in the order they were taken.
+        # the webhook dispatcher alone isn't enough, it sends batches of different authors in parallel
+        async with self._send_lock:
+            await self.send_to_discord(sender, batch)
+
+    def get_webhook_dispatcher(self) -> WebhookDispatcher:
+        """Returns the dispatcher sending messages through the relay's Discord webhooks"""
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        if not self.discord_webhook_url:
+            raise ValueError('Relay has no Discord webhook URL configured')
+
+        if self.webhook_dispatcher is None:
+            self.webhook_dispatcher = WebhookDispatcher(
+                [self.discord_webhook_url, *self.discord_webhook_urls],
+                get_session=self.bot.get_http_session
+            )
+
+        return self.webhook_dispatcher
 
     async def handle_discord_message(self, message: discord.Message) -> None:
         """Handles and relays a Discord message"""
         if not self.bot:
             raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
 
-        if message.author.bot or message.channel.id != self.discord_channel_id:
+        if message.channel.id != self.discord_channel_id:
             return
 
+        content = cast(str, message.clean_content)
+        # webhook messages are remembered too, since they are relayed IRC messages which can be replied to
+        context = self.make_reply_context(message, content)
+        self.bot.reply_contexts.add(message.channel.id, message.id, context.author, context.excerpt)
+        if message.author.bot:
+            if self.message_map is not None and self._is_relay_webhook(message.webhook_id):
+                # IDs of webhook messages are only known once Discord delivers them
+                self.message_map.add(message.id, RelayedMessage(
+                    'irc', context.author, context.excerpt, message.webhook_id, time.time()
+                ))
+            return
+
+        if self.bot.metrics is not None:
+            self.bot.metrics.messages.inc(self.irc_network, self.irc_channel, 'discord_to_irc')
+
         nickname = self.format_discord_user(message.author)
+        if self.message_map is not None:
+            self.message_map.add(message.id, RelayedMessage('discord', nickname, context.excerpt, None, time.time()))
 
         reply = ''
-        if message.reference and message.reference.cached_message:
-            reference_author = self.format_discord_user(
-                message.reference.cached_message.author,
-                colorize=False
-            )
-            reply = f'[Replying to {reference_author}] '
+        if message.reference is not None:
+            reply_context = self.get_reply_context(message.reference)
+            if reply_context is not None:
+                reply = self.format_reply(reply_context)
 
         # Handle stickers first. API supports multiple, but clients do not
         for sticker in message.stickers:
-            return await self.bot.irc.privmsg(
+            self.bot.send_irc_message(
                 self.irc_channel,
-                f'<{nickname}> Sticker: {sticker.name} ({sticker.url})'
+                f'<{nickname}> Sticker: {sticker.name} ({sticker.url})',
+                network=self.irc_network
             )
+            return
 
         # Treat emoji-only messages similar to stickers
         if m := re.match(EMOJI_REGEX, message.content):
             # discord.py's get_emoji relies on the emoji being from a shared server
             # and ID is sufficient to get the image URL
             emoji_url = get_emoji_url(int(m.group('id')))
-            await self.bot.irc.privmsg(
+            self.bot.send_irc_message(
                 self.irc_channel,
-                f'<{nickname}> Emoji: {m.group("name")} {emoji_url}'
+                f'<{nickname}> Emoji: {m.group("name")} {emoji_url}',
+                network=self.irc_network
             )
         # Regular message, still want to strip out emoji IDs (<:emote:12345> -> :emote:)
         else:
-            parsed = parse_markdown(cast(str, message.clean_content))
-            if parsed.count('\n') > 3:  # preserve new lines without spam
-                parsed = parsed.replace('\n', ' ')
-
-            for part in parsed.split('\n'):
-                await self.bot.irc.privmsg(
-                    self.irc_channel,
-                    f'<{nickname}> {reply}' + part
-                )
+            for line in self.format_irc_lines(content, prefix=f'<{nickname}> {reply}'):
+                self.bot.send_irc_message(self.irc_channel, line, network=self.irc_network, split=False)
 
         # Send each attachment as a separate message with the URL
         for attachment in message.attachments:
-            await self.bot.irc.privmsg(
+            self.bot.send_irc_message(
                 self.irc_channel,
-                f'<{nickname}> {attachment.url}'
+                f'<{nickname}> {attachment.url}',
+                network=self.irc_network
             )
 
+    async def handle_discord_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        """Relays an edit of a Discord message which was relayed to IRC, as a notice"""
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        if self.message_map is None or payload.channel_id != self.discord_channel_id:
+            return
+
+        relayed = self.message_map.get(payload.message_id)
+        # embeds being resolved are edits too, but don't set the edit timestamp
+        if relayed is None or relayed.origin != 'discord' or payload.data.get('edited_timestamp') is None:
+            return
+
+        message = message_from_edit(self.bot.discord, payload)
+        if message is None:
+            return
+
+        content = cast(str, message.clean_content)
+        context = self.make_reply_context(message, content)
+        self.message_map.add(payload.message_id, relayed._replace(excerpt=context.excerpt))
+        self.bot.reply_contexts.add(payload.channel_id, payload.message_id, context.author, context.excerpt)
+        for line in self.format_irc_lines(content, prefix=f'<{relayed.author}> [edited] '):
+            self.bot.send_irc_message(self.irc_channel, line, network=self.irc_network, notice=True, split=False)
+
+    async def handle_discord_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        """Relays a deletion of a message relayed to or from IRC, as a notice"""
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        if self.message_map is None or payload.channel_id != self.discord_channel_id:
+            return
+
+        self.bot.reply_contexts.pop(payload.channel_id, payload.message_id)
+        relayed = self.message_map.pop(payload.message_id)
+        if relayed is None:
+            return
+
+        if relayed.origin == 'discord':
+            line = f'<{relayed.author}> [deleted] {relayed.excerpt}'
+        else:
+            author = sanitize_nickname(relayed.author) if self.prevent_self_pinging else relayed.author
+            line = f'[deleted on Discord] <{author}> {relayed.excerpt}'
+        self.bot.send_irc_message(self.irc_channel, line.rstrip(), network=self.irc_network, notice=True)
+
+    def _is_relay_webhook(self, webhook_id: int | None) -> bool:
+        if webhook_id is None or not self.discord_webhook_url:
+            return False
+        return any(bucket.webhook_id == webhook_id for bucket in self.get_webhook_dispatcher().buckets)
+
+    def format_irc_lines(self, content: str, prefix: str) -> list[str]:
+        """Renders content of a Discord message as IRC lines fitting the message limit, each starting with `prefix`"""
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        parsed = self.render_markdown(content)
+        limit = self.bot.irc_message_limit(self.irc_channel, network=self.irc_network)
+        if parsed.count('\n') > 3:  # preserve new lines without spam
+            return pack_lines(parsed.split('\n'), limit, prefix=prefix)
+        return [line for part in parsed.split('\n') for line in pack_lines([part], limit, prefix=prefix)]
+
+    def make_reply_context(self, message: discord.Message, content: str | None = None) -> ReplyContext:
+        """
+        Returns what replies to a Discord message are shown with
+
+        Args:
+            message: Discord message
+            content: Clean content of the message, if already known
+        """
+        if message.webhook_id is not None:
+            # webhook names are IRC nicknames of relayed messages, not Discord users
+            author = message.author.name
+        else:
+            author = self.format_discord_user(message.author, colorize=False)
+        if content is None:
+            content = cast(str, message.clean_content)
+        return ReplyContext(author, make_excerpt(content))
+
+    def get_reply_context(self, reference: discord.MessageReference) -> ReplyContext | None:
+        """Returns the author and excerpt of a replied to message, if known without an API call"""
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        if reference.message_id is None:
+            return None
+
+        context = self.bot.reply_contexts.get(reference.channel_id, reference.message_id)
+        if context is None and reference.cached_message is not None:
+            context = self.make_reply_context(reference.cached_message)
+        return context
+
+    def format_reply(self, context: ReplyContext) -> str:
+        """Formats a replied to message for display on IRC, before the reply's content"""
+        if not self.reply_excerpt_length or not context.excerpt:
+            return f'[Replying to {context.author}] '
+
+        excerpt = context.excerpt
+        if len(excerpt) > self.reply_excerpt_length:
+            excerpt = excerpt[:self.reply_excerpt_length - 1].rstrip() + '…'
+        return f'[Replying to {context.author}: {excerpt}] '
+
+    def format_irc_content(self, content: str) -> str:
+        """Converts IRC formatting of a message for display on Discord"""
+        if self.irc_formatting == 'markdown':
+            return to_markdown(content)
+        if self.irc_formatting == 'strip':
+            return strip_formatting(content)
+        return content
+
+    def render_markdown(self, content: str) -> str:
+        """Renders Discord markdown as IRC formatting, using the bot's render cache"""
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        # the default pipeline leaves plain text unchanged, which is cheaper to check than to parse or cache
+        if self.markdown_parser is parse_markdown and is_plain_text(content):
+            return content
+
+        # the parser is a part of the key, so relays rendering differently never share results
+        key = (self.markdown_parser, content)
+        rendered = self.bot.render_cache.get(key)
+        if rendered is None:
+            with self.bot.measure_render():
+                rendered = self.markdown_parser(content)
+            self.bot.render_cache.put(key, rendered)
+
+        return rendered
+
     def format_discord_user(self, user: discord.User | discord.Member, **kwargs) -> str:
         """Formats Discord user's name for display on IRC"""
-        params = {
-            'colorize': self.colorize_irc_nicknames,
-            'use_nickname': self.use_discord_nicknames,
-            'use_username': self.use_discord_usernames_with_nicknames,
-            'prevent_pinging': self.prevent_self_pinging,
-        }
-        params.update(kwargs)
-        return format_discord_user(user, **params)
+        if not self.bot:
+            raise RuntimeError('Relay not loaded, Relay.load(bot) must be called first')
+
+        return self.bot.display_names.format_user(
+            user,
+            colorize=kwargs.get('colorize', self.colorize_irc_nicknames),
+            use_nickname=kwargs.get('use_nickname', self.use_discord_nicknames),
+            use_username=kwargs.get('use_username', self.use_discord_usernames_with_nicknames),
+            prevent_pinging=kwargs.get('prevent_pinging', self.prevent_self_pinging)
+        )
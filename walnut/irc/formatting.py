@@ -27,6 +27,9 @@ __all__ = [
     'underline',
     'strikethrough',
     'plain',
+    'strip_formatting',
+    'escape_markdown',
+    'to_markdown',
     # utility enum
     'Colors',
 ]
@@ -117,6 +120,43 @@ PLAIN_PATTERN = '|'.join([
 ])
 PLAIN_REGEX = re.compile(PLAIN_PATTERN)
 
+CONTROL_TOGGLES = [
+    CONTROL_BOLD,
+    CONTROL_ITALIC,
+    CONTROL_UNDERLINE,
+    CONTROL_STRIKETHROUGH,
+    CONTROL_MONOSPACE,
+    CONTROL_REVERSE,
+]
+"""A list of control characters toggling formatting on and off."""
+
+CONTROL_REGEX = re.compile(
+    re.escape(CONTROL_COLOR) + r'(?:(?P<fg>\d{1,2})(?:,(?P<bg>\d{1,2}))?)?'
+    + '|' + re.escape(CONTROL_HEX_COLOR) + r'(?:(?P<hex_fg>[a-fA-F0-9]{6})(?:,(?P<hex_bg>[a-fA-F0-9]{6}))?)?'
+    + '|[' + re.escape(''.join(CONTROL_TOGGLES) + CONTROL_NORMAL) + ']'
+)
+"""Regex matching a single formatting control code, including color arguments."""
+
+MARKDOWN_TOGGLES = {
+    CONTROL_BOLD: '**',
+    CONTROL_ITALIC: '*',
+    CONTROL_UNDERLINE: '__',
+    CONTROL_STRIKETHROUGH: '~~',
+    CONTROL_MONOSPACE: '`',
+}
+"""Mapping of control characters to equivalent Discord markdown markers."""
+
+# quotes, headings, subtext and lists, only recognized at the start of a message
+_BLOCK_START_REGEX = re.compile(r'>|#{1,3} |-# |- ')
+URL_REGEX = re.compile(r'((?:https?|ftp)://[^\s<]+[^<.,:;"\')\]\s])')
+
+_NON_PRINTING_REGEX = re.compile('[' + re.escape(''.join(CONTROL_NON_PRINTING)) + ']')
+_SPECIAL_REGEX = re.compile('[' + re.escape(''.join(CONTROL_NON_PRINTING) + '\\*_~|`[') + ']')
+_STRIP_TABLE = dict.fromkeys(map(ord, CONTROL_NON_PRINTING))
+_ESCAPE_TABLE = _STRIP_TABLE | {ord(char): '\\' + char for char in '\\*_~|`['}
+# backticks can't be escaped inside inline code, replace them with a lookalike
+_CODE_TABLE = _STRIP_TABLE | {ord('`'): '\u02cb'}
+
 
 class Colors(str, Enum):
     """Mapping of color names to mIRC code values."""
@@ -240,3 +280,98 @@ def plain(text: str) -> str:
     if '\x03' in text or '\x04' in text:
         text = PLAIN_REGEX.sub('', text)
     return ''.join(c for c in text if ord(c) >= 0x20 and c != '\x7F')
+
+
+def strip_formatting(text: str) -> str:
+    """Return the text without any IRC formatting or other control characters.
+
+    :param str text: text with potential IRC formatting control code(s)
+
+    Unlike :func:`plain`, single digit color codes are recognized, and
+    the text is processed with :meth:`str.translate` in a single pass,
+    unless it contains color codes.
+    """
+    if not _NON_PRINTING_REGEX.search(text):
+        return text
+    if CONTROL_COLOR in text or CONTROL_HEX_COLOR in text:
+        text = CONTROL_REGEX.sub('', text)
+    return text.translate(_STRIP_TABLE)
+
+
+def escape_markdown(text: str) -> str:
+    """Return the text with Discord markdown escaped and control characters removed.
+
+    :param str text: text to escape
+
+    URLs are left intact, since escaping would break them.
+    """
+    if '://' not in text:
+        return text.translate(_ESCAPE_TABLE)
+
+    # URL_REGEX has a single group, so every odd part is a URL
+    parts = URL_REGEX.split(text)
+    return ''.join(part if index % 2 else part.translate(_ESCAPE_TABLE) for index, part in enumerate(parts))
+
+
+def to_markdown(text: str) -> str:
+    """Return the text with IRC formatting converted to Discord markdown.
+
+    :param str text: text with potential IRC formatting control code(s)
+
+    Bold, italics, underline, strikethrough and monospace are converted,
+    colors and reverse are dropped. Markdown in the text itself is escaped.
+    The text is processed in a single pass over control codes, and markers
+    are placed next to the formatted words, never next to whitespace,
+    since Discord would not render them otherwise.
+    """
+    if not _SPECIAL_REGEX.search(text) and not _BLOCK_START_REGEX.match(text.lstrip(' ')):
+        return text
+
+    out: list[str] = []
+    active: list[str] = []  # markers of formatting toggled on, in nesting order
+    opened: list[str] = []  # markers already written to the output
+    pending = ''  # whitespace held back until preceding markers are closed
+
+    position = 0
+    matches = CONTROL_REGEX.finditer(text)
+    while True:
+        match = next(matches, None)
+        segment = text[position:match.start() if match else len(text)]
+        core = segment.strip(' ')
+        if not core:
+            pending += segment
+        else:
+            lead = segment[:segment.index(core[0])]
+            if active and active[-1] == '`':
+                escaped = core.translate(_CODE_TABLE)
+            else:
+                escaped = escape_markdown(core)
+                if not out and _BLOCK_START_REGEX.match(escaped):
+                    escaped = '\\' + escaped
+
+            common = 0
+            while common < len(opened) and common < len(active) and opened[common] == active[common]:
+                common += 1
+
+            out.append(''.join(reversed(opened[common:])) + pending + lead + ''.join(active[common:]) + escaped)
+            opened = active.copy()
+            pending = segment[len(lead) + len(core):]
+
+        if match is None:
+            break
+        position = match.end()
+
+        code = match.group()
+        if code == CONTROL_NORMAL:
+            active.clear()
+        elif marker := MARKDOWN_TOGGLES.get(code):
+            if marker in active:
+                active.remove(marker)
+            elif active and active[-1] == '`':
+                # markdown is not rendered inside inline code, so it always has to be the innermost marker
+                active.insert(-1, marker)
+            else:
+                active.append(marker)
+
+    out.append(''.join(reversed(opened)) + pending)
+    return ''.join(out)
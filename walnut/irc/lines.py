@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+from pyrcb2.graphemes import graphemes
+
+from walnut.irc.formatting import CONTROL_COLOR, CONTROL_HEX_COLOR, CONTROL_NORMAL, CONTROL_REGEX, CONTROL_TOGGLES
+
+__all__ = [
+    'IRC_LINE_LENGTH',
+    'message_byte_limit',
+    'pack_lines',
+]
+
+IRC_LINE_LENGTH = 512
+"""Maximum length of an IRC line in bytes, including the trailing CR LF."""
+DEFAULT_USERNAME_LENGTH = 10
+"""Assumed username length when it is not known, typical server limit."""
+DEFAULT_HOSTNAME_LENGTH = 63
+"""Assumed hostname length when it is not known, maximum allowed by RFC 1035."""
+
+
+def message_byte_limit(
+    target: str,
+    nickname: str,
+    username: str | None = None,
+    hostname: str | None = None,
+    command: str = 'PRIVMSG'
+) -> int:
+    """
+    Returns the maximum length of a message's text in bytes, which will not be cut off by the server
+
+    The server relays our message as ``:nickname!username@hostname PRIVMSG #channel :text\\r\\n``,
+    so the whole line, including our hostmask, has to fit within 512 bytes. One more byte is reserved
+    for the ``+`` or ``-`` prepended to the text for clients with the identify-msg capability,
+    the same as pyrcb2's ``IRCBot.safe_length``.
+
+    :param target: channel or nickname the message is sent to
+    :param nickname: our nickname
+    :param username: our username, if known
+    :param hostname: our hostname as seen by others, if known
+    :param command: IRC command used to send the message
+    """
+    user_len = len(username.encode('utf-8')) if username else DEFAULT_USERNAME_LENGTH
+    host_len = len(hostname.encode('utf-8')) if hostname else DEFAULT_HOSTNAME_LENGTH
+    mask_len = len(f':{nickname}!'.encode('utf-8')) + user_len + len('@') + host_len
+    return IRC_LINE_LENGTH - mask_len - len(f' {command} {target} :+\r\n'.encode('utf-8'))
+
+
+class _FormattingState:
+    """Tracks formatting active at a given point of an IRC-formatted string"""
+
+    def __init__(self):
+        self.toggles: set[str] = set()
+        self.fg: str | None = None
+        self.bg: str | None = None
+        self.hex_fg: str | None = None
+        self.hex_bg: str | None = None
+
+    def update(self, match: re.Match) -> None:
+        code = match.group()
+        if code == CONTROL_NORMAL:
+            self.__init__()  # type: ignore[misc]
+        elif code in CONTROL_TOGGLES:
+            self.toggles ^= {code}
+        elif code[0] == CONTROL_COLOR:
+            if match.group('fg') is None:
+                self.fg = self.bg = None
+            else:
+                self.fg = match.group('fg').rjust(2, '0')
+                if match.group('bg') is not None:
+                    self.bg = match.group('bg').rjust(2, '0')
+        elif match.group('hex_fg') is None:
+            self.hex_fg = self.hex_bg = None
+        else:
+            self.hex_fg = match.group('hex_fg')
+            if match.group('hex_bg') is not None:
+                self.hex_bg = match.group('hex_bg')
+
+    def restore(self) -> str:
+        """Returns control codes re-applying the current formatting at the start of a new line"""
+        # colors first, so they are always followed by a control code or text not starting with a digit
+        codes = []
+        if self.fg is not None:
+            codes.append(CONTROL_COLOR + self.fg + (f',{self.bg}' if self.bg is not None else ''))
+        if self.hex_fg is not None:
+            codes.append(CONTROL_HEX_COLOR + self.hex_fg + (f',{self.hex_bg}' if self.hex_bg is not None else ''))
+        codes.extend(toggle for toggle in CONTROL_TOGGLES if toggle in self.toggles)
+        return ''.join(codes)
+
+
+def _atoms(word: str) -> Iterable[tuple[str, re.Match | None]]:
+    """Splits a word into graphemes and whole control codes, which must not be split"""
+    position = 0
+    for match in CONTROL_REGEX.finditer(word):
+        yield from ((grapheme, None) for grapheme in graphemes(word[position:match.start()]) if grapheme)
+        yield match.group(), match
+        position = match.end()
+    yield from ((grapheme, None) for grapheme in graphemes(word[position:]) if grapheme)
+
+
+def pack_lines(fragments: Iterable[str], max_bytes: int, prefix: str = '', separator: str = ' ') -> list[str]:
+    """
+    Packs text fragments into the fewest lines of at most ``max_bytes`` UTF-8 bytes each
+
+    Fragments are joined with ``separator`` and wrapped at spaces. Words too long for a single line
+    are split between graphemes, never inside a multi-byte character or a formatting control code.
+    Every line starts with ``prefix``, followed by control codes re-applying formatting left open
+    on the previous line, since IRC clients reset formatting at the end of every line.
+
+    :param fragments: text fragments, such as lines of a multi-line message
+    :param max_bytes: maximum line length in bytes, see :func:`message_byte_limit`
+    :param prefix: text prepended to every line, such as the author's nickname
+    :param separator: text inserted between packed fragments
+    :raises ValueError: if ``prefix`` leaves no room for the text
+    """
+    prefix_len = len(prefix.encode('utf-8'))
+    text = separator.join(fragment.replace('\n', separator) for fragment in fragments)
+    state = _FormattingState()
+
+    lines: list[str] = []
+    parts: list[str] = []
+    length = 0
+    has_text = False
+
+    def start_line() -> None:
+        nonlocal length, has_text
+        if has_text:
+            lines.append(prefix + ''.join(parts))
+        restore = state.restore()
+        parts.clear()
+        parts.append(restore)
+        length = prefix_len + len(restore.encode('utf-8'))
+        has_text = False
+        if length >= max_bytes:
+            raise ValueError('Line prefix does not leave any space for the message')
+
+    start_line()
+    for word in text.split(' '):
+        word_len = len(word.encode('utf-8'))
+        space = ' ' if has_text else ''
+        if length + len(space) + word_len > max_bytes and has_text:
+            start_line()
+            space = ''
+
+        if length + len(space) + word_len <= max_bytes:
+            parts.append(space + word)
+            length += len(space) + word_len
+            has_text = has_text or bool(word)
+            for match in CONTROL_REGEX.finditer(word):
+                state.update(match)
+            continue
+
+        # the word doesn't fit even on an empty line, split it between graphemes
+        for atom, control in _atoms(word):
+            atom_len = len(atom.encode('utf-8'))
+            if length + atom_len > max_bytes:
+                start_line()
+            parts.append(atom)
+            length += atom_len
+            # a line of control codes only isn't worth sending, they are re-applied from the state if needed
+            has_text = has_text or control is None
+            if control is not None:
+                state.update(control)
+
+    if has_text:
+        lines.append(prefix + ''.join(parts))
+    return lines
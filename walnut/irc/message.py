@@ -12,6 +12,7 @@ class Message:
     sender: Sender
     channel: IStr
     content: str
+    network: str = 'default'
 
     @property
     def author(self) -> Sender:
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable
+
+from pyrcb2 import ANY_ARGS, Error, Reply, WaitError
+from pyrcb2.events import Event
+from pyrcb2.itypes import IStr, Sender
+from pyrcb2.pyrcb2 import IRCBot
+
+from walnut.irc.scheduler import Priority, SendScheduler
+
+if TYPE_CHECKING:
+    from walnut.config import IRCConfig
+
+__all__ = [
+    'IRCNetwork',
+]
+
+logger = logging.getLogger(__name__)
+
+MessageCallback = Callable[['IRCNetwork', Sender, IStr, str], Awaitable[None]]
+
+STABLE_CONNECTION = 60.0
+"""Seconds a connection has to last for, before the reconnect delay is reset."""
+NICKNAME_ATTEMPTS = 3
+"""Nicknames tried when registering, an underscore is appended to the configured one for every retry."""
+REGISTRATION_ERRORS = {'ERR_ERRONEUSNICKNAME', 'ERR_NICKNAMEINUSE', 'ERR_NICKCOLLISION', 'ERR_UNAVAILRESOURCE'}
+
+
+class IRCNetwork:
+    """
+    Connection to a single IRC network, with its own flood controlled send queue
+
+    The send queue is paused while disconnected, so lines sent in the meantime are kept
+    (up to the queue limit of every target) and sent once reconnected.
+
+    Attributes:
+        name: Name of the network, as configured
+        config (IRCConfig): Connection configuration
+        irc (pyrcb2.IRCBot): IRC client
+        scheduler (SendScheduler): Rate limited queue of outgoing lines
+        reconnects: Number of times the connection was lost and reestablished, failed attempts aren't counted
+    """
+
+    def __init__(self, config: IRCConfig, on_message: MessageCallback):
+        self.name = config.name
+        self.config = config
+        self._on_message = on_message
+
+        # wire logging is configured once for all networks, see walnut.logs.configure_wire_logging
+        self.irc = IRCBot()
+        self.irc.load_events(self)
+        # flood control is handled by the scheduler, pyrcb2 only answers PINGs immediately
+        self.irc.delay_messages = False
+        self.irc.delay_privmsgs = False
+        self.scheduler = SendScheduler(
+            rate=config.flood_rate,
+            burst=config.flood_burst,
+            max_queue=config.max_queued_lines,
+            overflow=config.queue_overflow
+        )
+        # nothing can be sent until connected and registered
+        self.scheduler.pause()
+        self.reconnects = 0
+        self._registered_once = False
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} {self.name} {self.config.server}:{self.config.port}>'
+
+    @property
+    def nickname(self) -> str:
+        """Current nickname, or the configured one if not registered yet"""
+        return self.irc.nickname or self.config.nickname
+
+    @property
+    def connected(self) -> bool:
+        """Whether the network is connected and registered, and queued lines are being sent"""
+        return not self.scheduler.paused
+
+    async def run(self, on_connect: Callable[[], Awaitable[None]]) -> None:
+        """
+        Keeps the network connected forever, reconnecting with exponential backoff
+
+        Args:
+            on_connect: Called to connect, every time the connection has to be established, see connect()
+        """
+        delay = self.config.reconnect_delay
+        while True:
+            connected_at = time.monotonic()
+            try:
+                await self.irc.run(on_connect())
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning('Failed to connect to IRC network %s: %s', self.name, e)
+            except Exception:
+                # e.g. registration being refused, the next attempt may still succeed
+                logger.exception('Lost connection to IRC network %s', self.name)
+            else:
+                logger.warning('Disconnected from IRC network %s', self.name)
+            self.scheduler.pause()
+
+            if time.monotonic() - connected_at >= STABLE_CONNECTION:
+                delay = self.config.reconnect_delay
+            # jitter spreads out reconnects of many bots (or workers) disconnected at once
+            wait = random.uniform(delay / 2, delay)
+            delay = min(delay * 2, self.config.max_reconnect_delay)
+            logger.info(
+                'Reconnecting to IRC network %s in %.1f seconds, %d lines queued',
+                self.name, wait, self.scheduler.queue_depth()
+            )
+            await asyncio.sleep(wait)
+
+    async def connect(self, channels: Iterable[str] = ()) -> None:
+        """Connects, registers, queues JOINs of given channels, and resumes sending queued lines"""
+        await self.irc.connect(
+            hostname=self.config.server,
+            port=self.config.port,
+            ssl=self.config.ssl
+        )
+        await self._register()
+        if self._registered_once:
+            self.reconnects += 1
+        self._registered_once = True
+
+        for channel in channels:
+            self.scheduler.submit(channel, partial(self.irc.join, channel), Priority.CONTROL)
+        self.scheduler.resume()
+
+    async def _register(self) -> None:
+        """
+        Registers with the configured nickname, falling back to alternate ones while it's in use
+
+        After a reconnect, the server often still holds the nickname of the previous connection.
+        """
+        nickname = self.config.nickname
+        try:
+            await self.irc.register(
+                nickname=nickname,
+                username=self.config.username,
+                realname=self.config.realname,
+                password=self.config.password
+            )
+            return
+        except WaitError as e:
+            if not _nickname_in_use(e):
+                raise
+            error = e
+
+        # USER was already sent, only the nickname has to be changed to complete registration
+        for _ in range(NICKNAME_ATTEMPTS - 1):
+            logger.warning('Nickname %s is in use on IRC network %s: %s', nickname, self.name, error)
+            nickname += '_'
+            await self.irc.send_command('NICK', nickname)
+            result = await self.irc.wait_for(
+                Reply('RPL_WELCOME', ANY_ARGS),
+                errors=Error(REGISTRATION_ERRORS, ANY_ARGS)
+            )
+            if result.success:
+                return
+            error = result.to_exception('Could not register.')
+            if not _nickname_in_use(error):
+                break
+        raise error
+
+    def join(self, channel: str) -> None:
+        """Queues a JOIN of a channel, if connected, otherwise channels are joined by connect()"""
+        if self.connected:
+            self.scheduler.submit(channel, partial(self.irc.join, channel), Priority.CONTROL)
+
+    def part(self, channel: str) -> None:
+        """Queues a PART of a channel if connected, and drops lines waiting to be sent to it"""
+        self.scheduler.discard(channel)
+        if self.connected:
+            self.scheduler.submit(channel, partial(self.irc.part, channel), Priority.CONTROL)
+
+    def message_limit(self, target: str) -> int:
+        """
+        Returns the maximum length in bytes of a message sent to a given target, which won't be cut off
+
+        This is the limit pyrcb2 splits messages at, so lines packed to it are sent whole.
+        It accounts for pending nickname changes too, see lines.message_byte_limit().
+        """
+        return self.irc.safe_length('PRIVMSG', target)
+
+    @Event.privmsg  # type: ignore[attr-defined]
+    async def _on_privmsg(self, sender: Sender, channel: IStr, message: str) -> None:
+        await self._on_message(self, sender, channel, message)
+
+
+def _nickname_in_use(error: Exception) -> bool:
+    message = getattr(getattr(error, 'result', None), 'error', None)
+    # ERR_NICKNAMEINUSE and ERR_NICKCOLLISION, errors are received as numerics
+    return message is not None and len(message) > 1 and message[1] in ('433', '436')
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import discord
 
+from walnut.cache import LRUCache
 from walnut.discord.helpers import get_nickname
 from walnut.irc.formatting import color
 
@@ -55,3 +56,41 @@ def format_discord_user(
         return color(name, selected_color)
 
     return name
+
+
+class DisplayNameCache:
+    """
+    Cache of :func:`format_discord_user` results
+
+    Names are cached per user and formatting options, and per guild for members,
+    since nicknames differ between guilds. Entries must be invalidated when a user or member is updated.
+    """
+
+    def __init__(self, max_users: int):
+        self.users: LRUCache[int, dict[tuple, str]] = LRUCache(max_entries=max_users)
+
+    def format_user(
+        self,
+        user: discord.User | discord.Member,
+        colorize: bool = True,
+        use_nickname: bool = True,
+        use_username: bool = False,
+        prevent_pinging: bool = True
+    ) -> str:
+        """Returns a cached IRC-formatted name of a user, see :func:`format_discord_user`"""
+        guild = getattr(user, 'guild', None)
+        key = (guild.id if guild else None, colorize, use_nickname, use_username, prevent_pinging)
+
+        names = self.users.get(user.id)
+        if names is None:
+            names = {}
+            self.users.put(user.id, names)
+
+        name = names.get(key)
+        if name is None:
+            name = names[key] = format_discord_user(user, colorize, use_nickname, use_username, prevent_pinging)
+        return name
+
+    def invalidate(self, user_id: int) -> None:
+        """Removes cached names of a user"""
+        self.users.pop(user_id)
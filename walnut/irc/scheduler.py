@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from enum import Enum, IntEnum
+from typing import Any, Awaitable, Callable
+
+__all__ = [
+    'OverflowPolicy',
+    'Priority',
+    'SendScheduler',
+    'TokenBucket',
+]
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Priority of an outgoing IRC line, lower values are sent first"""
+    CONTROL = 0
+    NORMAL = 1
+
+
+class OverflowPolicy(str, Enum):
+    """What to do with a new line, when a target's queue is full"""
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter
+
+    Starts full with `burst` tokens, refilled at `rate` tokens per second.
+    Time is read from `clock`, which can be replaced for testing.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError('Token bucket rate must be positive and burst at least 1')
+
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Returns seconds until a token will be available, 0 if one is available now"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def try_acquire(self) -> bool:
+        """Takes a token if one is available"""
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class SendScheduler:
+    """
+    Outgoing IRC line scheduler, keeping the bot within the server's flood limits
+
+    Lines are queued as callables, which send a single line when called.
+    Control lines (JOIN, PART, etc.) are always sent before relayed messages,
+    and relayed messages are sent round-robin between targets, so a busy channel can't starve a quiet one.
+
+    While paused, for example when disconnected, lines are kept queued up to `max_queue` per target,
+    and sent at the usual rate once resumed.
+
+    Attributes:
+        bucket: Token bucket limiting the rate of sent lines
+        max_queue: Maximum number of lines queued per target
+        overflow: Policy applied when a target's queue is full
+        dropped: Number of lines dropped due to full queues
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_queue: int = 100,
+        overflow: OverflowPolicy | str = OverflowPolicy.DROP_OLDEST,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep
+    ):
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.max_queue = max_queue
+        self.overflow = OverflowPolicy(overflow)
+        self.dropped = 0
+        self._sleep = sleep
+        self._control: deque[Callable[[], Any]] = deque()
+        self._queues: OrderedDict[str, deque[Callable[[], Any]]] = OrderedDict()
+        self._depth = 0
+        self._wakeup = asyncio.Event()
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    @property
+    def paused(self) -> bool:
+        """Whether sending is paused"""
+        return not self._resumed.is_set()
+
+    def pause(self) -> None:
+        """
+        Stops sending lines until resumed
+
+        Queued control lines are dropped, since they belong to a connection which was lost.
+        """
+        self._resumed.clear()
+        self._depth -= len(self._control)
+        self._control.clear()
+
+    def resume(self) -> None:
+        """Resumes sending queued lines"""
+        self._resumed.set()
+
+    def queue_depth(self, target: str | None = None) -> int:
+        """Returns the number of queued lines, for a single target or in total"""
+        if target is None:
+            return self._depth
+        return len(self._queues.get(target, ()))
+
+    def submit(self, target: str, func: Callable[[], Any], priority: Priority = Priority.NORMAL) -> bool:
+        """
+        Queues a line to be sent
+
+        Args:
+            target: Channel or nickname the line is addressed to
+            func: Callable sending the line, its return value is ignored
+            priority: Priority of the line
+
+        Returns:
+            bool: False if the line was dropped due to a full queue
+        """
+        if priority == Priority.CONTROL:
+            self._control.append(func)
+        else:
+            queue = self._queues.get(target)
+            if queue is None:
+                queue = self._queues[target] = deque()
+
+            if len(queue) >= self.max_queue:
+                self.dropped += 1
+                if self.overflow == OverflowPolicy.DROP_NEWEST:
+                    return False
+                queue.popleft()
+                self._depth -= 1
+
+            queue.append(func)
+
+        self._depth += 1
+        self._wakeup.set()
+        return True
+
+    def pop(self) -> Callable[[], Any] | None:
+        """Returns the next line to be sent, if any is queued and the rate limit allows it"""
+        if not self._depth or not self.bucket.try_acquire():
+            return None
+
+        self._depth -= 1
+        if self._control:
+            return self._control.popleft()
+
+        target, queue = next(iter(self._queues.items()))
+        func = queue.popleft()
+        if queue:
+            self._queues.move_to_end(target)
+        else:
+            del self._queues[target]
+        return func
+
+    def discard(self, target: str) -> int:
+        """Drops queued lines of a target, without counting them as dropped, returns the number of lines"""
+        queue = self._queues.pop(target, None)
+        if queue is None:
+            return 0
+        self._depth -= len(queue)
+        return len(queue)
+
+    def clear(self) -> None:
+        """Drops all queued lines, without counting them as dropped"""
+        self._control.clear()
+        self._queues.clear()
+        self._depth = 0
+
+    async def run(self) -> None:
+        """Sends queued lines forever, as fast as the rate limit allows"""
+        while True:
+            if not self._resumed.is_set():
+                await self._resumed.wait()
+                continue
+
+            if not self._depth:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self.bucket.delay()
+            if delay > 0:
+                await self._sleep(delay)
+                continue
+
+            func = self.pop()
+            if func is None:
+                continue
+
+            try:
+                func()
+            except Exception:
+                logger.exception('Failed to send a queued IRC line')
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import queue
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from walnut.config import LoggingConfig
+
+__all__ = [
+    'BackgroundHandler',
+    'SamplingFilter',
+    'configure_wire_logging',
+    'setup_logging',
+]
+
+WIRE_LOGGER = 'pyrcb2'
+"""Logger raw IRC lines are logged to, at the INFO level."""
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # unlike records, the sentinel must not be dropped, wait for the thread to make room for it
+        self.queue.put(self._sentinel)  # type: ignore[attr-defined]
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Handler queueing records to be formatted and written by other handlers on a background thread
+
+    Logging never blocks the caller: once the queue is full, records are dropped and counted.
+
+    Attributes:
+        handlers (list): Handlers records are passed to on the background thread
+        dropped: Number of records dropped due to a full queue
+    """
+
+    def __init__(self, handlers: list[logging.Handler], max_queue: int = 10000):
+        super().__init__(queue.Queue(max_queue))
+        self.handlers = handlers
+        self.dropped = 0
+        self._listener: _Listener | None = None
+
+    def start(self) -> None:
+        """Starts the background thread"""
+        if self._listener is None:
+            self._listener = _Listener(self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+
+    def stop(self) -> None:
+        """Writes out queued records and stops the background thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self.dropped:
+            for handler in self.handlers:
+                handler.handle(logging.makeLogRecord({
+                    'name': __name__,
+                    'levelno': logging.WARNING,
+                    'levelname': logging.getLevelName(logging.WARNING),
+                    'msg': '%d log records were dropped due to a full queue',
+                    'args': (self.dropped,),
+                }))
+
+    def close(self) -> None:
+        self.stop()
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # formatting is left to the handlers on the background thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Filter passing one in every `1 / rate` records
+
+    Attributes:
+        interval: Number of records per passed record
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.interval = max(1, round(1 / rate))
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        self._count += 1
+        if self._count < self.interval:
+            return False
+        self._count = 0
+        return True
+
+
+def setup_logging(config: LoggingConfig, fmt: str | None = None) -> BackgroundHandler:
+    """
+    Sends records of the root logger to a background thread, which writes them to stderr or a file
+
+    Args:
+        config: Logging configuration
+        fmt: Overrides the configured format
+
+    Returns:
+        BackgroundHandler: Installed handler, started
+    """
+    handler: logging.Handler = (
+        logging.FileHandler(config.file, encoding='utf-8') if config.file is not None else logging.StreamHandler()
+    )
+    handler.setFormatter(logging.Formatter(fmt or config.log_format))
+
+    background = BackgroundHandler([handler], config.queue_size)
+    root = logging.getLogger()
+    root.addHandler(background)
+    root.setLevel(config.level.upper())
+    background.start()
+    return background
+
+
+def configure_wire_logging(config: LoggingConfig) -> None:
+    """
+    Enables, samples or disables logging of raw IRC lines
+
+    Disabled wire logging costs a single level check per line.
+    """
+    wire_logger = logging.getLogger(WIRE_LOGGER)
+    for old_filter in wire_logger.filters[:]:
+        if isinstance(old_filter, SamplingFilter):
+            wire_logger.removeFilter(old_filter)
+
+    if config.irc_wire == 'off':
+        wire_logger.setLevel(logging.WARNING)
+        return
+
+    wire_logger.setLevel(logging.INFO)
+    if config.irc_wire == 'sampled':
+        wire_logger.addFilter(SamplingFilter(config.irc_wire_sample_rate))
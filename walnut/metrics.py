@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Iterator
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# seconds, from sub-millisecond rendering to multi-second HTTP requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple[str, ...], values: Labels) -> str:
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f'{{{pairs}}}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def merge_expositions(expositions: dict[str, str], label: str) -> str:
+    """
+    Merges metrics of multiple processes in the Prometheus text format into one
+
+    Samples get an additional label, set to the key of their exposition,
+    and metric families with the same name are grouped under a single HELP and TYPE.
+
+    Args:
+        expositions: Label value -> metrics in the text format
+        label: Name of the label distinguishing processes
+    """
+    families: dict[str, list[str]] = {}
+    for value, exposition in expositions.items():
+        lines: list[str] = []
+        for line in exposition.splitlines():
+            if line.startswith('# HELP '):
+                name = line.split(' ', 3)[2]
+                lines = families.setdefault(name, [line])
+            elif line.startswith('#'):
+                if line not in lines:
+                    lines.append(line)
+            elif line:
+                split = min((i for i in (line.find('{'), line.find(' ')) if i >= 0), default=len(line))
+                if line.startswith('{}', split):
+                    line = f'{line[:split]}{{{label}="{_escape(value)}"}}{line[split + 2:]}'
+                elif line.startswith('{', split):
+                    line = f'{line[:split + 1]}{label}="{_escape(value)}",{line[split + 1:]}'
+                else:
+                    line = f'{line[:split]}{{{label}="{_escape(value)}"}}{line[split:]}'
+                lines.append(line)
+
+    return '\n'.join(line for lines in families.values() for line in lines) + '\n'
+
+
+class Metric:
+    """
+    Base class of a metric, with a value per combination of label values
+
+    Attributes:
+        name: Metric name, as exported
+        documentation: Help text
+        labels: Label names
+        function: If set, called on collection and returning values per label values, instead of stored values
+    """
+    kind = 'untyped'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        function: Callable[[], dict[Labels, float]] | None = None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.function = function
+        self.values: dict[Labels, float] = {}
+
+    def collect(self) -> Iterator[str]:
+        """Yields lines of the Prometheus text exposition format"""
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        values = self.function() if self.function is not None else self.values
+        for labels, value in values.items():
+            yield f'{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}'
+
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value which can go up and down"""
+    kind = 'gauge'
+
+    def set_value(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values, counted in buckets"""
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        # per label values: count in every bucket (not cumulative), then +Inf, sum
+        self.observations: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self.observations.get(labels)
+        if counts is None:
+            counts = self.observations[labels] = [0.0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def collect(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for labels, counts in self.observations.items():
+            total = 0.0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                total += count
+                bucket_labels = _format_labels((*self.labels, 'le'), (*labels, _format_value(bound)))
+                yield f'{self.name}_bucket{bucket_labels} {_format_value(total)}'
+            yield f'{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(counts[-1])}'
+            yield f'{self.name}_count{_format_labels(self.labels, labels)} {_format_value(total)}'
+
+
+class Timer:
+    """Context manager observing elapsed time in a histogram, and counting exceptions raised"""
+    __slots__ = ('histogram', 'errors', 'labels', 'started')
+
+    def __init__(self, histogram: Histogram, labels: Labels, errors: Counter | None = None):
+        self.histogram = histogram
+        self.errors = errors
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> Timer:
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        if exc_type is not None and self.errors is not None and issubclass(exc_type, Exception):
+            self.errors.inc(*self.labels)
+
+
+class Metrics:
+    """
+    Metrics collected by the bot and its hooks, exported in the Prometheus text format
+
+    Attributes:
+        messages (Counter): Messages handled, per IRC network, relay and direction
+        hook_seconds (Histogram): Time spent in hooks, per source and hook
+        hook_errors (Counter): Exceptions raised by hooks, per source and hook
+        render_seconds (Histogram): Time spent rendering Discord markdown, excluding cache hits
+        send_seconds (Histogram): Time taken to send a message, per transport,
+            for IRC including the time spent waiting for flood control
+        send_errors (Counter): Failed sends, per transport
+        backlog (Gauge): Messages waiting to be handled or sent, per queue
+        registry (list): All exported metrics
+    """
+
+    def __init__(self):
+        self.messages = Counter('walnut_messages_total', 'Messages relayed', ('network', 'relay', 'direction'))
+        self.hook_seconds = Histogram('walnut_hook_duration_seconds', 'Time spent in hooks', ('source', 'hook'))
+        self.hook_errors = Counter('walnut_hook_errors_total', 'Exceptions raised by hooks', ('source', 'hook'))
+        self.render_seconds = Histogram('walnut_markdown_render_seconds', 'Time spent rendering Discord markdown')
+        self.send_seconds = Histogram('walnut_send_duration_seconds', 'Time taken to send a message', ('transport',))
+        self.send_errors = Counter('walnut_send_errors_total', 'Messages which failed to send', ('transport',))
+        self.backlog = Gauge('walnut_backlog', 'Messages waiting to be handled or sent', ('queue',))
+        self.registry: list[Metric] = [
+            self.messages,
+            self.hook_seconds,
+            self.hook_errors,
+            self.render_seconds,
+            self.send_seconds,
+            self.send_errors,
+            self.backlog,
+        ]
+        self._runner: web.AppRunner | None = None
+
+    def add(self, metric: Metric) -> Metric:
+        """Adds a metric to be exported, returns it"""
+        self.registry.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format"""
+        return '\n'.join(line for metric in self.registry for line in metric.collect()) + '\n'
+
+    async def start_server(self, host: str, port: int) -> None:
+        """Serves metrics over HTTP at /metrics"""
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_request)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info('Serving metrics at http://%s:%d/metrics', host, port)
+
+    def dump(self, file: Path) -> None:
+        """Writes metrics to a file, replacing it atomically"""
+        temporary = file.with_name(f'.{file.name}.tmp')
+        temporary.write_text(self.render(), encoding='utf-8')
+        os.replace(temporary, file)
+
+    async def dump_periodically(self, file: Path, interval: float) -> None:
+        """Writes metrics to a file every `interval` seconds, forever"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.dump(file)
+            except OSError:
+                logger.exception('Failed to write metrics to %s', file)
+
+    async def close(self) -> None:
+        """Stops the HTTP server, if running"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_request(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type='text/plain', charset='utf-8')
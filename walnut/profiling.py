@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Any, Coroutine, Generator
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler, periodically sampling the call stack of a thread from a background thread
+
+    Unlike cProfile, it doesn't slow down profiled code. Results are written in the collapsed stack format,
+    as used by flame graph tools such as flamegraph.pl and speedscope.
+
+    Attributes:
+        interval: Seconds between samples
+        thread_id: Identifier of the sampled thread
+        samples (Counter): Number of times each collapsed stack was sampled
+    """
+
+    def __init__(self, interval: float, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample, name='walnut-sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def dump_stats(self, file: Path) -> None:
+        """Writes collapsed stacks to a file, one `frame;frame;frame count` per line"""
+        with file.open(mode='w', encoding='utf-8') as fp:
+            for stack, count in self.samples.most_common():
+                fp.write(f'{stack} {count}\n')
+
+    @staticmethod
+    def _collapse(frame: FrameType | None) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+
+class Profiler:
+    """
+    Profiles the running event loop on demand, one session at a time
+
+    Attributes:
+        output_dir: Directory profiles are written to
+        mode: "cprofile" to write pstats files, "sampling" to write collapsed stacks
+        sampling_interval: Seconds between samples in sampling mode
+    """
+
+    def __init__(self, output_dir: Path, mode: str = 'cprofile', sampling_interval: float = 0.005):
+        self.output_dir = output_dir
+        self.mode = mode
+        self.sampling_interval = sampling_interval
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        """Whether a profiling session is in progress"""
+        return self._running
+
+    async def profile(self, duration: float, mode: str | None = None) -> Path:
+        """
+        Profiles the event loop's thread for `duration` seconds
+
+        Args:
+            duration: Seconds to collect samples for
+            mode: Overrides the profiler's mode
+
+        Returns:
+            Path: Path of the written profile
+
+        Raises:
+            RuntimeError: A profiling session is already in progress
+        """
+        if self._running:
+            raise RuntimeError('A profiling session is already in progress')
+
+        mode = mode or self.mode
+        if mode not in ('cprofile', 'sampling'):
+            raise ValueError(f'Unknown profiling mode "{mode}", expected "cprofile" or "sampling"')
+
+        self._running = True
+        try:
+            profiler: cProfile.Profile | SamplingProfiler
+            if mode == 'cprofile':
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                profiler = SamplingProfiler(self.sampling_interval)
+                profiler.start()
+            logger.info('Profiling for %.1f seconds (%s)', duration, mode)
+
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                if isinstance(profiler, cProfile.Profile):
+                    profiler.disable()
+                else:
+                    profiler.stop()
+
+            suffix = 'prof' if mode == 'cprofile' else 'collapsed'
+            file = self.output_dir / f'walnut-{time.strftime("%Y%m%d-%H%M%S")}.{suffix}'
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(file)  # type: ignore[arg-type]
+            logger.info('Profile saved to %s', file)
+            return file
+        finally:
+            self._running = False
+
+
+class SlowStepLogger:
+    """
+    Awaitable wrapping a coroutine, logging every step which blocks the event loop for too long
+
+    A step is the code a coroutine runs between two suspension points, during which no other task can run.
+
+    Attributes:
+        coro: Wrapped coroutine
+        threshold: Seconds a step may take before it's logged
+        name: Name of the coroutine, used in logs
+    """
+    __slots__ = ('coro', 'threshold', 'name')
+
+    def __init__(self, coro: Coroutine[Any, Any, Any], threshold: float, name: str):
+        self.coro = coro
+        self.threshold = threshold
+        self.name = name
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            started = time.perf_counter()
+            try:
+                future = self.coro.send(value) if error is None else self.coro.throw(error)
+            except StopIteration as stop:
+                self._check(started)
+                return stop.value
+            except BaseException:
+                self._check(started)
+                raise
+            self._check(started)
+
+            try:
+                value, error = (yield future), None
+            except BaseException as e:  # noqa: BLE001 - thrown into the coroutine, which handles or re-raises it
+                value, error = None, e
+
+    def _check(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        if elapsed >= self.threshold:
+            logger.warning('%s blocked the event loop for %.3f seconds', self.name, elapsed)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterable
+
+from pyrcb2.itypes import IStr
+
+from walnut.bot import WalnutBot
+from walnut.config import Config, RelayConfig
+from walnut.hooks.relay import MessageRelay
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL = 2.0
+"""Seconds between checks of the configuration file for changes."""
+
+
+class ConfigReloader:
+    """
+    Loads relays from a configuration file, and reloads them when it changes
+
+    On reload, relays are compared with the running ones: only added and removed relays are loaded and unloaded,
+    and only channels no longer or newly relayed are PARTed and JOINed. Connections and caches are left alone.
+    Other configuration sections can't be changed without a restart.
+
+    Attributes:
+        bot: Bot relays are loaded into
+        config_file: Path of the configuration file
+        relays (list): Loaded (configuration, relay) pairs
+    """
+
+    def __init__(self, bot: WalnutBot, config_file: Path):
+        self.bot = bot
+        self.config_file = config_file
+        self.relays: list[tuple[RelayConfig, MessageRelay]] = []
+        self._modified = self._modified_time()
+
+    def load(self) -> None:
+        """Loads relays of the bot's configuration"""
+        for relay_config in self.bot.config.relays:
+            self.relays.append((relay_config, self._load_relay(relay_config)))
+
+    def reload(self) -> bool:
+        """
+        Reloads relays from the configuration file
+
+        An invalid configuration, or one with a relay which fails to load, is rejected as a whole,
+        leaving the running relays unchanged.
+
+        Returns:
+            bool: Whether the configuration was applied
+        """
+        try:
+            config = Config.from_file(self.config_file)
+            self._validate(config)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.error('Not reloading invalid configuration from %s: %s', self.config_file, e)
+            return False
+
+        if replace(config, relays=[]) != replace(self.bot.config, relays=[]):
+            logger.warning('Only relays are reloaded, restart to apply other configuration changes')
+
+        before = self._channels(relay_config for relay_config, _ in self.relays)
+        added = list(config.relays)
+        removed = []
+        for relay_config, relay in self.relays:
+            if relay_config in added:
+                added.remove(relay_config)
+            else:
+                removed.append((relay_config, relay))
+
+        # added relays are loaded first, so that running relays are kept if any of them fails to load
+        loaded: list[tuple[RelayConfig, MessageRelay]] = []
+        try:
+            for relay_config in added:
+                loaded.append((relay_config, self._load_relay(relay_config)))
+        except Exception:
+            logger.exception('Not reloading configuration from %s, failed to load a relay', self.config_file)
+            for _, relay in loaded:
+                relay.unload(self.bot)
+            return False
+
+        for relay_config, relay in removed:
+            self.relays.remove((relay_config, relay))
+            try:
+                relay.unload(self.bot)
+            except Exception:
+                logger.exception('Failed to unload %r', relay)
+        self.relays.extend(loaded)
+        # connect() joins channels of the relays in the bot's configuration
+        self.bot.config = replace(self.bot.config, relays=config.relays)
+
+        after = self._channels(config.relays)
+        for network, channel in after - before:
+            self.bot.get_irc_network(network).join(channel)
+        for network, channel in before - after:
+            self.bot.get_irc_network(network).part(channel)
+
+        logger.info(
+            'Reloaded configuration: %d relays added, %d removed, %d unchanged',
+            len(added), len(removed), len(self.relays) - len(added)
+        )
+        return True
+
+    async def run(self, watch: bool = False) -> None:
+        """
+        Reloads the configuration on SIGHUP, and optionally when the file changes
+
+        Args:
+            watch: Whether to check the file for changes every few seconds
+        """
+        signum = getattr(signal, 'SIGHUP', None)
+        if signum is not None:
+            asyncio.get_running_loop().add_signal_handler(signum, self.reload)
+        elif not watch:
+            logger.warning('Reloading configuration on a signal is not supported on this platform')
+
+        while watch:
+            await asyncio.sleep(WATCH_INTERVAL)
+            modified = self._modified_time()
+            if modified != self._modified:
+                self._modified = modified
+                logger.info('%s changed, reloading', self.config_file)
+                self.reload()
+
+    def _load_relay(self, relay_config: RelayConfig) -> MessageRelay:
+        relay = MessageRelay.from_config(relay_config)
+        relay.load(self.bot)
+        return relay
+
+    def _validate(self, config: Config) -> None:
+        """Checks what Config can't check on its own, so that applying the configuration can't fail halfway"""
+        for relay_config in config.relays:
+            if relay_config.irc_network is not None and relay_config.irc_network not in self.bot.irc_networks:
+                raise ValueError(f'IRC network "{relay_config.irc_network}" is not connected, restart to add it')
+
+    def _channels(self, relay_configs: Iterable[RelayConfig]) -> set[tuple[str, IStr]]:
+        default = self.bot.config.irc_config.name
+        return {(relay_config.irc_network or default, relay_config.irc_channel) for relay_config in relay_configs}
+
+    def _modified_time(self) -> int | None:
+        try:
+            return self.config_file.stat().st_mtime_ns
+        except OSError:
+            return None
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+import zlib
+from dataclasses import replace
+from multiprocessing.context import SpawnProcess
+from pathlib import Path
+from typing import Any
+
+from aiohttp import web
+
+from walnut.config import Config, LoggingConfig, RelayConfig
+from walnut.logs import setup_logging
+from walnut.metrics import merge_expositions
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '[%(levelname)s][%(processName)s][%(name)s] %(message)s'
+MIN_RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+STABLE_UPTIME = 60.0
+"""Seconds a worker has to run for, before its restart delay is reset."""
+WORKER_METRICS_INTERVAL = 5.0
+"""Maximum seconds between metrics dumps of a worker."""
+
+
+def assign_worker(relay: RelayConfig, workers: int, default_network: str) -> int:
+    """
+    Returns the index of the worker responsible for a relay
+
+    Relays are assigned by IRC network and channel, so that all relays of a channel share a worker.
+    The assignment is stable between runs and independent of the order of relays.
+    """
+    key = f'{relay.irc_network or default_network}/{relay.irc_channel.lower()}'
+    return zlib.crc32(key.encode('utf-8')) % workers
+
+
+def partition_relays(config: Config, workers: int) -> list[list[RelayConfig]]:
+    """Splits configured relays between a given number of workers"""
+    partitions: list[list[RelayConfig]] = [[] for _ in range(workers)]
+    for relay in config.relays:
+        partitions[assign_worker(relay, workers, config.irc_config.name)].append(relay)
+    return partitions
+
+
+def worker_config(config: Config, index: int, relays: list[RelayConfig], metrics_file: Path | None) -> Config:
+    """
+    Returns the configuration of a single worker
+
+    Every worker has its own IRC connections, so workers other than the first one
+    append their index to the configured nicknames to avoid collisions.
+    Files written by every worker are suffixed with its index, so that workers don't overwrite each other's.
+    """
+    reply_file = config.cache_config.reply_file
+    if reply_file is not None:
+        # relays are assigned to workers the same way on every start, so each worker reloads its own channels
+        path = Path(reply_file)
+        reply_file = str(path.with_name(f'{path.stem}.worker{index}{path.suffix}'))
+
+    return replace(
+        config,
+        relays=relays,
+        irc_configs=[
+            replace(irc_config, nickname=f'{irc_config.nickname}{index}') if index else irc_config
+            for irc_config in config.irc_configs
+        ],
+        metrics_config=replace(
+            config.metrics_config,
+            port=None,
+            file=str(metrics_file) if metrics_file else None,
+            dump_interval=min(config.metrics_config.dump_interval, WORKER_METRICS_INTERVAL)
+        ),
+        cache_config=replace(config.cache_config, reply_file=reply_file),
+        # profiling over a signal or a command would be ambiguous between workers
+        profiling_config=replace(config.profiling_config, signal=False, command=False)
+    )
+
+
+def _run_worker(config: Config, log_queue: Any) -> None:
+    """Entry point of a worker process"""
+    # forward all logs to the supervisor, before anything else configures logging
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(config.logging_config.level.upper())
+
+    from walnut.bot import WalnutBot
+    from walnut.hooks.relay import MessageRelay
+
+    bot = WalnutBot(config)
+    for relay_config in config.relays:
+        MessageRelay.from_config(relay_config).load(bot)
+
+    bot.run()
+
+
+class Supervisor:
+    """
+    Runs relays split between multiple worker processes, restarting workers which exit
+
+    Logs of all workers are written by the supervisor, and metrics of all workers
+    are exported by the supervisor with a ``worker`` label.
+
+    Attributes:
+        config: Configuration of the whole bot
+        workers: Number of worker processes
+        partitions (list): Relays assigned to each worker
+        processes (list): Running worker processes, None if not started
+    """
+
+    def __init__(self, config: Config, workers: int):
+        if workers < 1:
+            raise ValueError('Number of workers must be at least 1')
+
+        self.config = config
+        self.workers = workers
+        self.partitions = partition_relays(config, workers)
+        self.processes: list[SpawnProcess | None] = [None] * workers
+        self._context = multiprocessing.get_context('spawn')
+        self._log_queue = self._context.Queue()
+        self._metrics_dir: Path | None = None
+        self._started_at = [0.0] * workers
+        self._restart_delays = [MIN_RESTART_DELAY] * workers
+        self._restart_at = [0.0] * workers
+
+    def run(self) -> None:
+        """
+        Starts the workers and supervises them until interrupted
+
+        Workers are stopped on KeyboardInterrupt and SIGTERM. Reloading relays isn't supported,
+        so SIGHUP is ignored with a warning instead of terminating the supervisor.
+        """
+        log_handler = None
+        if not logging.getLogger().handlers:
+            # tell workers apart, unless a format was configured
+            log_format = LOG_FORMAT if self.config.logging_config.log_format == LoggingConfig.log_format else None
+            log_handler = setup_logging(self.config.logging_config, log_format)
+        listener = logging.handlers.QueueListener(
+            self._log_queue,
+            *logging.getLogger().handlers,
+            respect_handler_level=True
+        )
+        listener.start()
+
+        if self.config.metrics_config.enabled:
+            self._metrics_dir = Path(tempfile.mkdtemp(prefix='walnut-metrics-'))
+
+        try:
+            for index, relays in enumerate(self.partitions):
+                if not relays:
+                    logger.warning('Worker %d has no relays assigned, not starting it', index)
+                    continue
+                logger.info('Worker %d handles %d relays', index, len(relays))
+                self._start_worker(index)
+            asyncio.run(self._supervise())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop_workers()
+            listener.stop()
+            if log_handler is not None:
+                logging.getLogger().removeHandler(log_handler)
+                log_handler.close()
+            if self._metrics_dir is not None:
+                shutil.rmtree(self._metrics_dir, ignore_errors=True)
+
+    def collect_metrics(self) -> str:
+        """Returns metrics of all workers merged, in the Prometheus text format"""
+        if self._metrics_dir is None:
+            return ''
+
+        expositions = {}
+        for index in range(self.workers):
+            file = self._metrics_file(index)
+            if file is not None and file.exists():
+                expositions[str(index)] = file.read_text(encoding='utf-8')
+        return merge_expositions(expositions, 'worker')
+
+    def _metrics_file(self, index: int) -> Path | None:
+        return self._metrics_dir / f'worker-{index}.prom' if self._metrics_dir else None
+
+    def _start_worker(self, index: int) -> None:
+        config = worker_config(self.config, index, self.partitions[index], self._metrics_file(index))
+        process = self._context.Process(
+            target=_run_worker,
+            args=(config, self._log_queue),
+            name=f'worker-{index}',
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+        self._started_at[index] = time.monotonic()
+
+    def _stop_workers(self) -> None:
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.kill()
+
+    def _check_workers(self) -> None:
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if process is None or process.is_alive():
+                continue
+
+            if not self._restart_at[index]:
+                # back off from workers crashing right after starting
+                if now - self._started_at[index] >= STABLE_UPTIME:
+                    self._restart_delays[index] = MIN_RESTART_DELAY
+                delay = self._restart_delays[index]
+                self._restart_delays[index] = min(delay * 2, MAX_RESTART_DELAY)
+                self._restart_at[index] = now + delay
+                logger.warning(
+                    'Worker %d exited with code %s, restarting in %.0f seconds',
+                    index, process.exitcode, delay
+                )
+            elif now >= self._restart_at[index]:
+                self._restart_at[index] = 0.0
+                self._start_worker(index)
+
+    async def _supervise(self) -> None:
+        stopping = asyncio.Event()
+        self._add_signal_handlers(stopping)
+
+        config = self.config.metrics_config
+        runner = None
+        if config.enabled and config.port is not None:
+            app = web.Application()
+            app.router.add_get('/metrics', self._handle_metrics)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, config.host, config.port).start()
+
+        last_dump = time.monotonic()
+        try:
+            while not stopping.is_set():
+                self._check_workers()
+                if config.enabled and config.file is not None and time.monotonic() - last_dump >= config.dump_interval:
+                    last_dump = time.monotonic()
+                    self._dump_metrics(Path(config.file))
+                await asyncio.sleep(0.5)
+        finally:
+            if runner is not None:
+                await runner.cleanup()
+
+    def _add_signal_handlers(self, stopping: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+
+        def on_terminate() -> None:
+            logger.info('Received SIGTERM, stopping workers')
+            stopping.set()
+
+        def on_reload() -> None:
+            # without a handler, SIGHUP would terminate the supervisor and leave the workers behind
+            logger.warning('Ignoring SIGHUP, reloading relays is not supported with multiple workers')
+
+        for name, handler in (('SIGTERM', on_terminate), ('SIGHUP', on_reload)):
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            try:
+                loop.add_signal_handler(signum, handler)
+            except NotImplementedError:
+                logger.warning('Handling %s is not supported on this platform', name)
+
+    def _dump_metrics(self, file: Path) -> None:
+        temporary = file.with_name(f'.{file.name}.tmp')
+        try:
+            temporary.write_text(self.collect_metrics(), encoding='utf-8')
+            os.replace(temporary, file)
+        except OSError:
+            logger.exception('Failed to write metrics to %s', file)
+
+    async def _handle_metrics(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.collect_metrics(), content_type='text/plain', charset='utf-8')